@@ -0,0 +1,117 @@
+##
+#     Project: gCentralAccess
+# Description: Manage external resources from a centralized management console
+#      Author: Fabio Castelli (Muflone) <muflone@vbsimple.net>
+#   Copyright: 2015-2016 Fabio Castelli
+#     License: GPL-2+
+#  This program is free software; you can redistribute it and/or modify it
+#  under the terms of the GNU General Public License as published by the Free
+#  Software Foundation; either version 2 of the License, or (at your option)
+#  any later version.
+#
+#  This program is distributed in the hope that it will be useful, but WITHOUT
+#  ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+#  FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+#  more details.
+#  You should have received a copy of the GNU General Public License along
+#  with this program; if not, write to the Free Software Foundation, Inc.,
+#  51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA
+##
+
+import fnmatch
+
+import gcentralaccess.inventory as inventory
+
+from gcentralaccess.models.host_info import HostInfo
+from gcentralaccess.models.destination_info import DestinationInfo
+
+OPERATION_SERVICE = 'service'
+OPERATION_DESTINATION = 'destination'
+OPERATION_ADDRESS = 'address'
+
+
+class BulkEdit(object):
+    def __init__(self, operation, old_value, new_value):
+        """Prepare a change to apply to many hosts at once"""
+        self.operation = operation
+        self.old_value = old_value
+        self.new_value = new_value
+
+    def filter_hosts(self, hosts, pattern):
+        """Return the (group, host) pairs whose name matches the pattern"""
+        pattern = pattern.lower() if pattern else '*'
+        return [(group, host) for (group, host) in hosts
+                if fnmatch.fnmatch(host.name.lower(), pattern)]
+
+    def get_affected(self, host):
+        """Return the list of the items affected in a host"""
+        result = []
+        if self.operation == OPERATION_DESTINATION:
+            # The destination can be renamed only if the new name is free
+            if (self.old_value in host.destinations and
+                    self.new_value not in host.destinations):
+                result.append('%s: %s -> %s' % (
+                    OPERATION_DESTINATION, self.old_value, self.new_value))
+                for association in host.associations:
+                    if association.destination_name == self.old_value:
+                        result.append('%s (%s)' % (association.description,
+                                                   association.service_name))
+        elif self.operation == OPERATION_SERVICE:
+            for association in host.associations:
+                if association.service_name == self.old_value:
+                    result.append('%s (%s -> %s)' % (association.description,
+                                                     self.old_value,
+                                                     self.new_value))
+        elif self.operation == OPERATION_ADDRESS:
+            for destination in host.destinations.itervalues():
+                if destination.value == self.old_value:
+                    result.append('%s: %s -> %s' % (destination.name,
+                                                    self.old_value,
+                                                    self.new_value))
+        return result
+
+    def preview(self, hosts):
+        """Return the (group, host, affected items) for the affected hosts"""
+        result = []
+        for group, host in hosts:
+            affected = self.get_affected(host)
+            if affected:
+                result.append((group, host, affected))
+        return result
+
+    def edit_host(self, host):
+        """Return a new host with the change applied"""
+        new_host = HostInfo(host.name, host.description, host.template,
+                            host.tags)
+        for destination in host.destinations.itervalues():
+            if (self.operation == OPERATION_DESTINATION and
+                    destination.name == self.old_value):
+                destination = DestinationInfo(name=self.new_value,
+                                              value=destination.value)
+            elif (self.operation == OPERATION_ADDRESS and
+                    destination.value == self.old_value):
+                destination = DestinationInfo(name=destination.name,
+                                              value=self.new_value)
+            new_host.add_destination(destination)
+        for association in host.associations:
+            destination_name = association.destination_name
+            service_name = association.service_name
+            if (self.operation == OPERATION_DESTINATION and
+                    destination_name == self.old_value):
+                destination_name = self.new_value
+            elif (self.operation == OPERATION_SERVICE and
+                    service_name == self.old_value):
+                service_name = self.new_value
+            new_host.add_association(
+                description=association.description,
+                destination_name=destination_name,
+                service_name=service_name,
+                arguments=association.service_arguments)
+        return new_host
+
+    def apply(self, hosts, progress_cb=None):
+        """Apply the change to the affected hosts in a single transaction"""
+        transaction = inventory.inventory.begin()
+        for group, host, affected in self.preview(hosts):
+            transaction.set_host(group, self.edit_host(host))
+        return transaction.commit(progress_cb)
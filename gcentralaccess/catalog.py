@@ -0,0 +1,356 @@
+##
+#     Project: gCentralAccess
+# Description: Manage external resources from a centralized management console
+#      Author: Fabio Castelli (Muflone) <muflone@vbsimple.net>
+#   Copyright: 2015-2016 Fabio Castelli
+#     License: GPL-2+
+#  This program is free software; you can redistribute it and/or modify it
+#  under the terms of the GNU General Public License as published by the Free
+#  Software Foundation; either version 2 of the License, or (at your option)
+#  any later version.
+#
+#  This program is distributed in the hope that it will be useful, but WITHOUT
+#  ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+#  FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+#  more details.
+#  You should have received a copy of the GNU General Public License along
+#  with this program; if not, write to the Free Software Foundation, Inc.,
+#  51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA
+##
+import os
+import os.path
+import json
+import array
+
+from gcentralaccess.constants import FILE_CATALOG
+import gcentralaccess.inventory as inventory
+
+from gcentralaccess.models.host_info import HostInfo
+from gcentralaccess.models.destination_info import DestinationInfo
+from gcentralaccess.models.association_info import AssociationInfo
+
+# Version of the saved catalog format
+CATALOG_VERSION = 2
+# Strings ids, host files signatures and offsets arrays, in saving order
+ARRAYS = (('host_groups', 'i'),
+          ('host_names', 'i'),
+          ('host_descriptions', 'i'),
+          ('host_templates', 'i'),
+          ('host_mtimes', 'd'),
+          ('host_sizes', 'l'),
+          ('host_destinations', 'i'),
+          ('host_associations', 'i'),
+          ('host_tags', 'i'),
+          ('tag_names', 'i'),
+          ('destination_names', 'i'),
+          ('destination_values', 'i'),
+          ('association_descriptions', 'i'),
+          ('association_destinations', 'i'),
+          ('association_services', 'i'),
+          ('association_arguments', 'i'),
+          ('argument_keys', 'i'),
+          ('argument_values', 'i'))
+# Separator for the strings table, it cannot be used in the settings files
+STRINGS_SEPARATOR = '\0'
+# Kinds of the values in the strings table, any value other than a string
+# (like a missing description or a service argument) is saved as json
+KIND_STR = 0
+KIND_UNICODE = 1
+KIND_JSON = 2
+
+catalog = None
+
+
+class HostView(object):
+    """Read only HostInfo compatible view of a catalog host row, the
+    destinations and the associations are built on every access"""
+    __slots__ = ('catalog', 'index')
+
+    def __init__(self, catalog, index):
+        self.catalog = catalog
+        self.index = index
+
+    @property
+    def name(self):
+        return self.catalog.get_string('host_names', self.index)
+
+    @property
+    def description(self):
+        return self.catalog.get_string('host_descriptions', self.index)
+
+    @property
+    def template(self):
+        return self.catalog.get_string('host_templates', self.index)
+
+    @property
+    def tags(self):
+        return self.catalog.get_tags(self.index)
+
+    @property
+    def destinations(self):
+        return self.catalog.get_destinations(self.index)
+
+    @property
+    def associations(self):
+        return self.catalog.get_associations(self.index)
+
+    def to_host(self):
+        """Return a new HostInfo with the data of the view"""
+        host = HostInfo(self.name, self.description, self.template,
+                        self.tags)
+        host.destinations = self.destinations
+        host.associations = self.associations
+        return host
+
+    def clone(self, name, description=None, template=None, tags=None):
+        """Return a new HostInfo with the data of the view"""
+        host = self.to_host()
+        host.name = name
+        if description is not None:
+            host.description = description
+        if template is not None:
+            host.template = template
+        if tags is not None:
+            host.tags = tags
+        return host
+
+
+class Catalog(object):
+    def __init__(self, filename=FILE_CATALOG):
+        """Prepare the column oriented catalog of the hosts of every group,
+        each host row refers to the ranges of its destinations and of its
+        associations rows and every text is an id in the strings table"""
+        self.filename = filename
+        self.clear()
+
+    def clear(self):
+        """Remove every host from the catalog"""
+        self.strings = []
+        self.strings_kinds = array.array('b')
+        # Ids of the strings by value, a dictionary for each kind
+        self.strings_ids = ({}, {}, {})
+        for name, typecode in ARRAYS:
+            setattr(self, name, array.array(typecode))
+        # The offsets tables have a final row with the ranges end
+        self.host_destinations.append(0)
+        self.host_associations.append(0)
+        self.host_tags.append(0)
+        self.association_arguments.append(0)
+        # Live host rows by name for every group, the replaced rows are
+        # left over until the catalog is saved again
+        self.rows = {}
+        # Hosts not found unchanged in the catalog while loading them
+        self.missed = set()
+        self.dirty = False
+
+    def get_string_key(self, value):
+        """Return the kind of a value and its key in the strings ids"""
+        if isinstance(value, str):
+            return (KIND_STR, value)
+        elif isinstance(value, unicode):
+            return (KIND_UNICODE, value)
+        else:
+            return (KIND_JSON, json.dumps(value, sort_keys=True))
+
+    def get_string_id(self, value):
+        """Return the id of a string, adding it to the strings table"""
+        kind, key = self.get_string_key(value)
+        strings_ids = self.strings_ids[kind]
+        string_id = strings_ids.get(key)
+        if string_id is None:
+            string_id = len(self.strings)
+            self.strings.append(value)
+            self.strings_kinds.append(kind)
+            strings_ids[key] = string_id
+        return string_id
+
+    def get_string(self, array_name, index):
+        """Return the string referred by an array row"""
+        return self.strings[getattr(self, array_name)[index]]
+
+    def get_tags(self, index):
+        """Return the tags of a host row"""
+        strings = self.strings
+        return [strings[self.tag_names[tag]]
+                for tag in self.get_range('host_tags', index)]
+
+    def get_destinations(self, index):
+        """Return new DestinationInfo objects by name for a host row"""
+        strings = self.strings
+        result = {}
+        for destination in self.get_range('host_destinations', index):
+            name = strings[self.destination_names[destination]]
+            result[name] = DestinationInfo(
+                name=name,
+                value=strings[self.destination_values[destination]])
+        return result
+
+    def get_associations(self, index):
+        """Return new AssociationInfo objects for a host row"""
+        strings = self.strings
+        result = []
+        for association in self.get_range('host_associations', index):
+            arguments = {}
+            for argument in self.get_range('association_arguments',
+                                           association):
+                arguments[strings[self.argument_keys[argument]]] = (
+                    strings[self.argument_values[argument]])
+            result.append(AssociationInfo(
+                description=strings[
+                    self.association_descriptions[association]],
+                destination_name=strings[
+                    self.association_destinations[association]],
+                service_name=strings[self.association_services[association]],
+                arguments=arguments))
+        return result
+
+    def get_range(self, array_name, index):
+        """Return the children rows range from an offsets array"""
+        offsets = getattr(self, array_name)
+        return xrange(offsets[index], offsets[index + 1])
+
+    def add_host(self, group, host, signature):
+        """Add a host row along as with its children rows"""
+        get_string_id = self.get_string_id
+        self.rows.setdefault(group, {})[host.name] = len(self.host_names)
+        self.host_groups.append(get_string_id(group))
+        self.host_names.append(get_string_id(host.name))
+        self.host_descriptions.append(get_string_id(host.description))
+        self.host_templates.append(get_string_id(host.template))
+        self.host_mtimes.append(signature[0] if signature else 0)
+        self.host_sizes.append(signature[1] if signature else -1)
+        for destination in host.destinations.itervalues():
+            self.destination_names.append(get_string_id(destination.name))
+            self.destination_values.append(get_string_id(destination.value))
+        self.host_destinations.append(len(self.destination_names))
+        for association in host.associations:
+            self.association_descriptions.append(
+                get_string_id(association.description))
+            self.association_destinations.append(
+                get_string_id(association.destination_name))
+            self.association_services.append(
+                get_string_id(association.service_name))
+            for key, value in association.service_arguments.iteritems():
+                self.argument_keys.append(get_string_id(key))
+                self.argument_values.append(get_string_id(value))
+            self.association_arguments.append(len(self.argument_keys))
+        self.host_associations.append(len(self.association_descriptions))
+        for tag in host.tags:
+            self.tag_names.append(get_string_id(tag))
+        self.host_tags.append(len(self.tag_names))
+        self.dirty = True
+
+    def remove_host(self, group, name):
+        """Leave over the row of a host"""
+        if self.rows.get(group, {}).pop(name, None) is not None:
+            self.dirty = True
+
+    def iter_keys(self):
+        """Iterate over the (group, name) keys of the live host rows"""
+        for group, names in self.rows.iteritems():
+            for name in names:
+                yield (group, name)
+
+    def get_cached_host(self, group, filename):
+        """Return the view of an unchanged host file or None"""
+        name = os.path.basename(filename)[:-len(inventory.HOST_EXTENSION)]
+        index = self.rows.get(group, {}).get(name)
+        signature = inventory.get_host_signature(group, name)
+        if (index is None or signature is None or
+                self.host_mtimes[index] != signature[0] or
+                self.host_sizes[index] != signature[1]):
+            self.missed.add((group, name))
+            return None
+        return HostView(self, index)
+
+    def sync(self, hosts_inventory):
+        """Update the rows for the hosts loaded from the changed files and
+        for the removed files"""
+        keys = set()
+        for group, host in hosts_inventory.iter_hosts():
+            key = (group, host.name)
+            keys.add(key)
+            if key in self.missed or host.name not in self.rows.get(group, ()):
+                self.remove_host(group, host.name)
+                self.add_host(group, host,
+                              inventory.get_host_signature(group, host.name))
+        for group, name in set(self.iter_keys()) - keys:
+            self.remove_host(group, name)
+        self.missed.clear()
+
+    def load(self):
+        """Load the saved catalog with a single read for each table"""
+        self.clear()
+        if not os.path.isfile(self.filename):
+            return
+        try:
+            with open(self.filename, 'rb') as file_catalog:
+                header = json.loads(file_catalog.readline())
+                if header['version'] != CATALOG_VERSION:
+                    return
+                strings = file_catalog.read(header['strings_size'])
+                self.strings_kinds.fromfile(file_catalog, header['strings'])
+                for name, typecode in ARRAYS:
+                    values = getattr(self, name)
+                    del values[:]
+                    values.fromfile(file_catalog, header[name])
+        except (ValueError, KeyError, EOFError):
+            # Ignore an invalid catalog, it will be built again
+            self.clear()
+            return
+        self.strings = (strings.split(STRINGS_SEPARATOR)
+                        if header['strings'] else [])
+        for string_id, kind in enumerate(self.strings_kinds):
+            if kind == KIND_UNICODE:
+                self.strings[string_id] = self.strings[string_id].decode(
+                    'utf-8')
+            elif kind == KIND_JSON:
+                self.strings[string_id] = json.loads(self.strings[string_id])
+        get_string_key = self.get_string_key
+        for string_id, value in enumerate(self.strings):
+            kind, key = get_string_key(value)
+            self.strings_ids[kind][key] = string_id
+        strings = self.strings
+        for index, (group_id, name_id) in enumerate(zip(self.host_groups,
+                                                        self.host_names)):
+            self.rows.setdefault(strings[group_id], {})[
+                strings[name_id]] = index
+
+    def save(self, hosts_inventory):
+        """Save the catalog of the inventory hosts, if changed"""
+        if not self.dirty:
+            return
+        # Build the catalog again to discard the left over rows
+        new_catalog = Catalog(self.filename)
+        for group, host in hosts_inventory.iter_hosts():
+            new_catalog.add_host(group, host,
+                                 inventory.get_host_signature(group,
+                                                              host.name))
+        strings = STRINGS_SEPARATOR.join(
+            value if kind == KIND_STR else
+            value.encode('utf-8') if kind == KIND_UNICODE else
+            json.dumps(value)
+            for value, kind in zip(new_catalog.strings,
+                                   new_catalog.strings_kinds))
+        header = {'version': CATALOG_VERSION,
+                  'strings': len(new_catalog.strings),
+                  'strings_size': len(strings)}
+        for name, typecode in ARRAYS:
+            header[name] = len(getattr(new_catalog, name))
+        with open('%s.tmp' % self.filename, 'wb') as file_catalog:
+            file_catalog.write('%s\n' % json.dumps(header))
+            file_catalog.write(strings)
+            new_catalog.strings_kinds.tofile(file_catalog)
+            for name, typecode in ARRAYS:
+                getattr(new_catalog, name).tofile(file_catalog)
+        os.rename('%s.tmp' % self.filename, self.filename)
+        self.dirty = False
+
+    def on_inventory_changed(self, changes):
+        """Replace the rows of the changed hosts"""
+        for action, group, name, host in changes:
+            self.remove_host(group, name)
+            if action == inventory.ACTION_SET:
+                self.remove_host(group, host.name)
+                self.add_host(group, host,
+                              inventory.get_host_signature(group, host.name))
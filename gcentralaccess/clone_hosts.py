@@ -0,0 +1,65 @@
+##
+#     Project: gCentralAccess
+# Description: Manage external resources from a centralized management console
+#      Author: Fabio Castelli (Muflone) <muflone@vbsimple.net>
+#   Copyright: 2015-2016 Fabio Castelli
+#     License: GPL-2+
+#  This program is free software; you can redistribute it and/or modify it
+#  under the terms of the GNU General Public License as published by the Free
+#  Software Foundation; either version 2 of the License, or (at your option)
+#  any later version.
+#
+#  This program is distributed in the hope that it will be useful, but WITHOUT
+#  ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+#  FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+#  more details.
+#  You should have received a copy of the GNU General Public License along
+#  with this program; if not, write to the Free Software Foundation, Inc.,
+#  51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA
+##
+
+import gcentralaccess.inventory as inventory
+
+from gcentralaccess.models.destination_info import DestinationInfo
+
+# Default format for the names of the cloned hosts
+NAME_FORMAT = '{name}-{index}'
+
+
+class CloneHosts(object):
+    def __init__(self, host, destination_name, name_format=NAME_FORMAT):
+        """Prepare many copies of a host with different addresses"""
+        self.host = host
+        self.destination_name = destination_name
+        self.name_format = name_format
+
+    def get_name(self, index, address):
+        """Return the name of a cloned host"""
+        return self.name_format.format(name=self.host.name,
+                                       index=index,
+                                       address=address)
+
+    def get_names(self, addresses):
+        """Return the names of the cloned hosts"""
+        return [self.get_name(index, address)
+                for index, address in enumerate(addresses, 1)]
+
+    def create_hosts(self, addresses):
+        """Return a cloned host for each address, sharing every unchanged
+        destination and association with the source host"""
+        result = []
+        for index, address in enumerate(addresses, 1):
+            host = self.host.clone(self.get_name(index, address))
+            if self.destination_name:
+                host.add_destination(DestinationInfo(
+                    name=self.destination_name,
+                    value=address))
+            result.append(host)
+        return result
+
+    def apply(self, group, addresses, progress_cb=None):
+        """Save the cloned hosts in a single transaction"""
+        transaction = inventory.inventory.begin()
+        for host in self.create_hosts(addresses):
+            transaction.set_host(group, host)
+        return transaction.commit(progress_cb)
@@ -55,7 +55,15 @@ else:
 DIR_DATA = os.path.join(DIR_PREFIX, 'data')
 DIR_UI = os.path.join(DIR_PREFIX, 'ui')
 DIR_SETTINGS = BaseDirectory.save_config_path(DOMAIN_NAME)
+DIR_CACHE = BaseDirectory.save_cache_path(DOMAIN_NAME)
+DIR_ICONS_CACHE = BaseDirectory.save_cache_path(
+    os.path.join(DOMAIN_NAME, 'icons'))
 DIR_HOSTS = BaseDirectory.save_config_path(os.path.join(DOMAIN_NAME, 'hosts'))
+DIR_JOURNAL = BaseDirectory.save_data_path(
+    os.path.join(DOMAIN_NAME, 'journal'))
+DIR_TEMPLATES = BaseDirectory.save_config_path(
+    os.path.join(DOMAIN_NAME, 'templates'))
+DIR_LOGS = BaseDirectory.save_data_path(os.path.join(DOMAIN_NAME, 'logs'))
 # Set the paths for the data files
 FILE_ICON = os.path.join(DIR_DATA, 'gcentralaccess.png')
 FILE_CONTRIBUTORS = os.path.join(DIR_DOCS, 'contributors')
@@ -66,3 +74,8 @@ FILE_RESOURCES = os.path.join(DIR_DOCS, 'resources')
 FILE_SETTINGS = os.path.join(DIR_SETTINGS, 'settings.conf')
 FILE_WINDOWS_POSITION = os.path.join(DIR_SETTINGS, 'windows.conf')
 FILE_SERVICES = os.path.join(DIR_SETTINGS, 'services.conf')
+FILE_SMART_GROUPS = os.path.join(DIR_SETTINGS, 'smart_groups.conf')
+# Set the paths for cache files
+FILE_SEARCH_INDEX = os.path.join(DIR_CACHE, 'search_index.json')
+FILE_QUICK_CONNECT = os.path.join(DIR_CACHE, 'quick_connect.json')
+FILE_CATALOG = os.path.join(DIR_CACHE, 'catalog.dat')
@@ -27,9 +27,19 @@ from gettext import gettext, dgettext
 
 from gi.repository import Gtk
 from gi.repository import Gdk
+from gi.repository import GLib
 
 from gcentralaccess.constants import DIR_UI
 
+# Milliseconds to wait for more typing before searching the text, like the
+# search-changed signal only available since GTK+ 3.10
+SEARCH_DELAY = 150
+
+# Unicode strings shared by every object, the str ones use intern
+interned_strings = {}
+# Timeout sources of the delayed calls by their key
+delayed_calls = {}
+
 localized_messages = {}
 
 
@@ -114,7 +124,28 @@ def recursive_glob(starting_path, pattern):
 
 def get_treeview_selected_row(widget):
     """Return the selected row in a GtkTreeView"""
-    return widget.get_selection().get_selected()[1]
+    model, treeiter = widget.get_selection().get_selected()
+    # Return the row of the underlying model for filtered or sorted models
+    while treeiter and isinstance(model, (Gtk.TreeModelFilter,
+                                          Gtk.TreeModelSort)):
+        treeiter = model.convert_iter_to_child_iter(treeiter)
+        model = model.get_model()
+    return treeiter
+
+
+def get_treeview_path(widget, path):
+    """Return the GtkTreeView path for a path of the underlying model or
+    None if the row is filtered out"""
+    models = []
+    model = widget.get_model()
+    while isinstance(model, (Gtk.TreeModelFilter, Gtk.TreeModelSort)):
+        models.append(model)
+        model = model.get_model()
+    for model in reversed(models):
+        if path is None:
+            break
+        path = model.convert_child_path_to_path(path)
+    return path
 
 
 def show_popup_menu(menu, button=Gdk.BUTTON_SECONDARY):
@@ -147,6 +178,35 @@ def get_list_from_string_list(s_list):
     return items
 
 
+def call_later(key, delay, callback, *args):
+    """Call a function after a delay, postponing it again on every new
+    request with the same key"""
+    def on_timeout():
+        delayed_calls.pop(key, None)
+        callback(*args)
+        return False
+    cancel_call_later(key)
+    delayed_calls[key] = GLib.timeout_add(delay, on_timeout)
+
+
+def cancel_call_later(key):
+    """Cancel a delayed call not yet made and return if it was pending"""
+    source_id = delayed_calls.pop(key, None)
+    if source_id is not None:
+        GLib.source_remove(source_id)
+    return source_id is not None
+
+
+def intern_string(value):
+    """Return a single shared copy of a repeated string"""
+    if type(value) is str:
+        return intern(value)
+    elif type(value) is unicode:
+        return interned_strings.setdefault(value, value)
+    else:
+        return value
+
+
 # This special alias is used to track localization requests to catch
 # by xgettext. The text() calls aren't tracked by xgettext
 _ = text
@@ -162,7 +222,11 @@ __all__ = [
     'set_error_message_on_infobar',
     'recursive_glob',
     'get_treeview_selected_row',
+    'get_treeview_path',
     'show_popup_menu',
     'get_string_fields',
-    'get_list_from_string_list'
+    'get_list_from_string_list',
+    'call_later',
+    'cancel_call_later',
+    'intern_string'
 ]
@@ -0,0 +1,203 @@
+##
+#     Project: gCentralAccess
+# Description: Manage external resources from a centralized management console
+#      Author: Fabio Castelli (Muflone) <muflone@vbsimple.net>
+#   Copyright: 2015-2016 Fabio Castelli
+#     License: GPL-2+
+#  This program is free software; you can redistribute it and/or modify it
+#  under the terms of the GNU General Public License as published by the Free
+#  Software Foundation; either version 2 of the License, or (at your option)
+#  any later version.
+#
+#  This program is distributed in the hope that it will be useful, but WITHOUT
+#  ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+#  FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+#  more details.
+#  You should have received a copy of the GNU General Public License along
+#  with this program; if not, write to the Free Software Foundation, Inc.,
+#  51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA
+##
+
+import bisect
+import socket
+import struct
+
+import gcentralaccess.inventory as inventory
+
+hosts_index = None
+
+
+def get_ipv4_number(value):
+    """Return the number of a dotted IPv4 address or None"""
+    if value.count('.') != 3:
+        return None
+    try:
+        return struct.unpack('!I', socket.inet_aton(value))[0]
+    except (socket.error, UnicodeError):
+        return None
+
+
+def get_reversed_hostname(value):
+    """Return a hostname with its labels reversed, used to find the
+    hostnames with a common suffix by prefix"""
+    return '.'.join(reversed(value.lower().split('.')))
+
+
+class HostsIndex(object):
+    def __init__(self, hosts_inventory):
+        """Prepare the indexes of the hosts names and addresses of every
+        group"""
+        self.inventory = hosts_inventory
+        # Groups by host name
+        self.names = {}
+        # (group, host name) by destination value
+        self.addresses = {}
+        # Destination values by (group, host name)
+        self.hosts_addresses = {}
+        # Sorted host names, rebuilt only when the names change
+        self.sorted_names = None
+        # Sorted (IPv4 number, value) and (reversed hostname, value) pairs
+        # for the range queries, updated for the added or removed values
+        self.ipv4_addresses = []
+        self.hostnames = []
+        self.loading = True
+        for group, host in self.inventory.iter_hosts():
+            self.add_host(group, host)
+        # Sort the addresses only once after loading them all
+        self.ipv4_addresses.sort()
+        self.hostnames.sort()
+        self.loading = False
+        self.inventory.connect(self.on_inventory_changed)
+
+    def add_address(self, value):
+        """Add a new destination value to the sorted addresses"""
+        number = get_ipv4_number(value)
+        if number is not None:
+            item, items = (number, value), self.ipv4_addresses
+        else:
+            item, items = (get_reversed_hostname(value), value), self.hostnames
+        if self.loading:
+            items.append(item)
+        else:
+            bisect.insort(items, item)
+
+    def remove_address(self, value):
+        """Remove an unused destination value from the sorted addresses"""
+        number = get_ipv4_number(value)
+        if number is not None:
+            item, items = (number, value), self.ipv4_addresses
+        else:
+            item, items = (get_reversed_hostname(value), value), self.hostnames
+        index = bisect.bisect_left(items, item)
+        if index < len(items) and items[index] == item:
+            del items[index]
+
+    def add_host(self, group, host):
+        """Add a host to the indexes"""
+        key = (group, host.name)
+        if host.name not in self.names:
+            self.sorted_names = None
+        self.names.setdefault(host.name, set()).add(group)
+        values = set([destination.value
+                      for destination in host.destinations.itervalues()])
+        self.hosts_addresses[key] = values
+        for value in values:
+            if value not in self.addresses:
+                self.addresses[value] = set()
+                self.add_address(value)
+            self.addresses[value].add(key)
+
+    def remove_host(self, group, name):
+        """Remove a host from the indexes"""
+        key = (group, name)
+        if key not in self.hosts_addresses:
+            return
+        groups = self.names[name]
+        groups.discard(group)
+        if not groups:
+            self.names.pop(name)
+            self.sorted_names = None
+        for value in self.hosts_addresses.pop(key):
+            hosts = self.addresses[value]
+            hosts.discard(key)
+            if not hosts:
+                self.addresses.pop(value)
+                self.remove_address(value)
+
+    def get_groups(self, name):
+        """Return the groups containing a host name"""
+        return self.names.get(name, set())
+
+    def get_hosts_by_address(self, value):
+        """Return the (group, host name) of the hosts using an address"""
+        return self.addresses.get(value, set())
+
+    def find_addresses(self, query):
+        """Return the destination values matching a query, an exact value,
+        an IPv4 network like 10.0.0.0/8 or a hostname suffix like
+        .example.com"""
+        query = query.strip()
+        if '/' in query:
+            address, prefix_length = query.split('/', 1)
+            number = get_ipv4_number(address)
+            if number is None or not prefix_length.isdigit():
+                return []
+            prefix_length = int(prefix_length)
+            if prefix_length > 32:
+                return []
+            mask = ((1 << prefix_length) - 1) << (32 - prefix_length)
+            first = number & mask
+            last = first | (~mask & 0xffffffff)
+            start = bisect.bisect_left(self.ipv4_addresses, (first, ))
+            end = bisect.bisect_left(self.ipv4_addresses, (last + 1, ))
+            return [value for number, value
+                    in self.ipv4_addresses[start:end]]
+        elif query.startswith('.') or query.startswith('*.'):
+            # The labels after the leading dot must match entirely
+            prefix = get_reversed_hostname(query.lstrip('*.'))
+            start = bisect.bisect_left(self.hostnames, (prefix, ))
+            end = bisect.bisect_left(self.hostnames, (prefix + '/', ))
+            return [value for reversed_name, value in self.hostnames[start:end]
+                    if reversed_name.startswith(prefix + '.')]
+        else:
+            return [query] if query in self.addresses else []
+
+    def get_hosts_by_query(self, query):
+        """Return the (group, host name) of the hosts with any destination
+        value matching a query"""
+        result = set()
+        for value in self.find_addresses(query):
+            result.update(self.addresses[value])
+        return result
+
+    def iter_names(self):
+        """Iterate over the (host name, group) pairs"""
+        for name, groups in self.names.iteritems():
+            for group in groups:
+                yield (name, group)
+
+    def get_names_by_prefix(self, prefix, limit):
+        """Return up to limit (host name, group) pairs whose host name
+        starts with prefix, case insensitively"""
+        if self.sorted_names is None:
+            self.sorted_names = sorted((name.lower(), name)
+                                       for name in self.names)
+        prefix = prefix.lower()
+        results = []
+        index = bisect.bisect_left(self.sorted_names, (prefix, ))
+        while index < len(self.sorted_names) and len(results) < limit:
+            lower_name, name = self.sorted_names[index]
+            if not lower_name.startswith(prefix):
+                break
+            for group in sorted(self.names[name]):
+                results.append((name, group))
+            index += 1
+        return results[:limit]
+
+    def on_inventory_changed(self, changes):
+        """Update the indexes for the changed hosts only"""
+        for action, group, name, host in changes:
+            self.remove_host(group, name)
+            if action == inventory.ACTION_SET:
+                self.remove_host(group, host.name)
+                self.add_host(group, host)
@@ -0,0 +1,343 @@
+##
+#     Project: gCentralAccess
+# Description: Manage external resources from a centralized management console
+#      Author: Fabio Castelli (Muflone) <muflone@vbsimple.net>
+#   Copyright: 2015-2016 Fabio Castelli
+#     License: GPL-2+
+#  This program is free software; you can redistribute it and/or modify it
+#  under the terms of the GNU General Public License as published by the Free
+#  Software Foundation; either version 2 of the License, or (at your option)
+#  any later version.
+#
+#  This program is distributed in the hope that it will be useful, but WITHOUT
+#  ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+#  FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+#  more details.
+#  You should have received a copy of the GNU General Public License along
+#  with this program; if not, write to the Free Software Foundation, Inc.,
+#  51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA
+##
+
+import os
+import os.path
+import json
+
+from gcentralaccess.constants import DIR_HOSTS, DIR_TEMPLATES
+import gcentralaccess.settings as settings
+from gcentralaccess.functions import intern_string
+
+from gcentralaccess.models.host_info import HostInfo
+from gcentralaccess.models.destination_info import DestinationInfo
+
+# Section and options for host
+SECTION_HOST = 'host'
+OPTION_HOST_NAME = 'name'
+OPTION_HOST_DESCRIPTION = 'description'
+OPTION_HOST_ASSOCIATIONS = 'associations'
+OPTION_HOST_TEMPLATE = 'template'
+OPTION_HOST_TAGS = 'tags'
+# Section for destinations
+SECTION_DESTINATIONS = 'destinations'
+# Section and options for associations
+SECTION_ASSOCIATION = 'association'
+OPTION_ASSOCIATION_DESCRIPTION = 'description'
+OPTION_ASSOCIATION_DESTINATION = 'destination'
+OPTION_ASSOCIATION_SERVICE = 'service'
+OPTION_ASSOCIATION_ARGUMENTS = 'arguments'
+# Host files
+HOST_EXTENSION = '.conf'
+TEMPORARY_EXTENSION = '.tmp'
+# Number of host files written before reporting the progress
+BATCH_SIZE = 50
+# Special group for the template hosts, group names cannot contain slashes
+GROUP_TEMPLATES = '/templates'
+# Actions for the inventory changes
+ACTION_SET = 'set'
+ACTION_REMOVE = 'remove'
+
+inventory = None
+
+
+def is_special_group(group):
+    """Return if a group is not a simple hosts folder"""
+    return group.startswith('/')
+
+
+def get_group_path(group):
+    """Return the path of a group"""
+    if group == GROUP_TEMPLATES:
+        return DIR_TEMPLATES
+    return os.path.join(DIR_HOSTS, group) if group else DIR_HOSTS
+
+
+def get_host_filename(group, name):
+    """Return the settings filename for a host"""
+    return os.path.join(get_group_path(group), '%s%s' % (name, HOST_EXTENSION))
+
+
+def get_host_signature(group, name):
+    """Return the modification time and size of a host file"""
+    try:
+        status = os.stat(get_host_filename(group, name))
+        return [status.st_mtime, status.st_size]
+    except OSError:
+        return None
+
+
+def get_host_files(group):
+    """Return the list of the host files for a group"""
+    group_path = get_group_path(group)
+    result = []
+    for filename in os.listdir(group_path):
+        # Skip folders, used for groups, and temporary files
+        if (filename.endswith(HOST_EXTENSION) and
+                not os.path.isdir(os.path.join(group_path, filename))):
+            result.append(os.path.join(group_path, filename))
+    return result
+
+
+def load_host(filename):
+    """Load a host along as with its destinations from a settings file"""
+    settings_host = settings.Settings(filename=filename, case_sensitive=True)
+    host = HostInfo(
+        name=settings_host.get(SECTION_HOST, OPTION_HOST_NAME),
+        description=settings_host.get(SECTION_HOST, OPTION_HOST_DESCRIPTION),
+        template=intern_string(settings_host.get(
+            SECTION_HOST, OPTION_HOST_TEMPLATE, '')),
+        tags=[intern_string(tag) for tag in settings_host.get_list(
+            SECTION_HOST, OPTION_HOST_TAGS) or []])
+    # Load host destinations, the repeated strings are shared by every host
+    if SECTION_DESTINATIONS in settings_host.get_sections():
+        for option in settings_host.get_options(SECTION_DESTINATIONS):
+            host.add_destination(item=DestinationInfo(
+                name=intern_string(option),
+                value=settings_host.get(SECTION_DESTINATIONS, option)))
+    # Load associations
+    association_index = 1
+    associations_count = settings_host.get_int(
+        section=SECTION_HOST, option=OPTION_HOST_ASSOCIATIONS)
+    while association_index <= associations_count:
+        section = '%s %d' % (SECTION_ASSOCIATION, association_index)
+        arguments = json.loads(settings_host.get(
+            section=section,
+            option=OPTION_ASSOCIATION_ARGUMENTS))
+        host.add_association(
+            description=intern_string(settings_host.get(
+                section=section,
+                option=OPTION_ASSOCIATION_DESCRIPTION)),
+            destination_name=intern_string(settings_host.get(
+                section=section,
+                option=OPTION_ASSOCIATION_DESTINATION)),
+            service_name=intern_string(settings_host.get(
+                section=section,
+                option=OPTION_ASSOCIATION_SERVICE)),
+            arguments=dict((intern_string(key), value)
+                           for key, value in arguments.iteritems()))
+        association_index += 1
+    return host
+
+
+def save_host(host, filename):
+    """Save a host along as with its destinations to a settings file"""
+    settings_host = settings.Settings(filename=filename, case_sensitive=True)
+    # Add host information
+    settings_host.set(SECTION_HOST, OPTION_HOST_NAME, host.name)
+    settings_host.set(SECTION_HOST, OPTION_HOST_DESCRIPTION, host.description)
+    if host.template:
+        settings_host.set(SECTION_HOST, OPTION_HOST_TEMPLATE, host.template)
+    if host.tags:
+        settings_host.set(SECTION_HOST, OPTION_HOST_TAGS, ','.join(host.tags))
+    # Add destinations
+    for destination in host.destinations.itervalues():
+        settings_host.set(section=SECTION_DESTINATIONS,
+                          option=destination.name,
+                          value=destination.value)
+    association_index = 0
+    for association in host.associations:
+        arguments = json.dumps(association.service_arguments)
+        # Add associations to the settings
+        association_index += 1
+        section = '%s %d' % (SECTION_ASSOCIATION, association_index)
+        settings_host.set(section=section,
+                          option=OPTION_ASSOCIATION_DESCRIPTION,
+                          value=association.description)
+        settings_host.set(section=section,
+                          option=OPTION_ASSOCIATION_DESTINATION,
+                          value=association.destination_name)
+        settings_host.set(section=section,
+                          option=OPTION_ASSOCIATION_SERVICE,
+                          value=association.service_name)
+        settings_host.set(section=section,
+                          option=OPTION_ASSOCIATION_ARGUMENTS,
+                          value=arguments)
+    settings_host.set_int(section=SECTION_HOST,
+                          option=OPTION_HOST_ASSOCIATIONS,
+                          value=association_index)
+    # Save the settings to the file
+    settings_host.save()
+
+
+class Transaction(object):
+    def __init__(self, inventory):
+        """Prepare a new group of host changes"""
+        self.inventory = inventory
+        self.changes = []
+
+    def set_host(self, group, host, old_name=None):
+        """Add or replace a host, optionally renaming an existing one"""
+        self.changes.append((ACTION_SET, group,
+                             old_name if old_name else host.name, host))
+
+    def remove_host(self, group, name):
+        """Remove an existing host"""
+        self.changes.append((ACTION_REMOVE, group, name, None))
+
+    def count(self):
+        """Return the number of changes in the transaction"""
+        return len(self.changes)
+
+    def commit(self, progress_cb=None):
+        """Write the changed host files in batches and then apply every
+        change to the inventory at once"""
+        changes_count = len(self.changes)
+        temporary_files = []
+        try:
+            # Write the new host files aside the existing ones
+            for index, (action, group, name, host) in enumerate(self.changes):
+                if action == ACTION_SET:
+                    filename = '%s%s' % (get_host_filename(group, host.name),
+                                         TEMPORARY_EXTENSION)
+                    save_host(host, filename)
+                    temporary_files.append(filename)
+                if progress_cb and (index + 1) % BATCH_SIZE == 0:
+                    progress_cb(index + 1, changes_count)
+        except:
+            # Discard the partially written transaction
+            for filename in temporary_files:
+                if os.path.isfile(filename):
+                    os.unlink(filename)
+            raise
+        # Replace the host files with the newly written files
+        for action, group, name, host in self.changes:
+            old_filename = get_host_filename(group, name)
+            if action == ACTION_SET:
+                filename = get_host_filename(group, host.name)
+                os.rename('%s%s' % (filename, TEMPORARY_EXTENSION), filename)
+                if name != host.name and os.path.isfile(old_filename):
+                    os.unlink(old_filename)
+            elif os.path.isfile(old_filename):
+                os.unlink(old_filename)
+        changes = self.changes
+        self.changes = []
+        self.inventory.apply(changes)
+        # Report the end only when the inventory matches the files again
+        if progress_cb:
+            progress_cb(changes_count, changes_count)
+        return changes
+
+
+class Inventory(object):
+    def __init__(self):
+        """Prepare the inventory of the hosts for every group"""
+        self.groups = {}
+        self.listeners = []
+        self.before_listeners = []
+
+    def load(self, cache=None):
+        """Load the hosts for every group from the settings files, reusing
+        the hosts of the unchanged files from the cache catalog"""
+        self.groups.clear()
+        for group in self.get_groups_from_folders():
+            self.groups[group] = {}
+            for filename in get_host_files(group):
+                host = (cache.get_cached_host(group, filename)
+                        if cache else None)
+                if host is None:
+                    host = load_host(filename)
+                self.groups[group][host.name] = host
+
+    def get_groups_from_folders(self):
+        """Return the groups list from the hosts folder"""
+        # The default group and the templates are always present
+        result = ['', GROUP_TEMPLATES]
+        for filename in os.listdir(DIR_HOSTS):
+            if os.path.isdir(os.path.join(DIR_HOSTS, filename)):
+                result.append(filename)
+        return result
+
+    def get_groups(self):
+        """Return the loaded groups"""
+        return self.groups.keys()
+
+    def get_hosts(self, group):
+        """Return the hosts dictionary for a group"""
+        return self.groups.get(group, {})
+
+    def get_host(self, group, name):
+        """Return a host from a group"""
+        return self.get_hosts(group).get(name)
+
+    def iter_hosts(self, groups=None):
+        """Iterate over the (group, host) pairs for some or every group"""
+        for group in (groups if groups is not None else self.groups.keys()):
+            for host in self.get_hosts(group).itervalues():
+                yield (group, host)
+
+    def connect(self, callback):
+        """Register a callback for the changes list of every commit"""
+        self.listeners.append(callback)
+
+    def disconnect(self, callback):
+        """Unregister a previously registered callback"""
+        self.listeners.remove(callback)
+
+    def connect_before(self, callback):
+        """Register a callback for the changes list of every commit, called
+        while the inventory still has the previous hosts"""
+        self.before_listeners.append(callback)
+
+    def begin(self):
+        """Start a new transaction"""
+        return Transaction(self)
+
+    def apply(self, changes):
+        """Apply the committed changes and notify them to the listeners"""
+        for callback in self.before_listeners:
+            callback(changes)
+        for action, group, name, host in changes:
+            hosts = self.groups.setdefault(group, {})
+            hosts.pop(name, None)
+            if action == ACTION_SET:
+                hosts[host.name] = host
+        for callback in self.listeners:
+            callback(changes)
+
+    def set_host(self, group, host, old_name=None):
+        """Save a single host"""
+        transaction = self.begin()
+        transaction.set_host(group, host, old_name)
+        transaction.commit()
+
+    def remove_host(self, group, name):
+        """Remove a single host"""
+        transaction = self.begin()
+        transaction.remove_host(group, name)
+        transaction.commit()
+
+    def add_group(self, group):
+        """Add a new empty group"""
+        os.mkdir(get_group_path(group))
+        self.groups[group] = {}
+
+    def remove_group(self, group):
+        """Remove a group along as with all its hosts"""
+        transaction = self.begin()
+        for name in self.get_hosts(group).keys():
+            transaction.remove_host(group, name)
+        transaction.commit()
+        # Delete any remaining file and the directory for the group
+        group_path = get_group_path(group)
+        for filename in os.listdir(group_path):
+            os.remove(os.path.join(group_path, filename))
+        os.rmdir(group_path)
+        self.groups.pop(group, None)
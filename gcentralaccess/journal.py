@@ -0,0 +1,283 @@
+##
+#     Project: gCentralAccess
+# Description: Manage external resources from a centralized management console
+#      Author: Fabio Castelli (Muflone) <muflone@vbsimple.net>
+#   Copyright: 2015-2016 Fabio Castelli
+#     License: GPL-2+
+#  This program is free software; you can redistribute it and/or modify it
+#  under the terms of the GNU General Public License as published by the Free
+#  Software Foundation; either version 2 of the License, or (at your option)
+#  any later version.
+#
+#  This program is distributed in the hope that it will be useful, but WITHOUT
+#  ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+#  FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+#  more details.
+#  You should have received a copy of the GNU General Public License along
+#  with this program; if not, write to the Free Software Foundation, Inc.,
+#  51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA
+##
+
+import os
+import os.path
+import json
+
+from gcentralaccess.constants import DIR_JOURNAL
+import gcentralaccess.inventory as inventory
+
+from gcentralaccess.models.host_info import HostInfo
+from gcentralaccess.models.destination_info import DestinationInfo
+
+# Maximum number of entries kept in the journal ring
+MAX_ENTRIES = 100
+FILE_STATE = 'journal.json'
+ENTRY_FILENAME = 'entry-%03d.json'
+# Host fields compared for the deltas
+FIELDS = ('description', 'template', 'tags')
+
+journal = None
+
+
+def host_to_dict(host):
+    """Return a serializable dictionary from a host"""
+    return {
+        'description': host.description,
+        'template': host.template,
+        'tags': host.tags,
+        'destinations': dict([(destination.name, destination.value)
+                              for destination
+                              in host.destinations.itervalues()]),
+        'associations': [[association.description,
+                          association.destination_name,
+                          association.service_name,
+                          association.service_arguments]
+                         for association in host.associations]}
+
+
+def dict_to_host(name, values):
+    """Return a host from a serialized dictionary"""
+    host = HostInfo(name, values['description'], values['template'],
+                    values.get('tags'))
+    for destination_name, value in values['destinations'].iteritems():
+        host.add_destination(DestinationInfo(name=destination_name,
+                                             value=value))
+    for (description, destination_name, service_name,
+            arguments) in values['associations']:
+        host.add_association(description=description,
+                             destination_name=destination_name,
+                             service_name=service_name,
+                             arguments=arguments)
+    return host
+
+
+def get_delta(old_values, new_values):
+    """Return only the changed values as [old, new] pairs"""
+    delta = {}
+    for field in FIELDS:
+        if old_values.get(field) != new_values.get(field):
+            delta[field] = [old_values.get(field), new_values.get(field)]
+    # Destinations missing on a side have a None value
+    destinations = {}
+    for name in set(old_values['destinations']).union(
+            new_values['destinations']):
+        old_value = old_values['destinations'].get(name)
+        new_value = new_values['destinations'].get(name)
+        if old_value != new_value:
+            destinations[name] = [old_value, new_value]
+    if destinations:
+        delta['destinations'] = destinations
+    # Associations changed by their position
+    old_associations = old_values['associations']
+    new_associations = new_values['associations']
+    associations = {}
+    for index in xrange(max(len(old_associations), len(new_associations))):
+        old_value = (old_associations[index]
+                     if index < len(old_associations) else None)
+        new_value = (new_associations[index]
+                     if index < len(new_associations) else None)
+        if old_value != new_value:
+            associations[str(index)] = [old_value, new_value]
+    if associations:
+        delta['associations'] = associations
+        delta['associations_count'] = [len(old_associations),
+                                       len(new_associations)]
+    return delta
+
+
+def apply_delta(values, delta, side):
+    """Return the values with the delta side applied (0 old, 1 new)"""
+    result = dict(values)
+    for field in FIELDS:
+        if field in delta:
+            result[field] = delta[field][side]
+    if 'destinations' in delta:
+        destinations = dict(values['destinations'])
+        for name, pair in delta['destinations'].iteritems():
+            if pair[side] is None:
+                destinations.pop(name, None)
+            else:
+                destinations[name] = pair[side]
+        result['destinations'] = destinations
+    if 'associations' in delta:
+        associations = delta['associations']
+        result['associations'] = [
+            associations[str(index)][side] if str(index) in associations
+            else values['associations'][index]
+            for index in xrange(delta['associations_count'][side])]
+    return result
+
+
+class Journal(object):
+    def __init__(self, hosts_inventory, path=DIR_JOURNAL,
+                 max_entries=MAX_ENTRIES):
+        """Prepare the undo/redo journal for the inventory changes"""
+        self.inventory = hosts_inventory
+        self.path = path
+        self.max_entries = max_entries
+        # Entries numbers from the oldest, to the next to redo, to the newest
+        self.first = 0
+        self.position = 0
+        self.last = 0
+        # Skip recording the changes replayed by undo and redo
+        self.replaying = False
+        self.load()
+        self.inventory.connect_before(self.on_inventory_changing)
+
+    def get_entry_filename(self, number):
+        """Return the filename of the ring slot for an entry"""
+        return os.path.join(self.path,
+                            ENTRY_FILENAME % (number % self.max_entries))
+
+    def write_file(self, filename, data):
+        """Write a JSON file replacing the previous one at once"""
+        with open('%s.tmp' % filename, 'w') as file_journal:
+            json.dump(data, file_journal, separators=(',', ':'))
+        os.rename('%s.tmp' % filename, filename)
+
+    def load(self):
+        """Load the journal state"""
+        filename = os.path.join(self.path, FILE_STATE)
+        if os.path.isfile(filename):
+            with open(filename, 'r') as file_state:
+                state = json.load(file_state)
+            self.first = state['first']
+            self.position = state['position']
+            self.last = state['last']
+
+    def save(self):
+        """Save the journal state"""
+        self.write_file(os.path.join(self.path, FILE_STATE),
+                        {'first': self.first,
+                         'position': self.position,
+                         'last': self.last})
+
+    def can_undo(self):
+        """Return if there's any entry to undo"""
+        return self.position > self.first
+
+    def can_redo(self):
+        """Return if there's any entry to redo"""
+        return self.position < self.last
+
+    def add_entry(self, records):
+        """Add a new entry discarding every entry to redo"""
+        self.write_file(self.get_entry_filename(self.position), records)
+        self.position += 1
+        self.last = self.position
+        # Overwrite the oldest entry when the ring is full
+        self.first = max(self.first, self.last - self.max_entries)
+        self.save()
+
+    def read_entry(self, number):
+        """Return the records of an entry"""
+        with open(self.get_entry_filename(number), 'r') as file_entry:
+            return json.load(file_entry)
+
+    def on_inventory_changing(self, changes):
+        """Record the deltas of the changes before they are applied"""
+        if self.replaying:
+            return
+        records = []
+        # Hosts already changed in the same commit
+        pending = {}
+        for action, group, name, host in changes:
+            key = (group, name)
+            old_host = (pending[key] if key in pending
+                        else self.inventory.get_host(group, name))
+            pending[key] = None
+            new_name = host.name if action == inventory.ACTION_SET else None
+            if new_name is not None:
+                pending[(group, new_name)] = host
+            if old_host is None and new_name is None:
+                continue
+            record = {'group': group,
+                      'old': name if old_host is not None else None,
+                      'new': new_name}
+            if old_host is None:
+                record['host'] = host_to_dict(host)
+            elif new_name is None:
+                record['host'] = host_to_dict(old_host)
+            else:
+                record['delta'] = get_delta(host_to_dict(old_host),
+                                            host_to_dict(host))
+            records.append(record)
+        if records:
+            self.add_entry(records)
+
+    def replay(self, records, side, progress_cb=None):
+        """Write the records side (0 old, 1 new) in a single transaction"""
+        source, target = ('new', 'old') if side == 0 else ('old', 'new')
+        transaction = self.inventory.begin()
+        # Hosts already changed in the same transaction
+        pending = {}
+        for record in (reversed(records) if side == 0 else records):
+            group = record['group']
+            if group not in self.inventory.get_groups():
+                # Restore the removed groups
+                self.inventory.add_group(group)
+            source_name = record[source]
+            target_name = record[target]
+            if target_name is None:
+                transaction.remove_host(group, source_name)
+                pending[(group, source_name)] = None
+                continue
+            if source_name is None:
+                values = record['host']
+            else:
+                key = (group, source_name)
+                current = (pending[key] if key in pending
+                           else self.inventory.get_host(group, source_name))
+                if current is None:
+                    # Skip the hosts removed outside the journal
+                    continue
+                values = apply_delta(host_to_dict(current),
+                                     record['delta'], side)
+            host = dict_to_host(target_name, values)
+            transaction.set_host(group, host, source_name)
+            if source_name is not None:
+                pending[(group, source_name)] = None
+            pending[(group, target_name)] = host
+        self.replaying = True
+        try:
+            return transaction.commit(progress_cb)
+        finally:
+            self.replaying = False
+
+    def undo(self, progress_cb=None):
+        """Revert the last entry and return the applied changes"""
+        if not self.can_undo():
+            return []
+        changes = self.replay(self.read_entry(self.position - 1), 0,
+                              progress_cb)
+        self.position -= 1
+        self.save()
+        return changes
+
+    def redo(self, progress_cb=None):
+        """Apply again the last reverted entry and return the changes"""
+        if not self.can_redo():
+            return []
+        changes = self.replay(self.read_entry(self.position), 1, progress_cb)
+        self.position += 1
+        self.save()
+        return changes
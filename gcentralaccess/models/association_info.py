@@ -20,6 +20,9 @@
 
 
 class AssociationInfo(object):
+    __slots__ = ('description', 'destination_name', 'service_name',
+                 'service_arguments')
+
     def __init__(self, description, destination_name, service_name, arguments):
         self.description = description
         self.destination_name = destination_name
@@ -20,6 +20,7 @@
 
 import json
 
+import gcentralaccess.pixbuf_cache as pixbuf_cache
 from gcentralaccess.models.abstract import ModelAbstract
 
 
@@ -27,36 +28,32 @@ class ModelAssociations(ModelAbstract):
     COL_DESCRIPTION = 1
     COL_DESTINATION = 2
     COL_SERVICE_NAME = 3
-    COL_SERVICE_DESCRIPTION = 4
-    COL_SERVICE_ICON = 5
-    COL_SERVICE_ARGUMENTS = 6
+    COL_ASSOCIATION = 4
+    COL_SERVICE = 5
 
-    def add_data(self, index, name, description, service, arguments):
+    def add_data(self, index, association, service):
         """Add a new row to the model if it doesn't exists"""
         super(self.__class__, self).add_data(service)
         if index not in self.rows:
             new_row = self.model.append((
                 index,
-                description,
-                name,
+                association.description,
+                association.destination_name,
                 service.name,
-                service.description,
-                None,
-                json.dumps(arguments)))
+                association,
+                service))
             self.rows[index] = new_row
             return new_row
 
-    def set_data(self, treeiter, description, destination_name, service,
-                 arguments):
+    def set_data(self, treeiter, association, service):
         """Update an existing TreeIter"""
-        self.model.set_value(treeiter, self.COL_DESCRIPTION, description)
-        self.model.set_value(treeiter, self.COL_DESTINATION, destination_name)
+        self.model.set_value(treeiter, self.COL_DESCRIPTION,
+                             association.description)
+        self.model.set_value(treeiter, self.COL_DESTINATION,
+                             association.destination_name)
         self.model.set_value(treeiter, self.COL_SERVICE_NAME, service.name)
-        self.model.set_value(treeiter, self.COL_SERVICE_DESCRIPTION,
-                             service.description)
-        self.model.set_value(treeiter, self.COL_SERVICE_ICON, None)
-        self.model.set_value(treeiter, self.COL_SERVICE_ARGUMENTS,
-                             json.dumps(arguments))
+        self.model.set_value(treeiter, self.COL_ASSOCIATION, association)
+        self.model.set_value(treeiter, self.COL_SERVICE, service)
 
     def get_destination_name(self, treeiter):
         """Get the destination from a TreeIter"""
@@ -70,18 +67,34 @@ class ModelAssociations(ModelAbstract):
         """Get the service name from a TreeIter"""
         return self.model[treeiter][self.COL_SERVICE_NAME]
 
+    def get_association(self, treeiter):
+        """Get the AssociationInfo from a TreeIter"""
+        return self.model[treeiter][self.COL_ASSOCIATION]
+
     def get_arguments(self, treeiter):
         """Get the service arguments from a TreeIter"""
-        return self.model[treeiter][self.COL_SERVICE_ARGUMENTS]
+        return self.get_association(treeiter).service_arguments
+
+    def cell_icon_data(self, column, cell, model, treeiter, data):
+        """Render the service icon of an association"""
+        pixbuf_cache.set_cell_icon(column, cell,
+                                   model[treeiter][self.COL_SERVICE].icon)
+
+    def refresh_icons(self, paths):
+        """Update the rows of the icons loaded in background"""
+        for treeiter in self.rows.itervalues():
+            if self.model[treeiter][self.COL_SERVICE].icon in paths:
+                self.model.row_changed(self.get_path(treeiter), treeiter)
+
+    def cell_arguments_data(self, column, cell, model, treeiter, data):
+        """Render the service arguments of an association"""
+        cell.set_property('text', json.dumps(
+            model[treeiter][self.COL_ASSOCIATION].service_arguments))
 
     def dump(self):
         """Extract the model data to a dict object"""
         super(self.__class__, self).dump()
         result = {}
         for key in self.rows.iterkeys():
-            result[key] = (
-                self.get_destination_name(self.rows[key]),
-                self.get_description(self.rows[key]),
-                self.get_service_name(self.rows[key]),
-                self.get_arguments(self.rows[key]))
+            result[key] = self.get_association(self.rows[key])
         return result
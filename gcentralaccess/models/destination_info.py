@@ -20,6 +20,8 @@
 
 
 class DestinationInfo(object):
+    __slots__ = ('name', 'value')
+
     def __init__(self, name, value):
         self.name = name
         self.value = value
@@ -20,6 +20,8 @@
 
 
 class GroupInfo(object):
+    __slots__ = ('name', 'description')
+
     def __init__(self, name, description):
         self.name = name
         self.description = description
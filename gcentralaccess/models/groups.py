@@ -34,6 +34,12 @@ class ModelGroups(ModelAbstract):
             self.rows[item.name] = new_row
             return new_row
 
+    def set_data(self, treeiter, item):
+        """Update an existing TreeIter"""
+        super(self.__class__, self).set_data(treeiter, item)
+        self.model.set_value(treeiter, self.COL_KEY, item.name)
+        self.model.set_value(treeiter, self.COL_DESCRIPTION, item.description)
+
     def get_description(self, treeiter):
         """Get the description from a TreeIter"""
         return self.model[treeiter][self.COL_DESCRIPTION]
@@ -22,36 +22,68 @@ from gcentralaccess.models.association_info import AssociationInfo
 
 
 class HostInfo(object):
-    def __init__(self, name, description):
+    __slots__ = ('name', 'description', 'template', 'tags', 'destinations',
+                 'associations', 'shared_destinations', 'shared_associations')
+
+    def __init__(self, name, description, template='', tags=None):
         self.name = name
         self.description = description
+        self.template = template
+        self.tags = tags if tags else []
         self.destinations = {}
         self.associations = []
+        # Destinations and associations shared with a cloned host
+        self.shared_destinations = False
+        self.shared_associations = False
+
+    def clone(self, name, description=None, template=None, tags=None):
+        """Return a new host sharing the destinations and the associations
+        with this host until any of them is changed"""
+        host = HostInfo(
+            name=name,
+            description=(self.description if description is None
+                         else description),
+            template=self.template if template is None else template,
+            tags=list(self.tags) if tags is None else tags)
+        host.destinations = self.destinations
+        host.associations = self.associations
+        self.shared_destinations = host.shared_destinations = True
+        self.shared_associations = host.shared_associations = True
+        return host
+
+    def unshare_destinations(self):
+        """Copy the shared destinations before changing them"""
+        if self.shared_destinations:
+            self.destinations = dict(self.destinations)
+            self.shared_destinations = False
+
+    def unshare_associations(self):
+        """Copy the shared associations before changing them"""
+        if self.shared_associations:
+            self.associations = list(self.associations)
+            self.shared_associations = False
 
     def add_destination(self, item):
         """Add a new DestinationInfo object to destinations"""
+        self.unshare_destinations()
         self.destinations[item.name] = item
 
     def clear_destinations(self):
         """Remove any destinations"""
+        self.unshare_destinations()
         while self.destinations:
             self.destinations.popitem()
 
     def add_association(self, description, destination_name, service_name,
                         arguments):
         """Add a new AssociationInfo object to the host"""
+        self.unshare_associations()
         self.associations.append(AssociationInfo(description,
                                                  destination_name,
                                                  service_name,
                                                  arguments))
 
-    def find_association(self, description, destination, service, arguments):
-        """Find the AssociationInfo with the corresponding arguments"""
-        for association in self.associations:
-            if (association.description == description and
-                    association.destination_name == destination and
-                    association.service_name == service and
-                    association.service_arguments == arguments):
-                return association
-        else:
-            return None
+    def add_association_info(self, item):
+        """Add an existing AssociationInfo object to the host"""
+        self.unshare_associations()
+        self.associations.append(item)
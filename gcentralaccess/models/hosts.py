@@ -18,15 +18,17 @@
 #  51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA
 ##
 
+import json
+
+import gcentralaccess.pixbuf_cache as pixbuf_cache
 from gcentralaccess.models.abstract import ModelAbstract
 
 
 class ModelHosts(ModelAbstract):
     COL_DESCRIPTION = 1
     COL_SERVICE = 2
-    COL_ICON = 3
-    COL_SERVICE_ARGUMENTS = 4
-    COL_ASSOCIATION = 5
+    COL_ASSOCIATION = 3
+    COL_SERVICE_INFO = 4
 
     def add_data(self, item):
         """Add a new row to the model if it doesn't exists"""
@@ -36,8 +38,7 @@ class ModelHosts(ModelAbstract):
                                                item.description,
                                                '',
                                                None,
-                                               '',
-                                               ''))
+                                               None))
             self.rows[item.name] = new_row
             return new_row
 
@@ -59,21 +60,46 @@ class ModelHosts(ModelAbstract):
         """Get the service from a TreeIter"""
         return self.model[treeiter][self.COL_SERVICE]
 
-    def get_arguments(self, treeiter):
-        """Get the service arguments from a TreeIter"""
-        return self.model[treeiter][self.COL_SERVICE_ARGUMENTS]
-
     def get_association(self, treeiter):
-        """Get the association from a TreeIter"""
+        """Get the AssociationInfo from a TreeIter"""
         return self.model[treeiter][self.COL_ASSOCIATION]
 
-    def add_association(self, treeiter, description, destination, service,
-                        arguments):
+    def get_service_info(self, treeiter):
+        """Get the ServiceInfo from a TreeIter"""
+        return self.model[treeiter][self.COL_SERVICE_INFO]
+
+    def add_association(self, treeiter, association, destination, service):
         """Add a new row to the model if it doesn't exists"""
         new_row = self.model.append(treeiter, (destination.name,
                                                destination.value,
                                                service.name,
-                                               service.pixbuf,
-                                               arguments,
-                                               description))
+                                               association,
+                                               service))
         return new_row
+
+    def cell_icon_data(self, column, cell, model, treeiter, data):
+        """Render the service icon of an association row"""
+        service = model[treeiter][self.COL_SERVICE_INFO]
+        pixbuf_cache.set_cell_icon(column, cell,
+                                   service.icon if service else None)
+
+    def refresh_icons(self, paths):
+        """Update the association rows of the icons loaded in background"""
+        def refresh_row(model, path, treeiter, data):
+            service = model[treeiter][self.COL_SERVICE_INFO]
+            if service and service.icon in paths:
+                model.row_changed(path, treeiter)
+        self.model.foreach(refresh_row, None)
+
+    def cell_association_data(self, column, cell, model, treeiter, data):
+        """Render the description of an association row"""
+        association = model[treeiter][self.COL_ASSOCIATION]
+        cell.set_property('text',
+                          association.description if association else '')
+
+    def cell_arguments_data(self, column, cell, model, treeiter, data):
+        """Render the service arguments of an association row"""
+        association = model[treeiter][self.COL_ASSOCIATION]
+        cell.set_property('text',
+                          json.dumps(association.service_arguments)
+                          if association else '')
@@ -20,6 +20,9 @@
 
 
 class ProcessInfo(object):
+    __slots__ = ('host_name', 'destination_name', 'destination_value',
+                 'service_name', 'status', 'pid')
+
     def __init__(self, host, destination, service, process):
         self.host_name = host.name
         self.destination_name = destination.name
@@ -0,0 +1,53 @@
+##
+#     Project: gCentralAccess
+# Description: Manage external resources from a centralized management console
+#      Author: Fabio Castelli (Muflone) <muflone@vbsimple.net>
+#   Copyright: 2015-2016 Fabio Castelli
+#     License: GPL-2+
+#  This program is free software; you can redistribute it and/or modify it
+#  under the terms of the GNU General Public License as published by the Free
+#  Software Foundation; either version 2 of the License, or (at your option)
+#  any later version.
+#
+#  This program is distributed in the hope that it will be useful, but WITHOUT
+#  ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+#  FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+#  more details.
+#  You should have received a copy of the GNU General Public License along
+#  with this program; if not, write to the Free Software Foundation, Inc.,
+#  51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA
+##
+import collections
+
+# Maximum number of bytes kept of the output of every process
+MAX_OUTPUT_SIZE = 65536
+
+
+class ProcessOutput(object):
+    __slots__ = ('chunks', 'size', 'max_size', 'discarded')
+
+    def __init__(self, max_size=MAX_OUTPUT_SIZE):
+        """Keep only the last bytes written by a process"""
+        self.chunks = collections.deque()
+        self.size = 0
+        self.max_size = max_size
+        self.discarded = 0
+
+    def append(self, data):
+        """Add the data discarding the oldest bytes beyond the maximum"""
+        self.chunks.append(data)
+        self.size += len(data)
+        while self.size > self.max_size:
+            excess = self.size - self.max_size
+            chunk = self.chunks[0]
+            if len(chunk) <= excess:
+                self.chunks.popleft()
+                excess = len(chunk)
+            else:
+                self.chunks[0] = chunk[excess:]
+            self.size -= excess
+            self.discarded += excess
+
+    def get_text(self):
+        """Return the kept output as text"""
+        return ''.join(self.chunks).decode('utf-8', 'replace')
@@ -20,8 +20,7 @@
 
 import time
 
-from gi.repository import Gtk
-
+import gcentralaccess.pixbuf_cache as pixbuf_cache
 from gcentralaccess.models.abstract import ModelAbstract
 
 processes = {}
@@ -36,10 +35,6 @@ class ModelProcesses(ModelAbstract):
     COL_PID = 6
     COL_ICON = 7
 
-    def __init__(self, model):
-        super(self.__class__, self).__init__(model)
-        self.theme = Gtk.IconTheme.get_default()
-
     def add_data(self, item):
         """Add a new row to the model"""
         super(self.__class__, self).add_data(item)
@@ -78,9 +73,7 @@ class ModelProcesses(ModelAbstract):
 
     def get_pixbuf_from_icon_name(self, icon):
         """Get a standard icon from theme"""
-        return self.theme.load_icon(icon_name=icon,
-                                    size=24,
-                                    flags=Gtk.IconLookupFlags.USE_BUILTIN)
+        return pixbuf_cache.theme_icons.get_icon(icon, 24)
 
     def get_description(self, treeiter):
         """Get the description from a TreeIter"""
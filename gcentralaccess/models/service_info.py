@@ -18,19 +18,16 @@
 #  51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA
 ##
 
-from gi.repository import GdkPixbuf
-
-import gcentralaccess.preferences as preferences
-
 
 class ServiceInfo(object):
-    def __init__(self, name, description, command, terminal, icon):
+    __slots__ = ('name', 'description', 'command', 'terminal', 'icon',
+                 'log')
+
+    def __init__(self, name, description, command, terminal, icon,
+                 log=False):
         self.name = name
         self.description = description
         self.command = command
         self.terminal = terminal
         self.icon = icon
-        self.pixbuf = GdkPixbuf.Pixbuf.new_from_file_at_size(
-            icon,
-            preferences.get(preferences.ICON_SIZE),
-            preferences.get(preferences.ICON_SIZE)) if icon else None
+        self.log = log
@@ -18,9 +18,7 @@
 #  51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA
 ##
 
-from gi.repository import GdkPixbuf
-
-import gcentralaccess.preferences as preferences
+import gcentralaccess.pixbuf_cache as pixbuf_cache
 
 from gcentralaccess.models.abstract import ModelAbstract
 from gcentralaccess.models.service_info import ServiceInfo
@@ -33,25 +31,20 @@ class ModelServices(ModelAbstract):
     COL_COMMAND = 2
     COL_TERMINAL = 3
     COL_ICON = 4
-    COL_PIXBUF = 5
+    COL_LOG = 5
 
     def add_data(self, item):
         """Add a new row to the model if it doesn't exists"""
         super(self.__class__, self).add_data(item)
         if item.name not in self.rows:
             icon = item.icon if item.icon is not None else ''
-            icon_size = preferences.get(preferences.ICON_SIZE)
-            pixbuf = None if icon == '' else \
-                GdkPixbuf.Pixbuf.new_from_file_at_size(item.icon,
-                                                       icon_size,
-                                                       icon_size)
             new_row = self.model.append((
                 item.name,
                 item.description,
                 item.command,
                 item.terminal,
                 icon,
-                pixbuf))
+                item.log))
             self.rows[item.name] = new_row
             return new_row
 
@@ -59,17 +52,12 @@ class ModelServices(ModelAbstract):
         """Update an existing TreeIter"""
         super(self.__class__, self).set_data(treeiter, item)
         icon = item.icon if item.icon is not None else ''
-        icon_size = preferences.get(preferences.ICON_SIZE)
-        pixbuf = None if icon == '' else \
-            GdkPixbuf.Pixbuf.new_from_file_at_size(item.icon,
-                                                   icon_size,
-                                                   icon_size)
         self.model.set_value(treeiter, self.COL_KEY, item.name)
         self.model.set_value(treeiter, self.COL_DESCRIPTION, item.description)
         self.model.set_value(treeiter, self.COL_COMMAND, item.command)
         self.model.set_value(treeiter, self.COL_TERMINAL, item.terminal)
         self.model.set_value(treeiter, self.COL_ICON, icon)
-        self.model.set_value(treeiter, self.COL_PIXBUF, pixbuf)
+        self.model.set_value(treeiter, self.COL_LOG, item.log)
 
     def get_description(self, treeiter):
         """Get the description from a TreeIter"""
@@ -87,6 +75,21 @@ class ModelServices(ModelAbstract):
         """Get the icon from a TreeIter"""
         return self.model[treeiter][self.COL_ICON]
 
+    def get_log(self, treeiter):
+        """Get the log flag from a TreeIter"""
+        return self.model[treeiter][self.COL_LOG]
+
+    def cell_icon_data(self, column, cell, model, treeiter, data):
+        """Render the service icon, loading it on the first use"""
+        pixbuf_cache.set_cell_icon(column, cell,
+                                   model[treeiter][self.COL_ICON])
+
+    def refresh_icons(self, paths):
+        """Update the rows of the icons loaded in background"""
+        for treeiter in self.rows.itervalues():
+            if self.get_icon(treeiter) in paths:
+                self.model.row_changed(self.get_path(treeiter), treeiter)
+
     def dump(self):
         """Extract the model data to a dict object"""
         super(self.__class__, self).dump()
@@ -97,5 +100,6 @@ class ModelServices(ModelAbstract):
                 description=self.get_description(self.rows[key]),
                 command=self.get_command(self.rows[key]),
                 terminal=self.get_terminal(self.rows[key]),
-                icon=self.get_icon(self.rows[key]))
+                icon=self.get_icon(self.rows[key]),
+                log=self.get_log(self.rows[key]))
         return result
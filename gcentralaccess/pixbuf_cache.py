@@ -0,0 +1,415 @@
+##
+#     Project: gCentralAccess
+# Description: Manage external resources from a centralized management console
+#      Author: Fabio Castelli (Muflone) <muflone@vbsimple.net>
+#   Copyright: 2015-2016 Fabio Castelli
+#     License: GPL-2+
+#  This program is free software; you can redistribute it and/or modify it
+#  under the terms of the GNU General Public License as published by the Free
+#  Software Foundation; either version 2 of the License, or (at your option)
+#  any later version.
+#
+#  This program is distributed in the hope that it will be useful, but WITHOUT
+#  ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+#  FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+#  more details.
+#  You should have received a copy of the GNU General Public License along
+#  with this program; if not, write to the Free Software Foundation, Inc.,
+#  51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA
+##
+import os
+import collections
+import hashlib
+import threading
+import Queue
+
+from gi.repository import Gtk
+from gi.repository import Gdk
+from gi.repository import GdkPixbuf
+from gi.repository import GLib
+
+from gcentralaccess.constants import DIR_ICONS_CACHE
+import gcentralaccess.preferences as preferences
+
+# Maximum number of decoded pixbufs to keep
+MAX_PIXBUFS = 256
+# Icon shown in place of the icons which cannot be decoded
+PLACEHOLDER_ICON_NAME = 'image-missing'
+# Icon shown in place of the icons still being loaded
+LOADING_ICON_NAME = 'image-loading'
+# Size of the blocks read from the icon files
+READ_SIZE = 65536
+# Maximum size in bytes of the rendered icons saved on disk
+MAX_RENDERED_SIZE = 16 * 1024 * 1024
+# Seconds between the checks for changes of the loaded icon files
+CHECK_INTERVAL = 10
+
+
+def load_pixbuf(path, size):
+    """Read and decode an icon file scaled to fit in a square of size
+    pixels, returning None for the invalid files"""
+    def on_size_prepared(loader, width, height):
+        """Keep the aspect ratio while scaling"""
+        if width > height:
+            loader.set_size(size, max(1, height * size // width))
+        else:
+            loader.set_size(max(1, width * size // height), size)
+    loader = GdkPixbuf.PixbufLoader()
+    loader.connect('size-prepared', on_size_prepared)
+    try:
+        with open(path, 'rb') as icon_file:
+            data = icon_file.read(READ_SIZE)
+            while data:
+                loader.write(data)
+                data = icon_file.read(READ_SIZE)
+        loader.close()
+    except (IOError, GLib.Error):
+        try:
+            loader.close()
+        except GLib.Error:
+            pass
+        return None
+    return loader.get_pixbuf()
+
+
+class RenderedIcons(object):
+    def __init__(self, directory, max_size=MAX_RENDERED_SIZE):
+        """Save the rendered icons on disk as raw pixels, to skip the
+        decoding of the icon files on the next start"""
+        self.directory = directory
+        self.max_size = max_size
+        # Total size of the saved icons, read on the first save
+        self.size = None
+        self.lock = threading.Lock()
+
+    def get_filename(self, key):
+        """Return the filename for a (path, size, scale, mtime) key"""
+        return os.path.join(self.directory,
+                            '%s.rgba' % hashlib.sha1(repr(key)).hexdigest())
+
+    def load(self, key):
+        """Return the saved pixbuf for a key or None"""
+        filename = self.get_filename(key)
+        try:
+            with open(filename, 'rb') as icon_file:
+                width, height, rowstride, has_alpha = [
+                    int(value) for value in icon_file.readline().split()]
+                data = icon_file.read()
+            # Mark the icon as recently used
+            os.utime(filename, None)
+        except (IOError, OSError, ValueError):
+            return None
+        if len(data) < (height - 1) * rowstride + width * (
+                4 if has_alpha else 3):
+            return None
+        return GdkPixbuf.Pixbuf.new_from_bytes(
+            GLib.Bytes.new(data), GdkPixbuf.Colorspace.RGB, bool(has_alpha),
+            8, width, height, rowstride)
+
+    def save(self, key, pixbuf):
+        """Save the pixels of a pixbuf for a key"""
+        if (key[3] is None or pixbuf is None or
+                pixbuf.get_bits_per_sample() != 8 or
+                pixbuf.get_n_channels() != (4 if pixbuf.get_has_alpha()
+                                            else 3)):
+            return
+        filename = self.get_filename(key)
+        data = pixbuf.get_pixels()
+        try:
+            with open('%s.tmp' % filename, 'wb') as icon_file:
+                icon_file.write('%d %d %d %d\n' % (
+                    pixbuf.get_width(), pixbuf.get_height(),
+                    pixbuf.get_rowstride(), int(pixbuf.get_has_alpha())))
+                icon_file.write(data)
+            os.rename('%s.tmp' % filename, filename)
+        except (IOError, OSError):
+            return
+        with self.lock:
+            if self.size is None:
+                self.size = sum(size for size, mtime, filename
+                                in self.get_files())
+            else:
+                self.size += len(data)
+            if self.size > self.max_size:
+                self.evict()
+
+    def get_files(self):
+        """Return the (size, mtime, filename) of the saved icons"""
+        result = []
+        for filename in os.listdir(self.directory):
+            filename = os.path.join(self.directory, filename)
+            try:
+                result.append((os.path.getsize(filename),
+                               os.path.getmtime(filename),
+                               filename))
+            except OSError:
+                pass
+        return result
+
+    def evict(self):
+        """Remove the least recently used icons down to three quarters of
+        the maximum size"""
+        files = self.get_files()
+        self.size = sum(size for size, mtime, filename in files)
+        for size, mtime, filename in sorted(files, key=lambda item: item[1]):
+            if self.size <= self.max_size * 3 // 4:
+                break
+            try:
+                os.remove(filename)
+                self.size -= size
+            except OSError:
+                pass
+
+
+class PixbufCache(object):
+    def __init__(self, max_pixbufs=MAX_PIXBUFS, rendered=None):
+        """Keep the most recently used pixbufs decoded from the icon files"""
+        self.max_pixbufs = max_pixbufs
+        self.rendered = rendered
+        # Pixbufs by (path, size, scale, mtime) in the order of use
+        self.pixbufs = collections.OrderedDict()
+        # Cairo surfaces of the pixbufs for their scale factor
+        self.surfaces = {}
+        # Last loaded key by (path, size, scale), to find the pixbufs
+        # without reading the file modification time on the main thread
+        self.current = {}
+        # The loaded icon files are checked for changes in background
+        self.checking = False
+        self.hits = 0
+        self.misses = 0
+        # Icons requested to the background loader and its results
+        self.pending = set()
+        self.requests = Queue.Queue()
+        self.loaded = []
+        self.loaded_lock = threading.Lock()
+        self.worker = None
+        self.listeners = []
+
+    def store(self, key, pixbuf):
+        """Store a pixbuf as the most recently used"""
+        self.pixbufs.pop(key, None)
+        if len(self.pixbufs) >= self.max_pixbufs:
+            # Discard the least recently used pixbuf
+            old_key = self.pixbufs.popitem(last=False)[0]
+            self.surfaces.pop(old_key, None)
+            if self.current.get(old_key[:3]) == old_key:
+                self.current.pop(old_key[:3])
+        self.pixbufs[key] = pixbuf
+        self.current[key[:3]] = key
+
+    def render(self, key):
+        """Return the pixbuf for a (path, size, scale, mtime) key, reading
+        it from the rendered icons or decoding the icon file"""
+        pixbuf = self.rendered.load(key) if self.rendered else None
+        if pixbuf is None:
+            pixbuf = load_pixbuf(key[0], key[1] * key[2])
+            if self.rendered:
+                self.rendered.save(key, pixbuf)
+        return pixbuf
+
+    def get_pixbuf(self, path, size, scale=1):
+        """Return the pixbuf of an icon file or None for invalid files,
+        decoding it only if the file was never decoded before at the same
+        size or it was changed"""
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            mtime = None
+        key = (path, size, scale, mtime)
+        if key in self.pixbufs:
+            self.hits += 1
+            pixbuf = self.pixbufs[key]
+        else:
+            self.misses += 1
+            # Remember the invalid files too
+            pixbuf = self.render(key)
+        self.store(key, pixbuf)
+        return pixbuf
+
+    def request_pixbuf(self, path, size, scale=1):
+        """Return the pixbuf of an already loaded icon file, otherwise
+        return None and load it in background"""
+        key = self.current.get((path, size, scale))
+        if key is not None:
+            self.hits += 1
+            pixbuf = self.pixbufs[key]
+            self.store(key, pixbuf)
+            return pixbuf
+        if (path, size, scale) not in self.pending:
+            self.misses += 1
+            self.pending.add((path, size, scale))
+            self.requests.put((path, size, scale))
+            if self.worker is None:
+                self.worker = threading.Thread(target=self.load_requests,
+                                               name='icons loader')
+                self.worker.daemon = True
+                self.worker.start()
+                GLib.timeout_add_seconds(CHECK_INTERVAL,
+                                         self.on_check_timeout)
+        return None
+
+    def request_surface(self, path, size, scale):
+        """Return the cairo surface of an already loaded icon file for a
+        scale factor, otherwise return None and load it in background"""
+        pixbuf = self.request_pixbuf(path, size, scale)
+        if pixbuf is None:
+            return None
+        key = self.current[(path, size, scale)]
+        surface = self.surfaces.get(key)
+        if surface is None:
+            # The same surface is shared by every widget with that scale
+            surface = Gdk.cairo_surface_create_from_pixbuf(pixbuf, scale, None)
+            self.surfaces[key] = surface
+        return surface
+
+    def is_loading(self, path, size, scale=1):
+        """Return if an icon file is being loaded in background"""
+        return (path, size, scale) in self.pending
+
+    def load_requests(self):
+        """Load the requested icons in the worker thread"""
+        while True:
+            request = self.requests.get()
+            if request is None:
+                self.check_loaded()
+                continue
+            path, size, scale = request
+            try:
+                mtime = os.path.getmtime(path)
+            except OSError:
+                mtime = None
+            key = (path, size, scale, mtime)
+            self.add_loaded(key, self.render(key))
+
+    def add_loaded(self, key, pixbuf):
+        """Add an icon loaded in the worker thread to the delivery"""
+        with self.loaded_lock:
+            if not self.loaded:
+                # Deliver the loaded icons in batches on the main loop
+                GLib.idle_add(self.deliver_loaded,
+                              priority=GLib.PRIORITY_LOW)
+            self.loaded.append((key, pixbuf))
+
+    def on_check_timeout(self):
+        """Request the check of the loaded icon files to the worker"""
+        if self.current and not self.checking:
+            self.checking = True
+            self.requests.put(None)
+        return True
+
+    def check_loaded(self):
+        """Load again the changed icon files in the worker thread"""
+        for key in self.current.values():
+            path, size, scale, mtime = key
+            try:
+                new_mtime = os.path.getmtime(path)
+            except OSError:
+                new_mtime = None
+            if new_mtime != mtime:
+                new_key = (path, size, scale, new_mtime)
+                self.add_loaded(new_key, self.render(new_key))
+        self.checking = False
+
+    def deliver_loaded(self):
+        """Store the icons loaded in background and notify the listeners"""
+        with self.loaded_lock:
+            loaded = self.loaded
+            self.loaded = []
+        paths = set()
+        for key, pixbuf in loaded:
+            self.store(key, pixbuf)
+            self.pending.discard(key[:3])
+            paths.add(key[0])
+        for callback in self.listeners:
+            callback(paths)
+        return False
+
+    def get_icon(self, path):
+        """Return the pixbuf of an icon file at the preferred icon size or
+        None for a missing or invalid icon"""
+        if not path:
+            return None
+        return self.get_pixbuf(path, preferences.get(preferences.ICON_SIZE))
+
+    def connect(self, callback):
+        """Register a callback for the paths of the icons loaded in
+        background"""
+        self.listeners.append(callback)
+
+    def disconnect(self, callback):
+        """Unregister a previously registered callback"""
+        self.listeners.remove(callback)
+
+    def clear(self):
+        """Discard every decoded pixbuf"""
+        self.pixbufs.clear()
+        self.surfaces.clear()
+        self.current.clear()
+
+
+class ThemeIcons(object):
+    def __init__(self):
+        """Keep the pixbufs loaded from the icon theme until the theme
+        is changed"""
+        self.theme = None
+        # Pixbufs by (icon name, size, scale)
+        self.pixbufs = {}
+
+    def get_icon(self, name, size, scale=1):
+        """Return the pixbuf of a theme icon or None if not found"""
+        key = (name, size, scale)
+        if key not in self.pixbufs:
+            if self.theme is None:
+                self.theme = Gtk.IconTheme.get_default()
+                self.theme.connect('changed', self.on_theme_changed)
+            try:
+                if not Gtk.check_version(3, 10, 0):
+                    self.pixbufs[key] = self.theme.load_icon_for_scale(
+                        name, size, scale, Gtk.IconLookupFlags.USE_BUILTIN)
+                else:
+                    # The scale factors are only for GTK+ 3.10.0 and higher
+                    self.pixbufs[key] = self.theme.load_icon(
+                        name, size, Gtk.IconLookupFlags.USE_BUILTIN)
+            except GLib.Error:
+                self.pixbufs[key] = None
+        return self.pixbufs[key]
+
+    def on_theme_changed(self, theme):
+        """Discard the icons of the previous theme"""
+        self.pixbufs.clear()
+
+
+def set_cell_icon(cell_layout, cell, path):
+    """Render an icon file in a GtkCellRendererPixbuf at the scale factor
+    of its widget, using a placeholder for the icon files still loading or
+    which cannot be decoded"""
+    # The cairo surfaces and the scale factors are only for GTK+ 3.10.0
+    # and higher, the older versions render the pixbufs
+    has_surfaces = not Gtk.check_version(3, 10, 0)
+    icon_property = 'surface' if has_surfaces else 'pixbuf'
+    if not path:
+        cell.set_property(icon_property, None)
+        return
+    size = preferences.get(preferences.ICON_SIZE)
+    if has_surfaces:
+        widget = (cell_layout.get_tree_view()
+                  if isinstance(cell_layout, Gtk.TreeViewColumn)
+                  else cell_layout)
+        # The widgets moved to another monitor are drawn again with the
+        # new scale factor, rendering the icon again only then
+        scale = widget.get_scale_factor() if widget else 1
+        icon = pixbuf_cache.request_surface(path, size, scale)
+    else:
+        scale = 1
+        icon = pixbuf_cache.request_pixbuf(path, size, scale)
+    if icon is None:
+        cell.set_property('icon-name',
+                          LOADING_ICON_NAME
+                          if pixbuf_cache.is_loading(path, size, scale)
+                          else PLACEHOLDER_ICON_NAME)
+    else:
+        cell.set_property(icon_property, icon)
+
+
+pixbuf_cache = PixbufCache(rendered=RenderedIcons(DIR_ICONS_CACHE))
+theme_icons = ThemeIcons()
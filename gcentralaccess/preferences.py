@@ -51,6 +51,12 @@ DEFAULT_VALUES[HEADERBARS_SYMBOLIC_ICONS] = (SECTION_HEADERBARS, False)
 HEADERBARS_REMOVE_TOOLBAR = 'remove toolbar'
 DEFAULT_VALUES[HEADERBARS_REMOVE_TOOLBAR] = (SECTION_HEADERBARS, True)
 
+LAUNCH_CONCURRENCY = 'launch concurrency'
+DEFAULT_VALUES[LAUNCH_CONCURRENCY] = (SECTION_PREFERENCES, 10)
+
+LAUNCH_DELAY = 'launch delay'
+DEFAULT_VALUES[LAUNCH_DELAY] = (SECTION_PREFERENCES, 200)
+
 DEBUG_ENABLED = 'debug enabled'
 DEFAULT_VALUES[DEBUG_ENABLED] = (SECTION_DEBUG, False)
 
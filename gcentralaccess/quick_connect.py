@@ -0,0 +1,232 @@
+##
+#     Project: gCentralAccess
+# Description: Manage external resources from a centralized management console
+#      Author: Fabio Castelli (Muflone) <muflone@vbsimple.net>
+#   Copyright: 2015-2016 Fabio Castelli
+#     License: GPL-2+
+#  This program is free software; you can redistribute it and/or modify it
+#  under the terms of the GNU General Public License as published by the Free
+#  Software Foundation; either version 2 of the License, or (at your option)
+#  any later version.
+#
+#  This program is distributed in the hope that it will be useful, but WITHOUT
+#  ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+#  FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+#  more details.
+#  You should have received a copy of the GNU General Public License along
+#  with this program; if not, write to the Free Software Foundation, Inc.,
+#  51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA
+##
+
+import os
+import os.path
+import re
+import json
+import bisect
+import heapq
+
+from gcentralaccess.constants import FILE_QUICK_CONNECT
+import gcentralaccess.inventory as inventory
+import gcentralaccess.templates as templates
+
+# Maximum number of recently used candidates to remember
+MAX_RECENT = 50
+# Maximum number of results for a search
+MAX_RESULTS = 30
+# Maximum number of characters for the fuzzy matches
+MAX_QUERY_LENGTH = 64
+
+quick_connect = None
+
+
+def get_association(candidate):
+    """Return the resolved host and the association for a candidate"""
+    group, host_name, description, destination_name, service_name = candidate
+    host = inventory.inventory.get_host(group, host_name)
+    if host:
+        host = templates.templates.resolve(group, host)
+        for association in host.associations:
+            if (association.description == description and
+                    association.destination_name == destination_name and
+                    association.service_name == service_name):
+                return host, association
+    return None, None
+
+
+class QuickConnect(object):
+    def __init__(self, hosts_inventory, filename=FILE_QUICK_CONNECT):
+        """Prepare the candidates table for every host association"""
+        self.inventory = hosts_inventory
+        self.filename = filename
+        # Candidates and their texts by (group, host name), every candidate
+        # is a (group, host, description, destination, service) tuple
+        self.hosts_candidates = {}
+        self.invalidated = set()
+        # Flat table of the candidates and of their texts
+        self.candidates = []
+        self.indexes = {}
+        self.text = ''
+        self.offsets = []
+        self.dirty = True
+        # Recently used candidates keys, starting from the last one
+        self.recent = []
+        self.load()
+        for group, host in self.inventory.iter_hosts():
+            self.invalidated.add((group, host.name))
+        self.inventory.connect(self.on_inventory_changed)
+
+    def load(self):
+        """Load the recently used candidates"""
+        if os.path.isfile(self.filename):
+            try:
+                with open(self.filename, 'r') as file_recent:
+                    self.recent = [tuple([item.encode('utf-8')
+                                          for item in candidate])
+                                   for candidate in json.load(file_recent)
+                                   ][:MAX_RECENT]
+            except (ValueError, TypeError):
+                self.recent = []
+
+    def save(self):
+        """Save the recently used candidates"""
+        with open('%s.tmp' % self.filename, 'w') as file_recent:
+            json.dump(self.recent, file_recent)
+        os.rename('%s.tmp' % self.filename, self.filename)
+
+    def add_recent(self, candidate):
+        """Move a candidate at the top of the recently used"""
+        if candidate in self.recent:
+            self.recent.remove(candidate)
+        self.recent.insert(0, candidate)
+        del self.recent[MAX_RECENT:]
+        self.save()
+
+    def get_host_candidates(self, group, host):
+        """Return the candidates and their texts for the resolved host
+        associations"""
+        candidates = []
+        texts = []
+        resolved = templates.templates.resolve(group, host)
+        for association in resolved.associations:
+            destination = resolved.destinations.get(
+                association.destination_name)
+            if destination:
+                candidates.append((group, host.name, association.description,
+                                   destination.name, association.service_name))
+                texts.append(' '.join((host.name,
+                                       destination.name,
+                                       destination.value,
+                                       association.service_name,
+                                       association.description)).lower())
+        return candidates, texts
+
+    def update_table(self):
+        """Build again the candidates of the changed hosts and the whole
+        text used for the matches"""
+        for key in self.invalidated:
+            host = self.inventory.get_host(*key)
+            if host:
+                self.hosts_candidates[key] = self.get_host_candidates(
+                    key[0], host)
+            else:
+                self.hosts_candidates.pop(key, None)
+        self.invalidated.clear()
+        self.candidates = []
+        texts = []
+        for key in sorted(self.hosts_candidates.iterkeys()):
+            candidates, host_texts = self.hosts_candidates[key]
+            self.candidates.extend(candidates)
+            texts.extend(host_texts)
+        self.indexes = dict([(candidate, index) for index, candidate
+                             in enumerate(self.candidates)])
+        # Every candidate text is a line, the offsets point to the lines
+        self.offsets = []
+        offset = 0
+        for text in texts:
+            self.offsets.append(offset)
+            offset += len(text) + 1
+        self.text = '\n'.join(texts)
+        self.dirty = False
+
+    def get_text(self, candidate):
+        """Return the matched text for a candidate"""
+        index = self.indexes[candidate]
+        end = (self.offsets[index + 1] - 1 if index + 1 < len(self.offsets)
+               else len(self.text))
+        return self.text[self.offsets[index]:end]
+
+    def get_patterns(self, query):
+        """Return the regular expressions matching the query on a single
+        line, from the best to the worst kind of match"""
+        words = query.lower().split()
+        return (
+            # Every word in the same order
+            re.compile('[^\n]*'.join([re.escape(word) for word in words])),
+            # Every character in the same order, the lookahead emulates an
+            # atomic group to avoid any backtracking on the failed matches
+            re.compile(re.escape(words[0][0]) + ''.join(
+                ['(?=(?P<c%d>[^%s\n]*))(?P=c%d)%s' % (
+                    index, re.escape(character), index, re.escape(character))
+                 for index, character in enumerate(
+                     ''.join(words)[1:MAX_QUERY_LENGTH])])))
+
+    def search(self, query, max_results=MAX_RESULTS):
+        """Return the best candidates matching the query"""
+        if self.dirty:
+            self.update_table()
+        if not query.split():
+            # Show the recently used candidates
+            return [candidate for candidate in self.recent
+                    if candidate in self.indexes][:max_results]
+        patterns = self.get_patterns(query)
+        # The recently used candidates come first
+        results = []
+        for candidate in self.search(''):
+            if patterns[-1].search(self.get_text(candidate)):
+                results.append(candidate)
+        found = set(results)
+        # Length of the shortest possible match for every pattern
+        characters = ''.join(query.lower().split())
+        shortest = (len(characters), len(characters[:MAX_QUERY_LENGTH]))
+        for pattern, length in zip(patterns, shortest):
+            # Scan the whole text at once keeping the best match of every
+            # candidate
+            matches = {}
+            best_matches = 0
+            for match in pattern.finditer(self.text):
+                start = match.start()
+                index = bisect.bisect_right(self.offsets, start) - 1
+                if self.candidates[index] not in found:
+                    # The shortest matches starting a word come first
+                    rank = (start != self.offsets[index] and
+                            self.text[start - 1].isalnum(),
+                            match.end() - start,
+                            index)
+                    if index not in matches or rank < matches[index]:
+                        matches[index] = rank
+                        # The following candidates cannot beat enough
+                        # shortest matches starting a word
+                        if rank[:2] == (False, length):
+                            best_matches += 1
+                            if best_matches >= max_results - len(results):
+                                break
+            for item in heapq.nsmallest(max_results - len(results),
+                                        matches.itervalues()):
+                candidate = self.candidates[item[-1]]
+                found.add(candidate)
+                results.append(candidate)
+            if len(results) >= max_results:
+                break
+        return results[:max_results]
+
+    def on_inventory_changed(self, changes):
+        """Invalidate the candidates of the changed hosts and of the
+        dependants of the changed templates"""
+        for action, group, name, host in changes:
+            self.invalidated.add((group, name))
+            if host:
+                self.invalidated.add((group, host.name))
+            if group == inventory.GROUP_TEMPLATES:
+                self.invalidated.update(templates.templates.get_dependants(
+                    name))
+        self.dirty = True
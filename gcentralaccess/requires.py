@@ -24,3 +24,11 @@ if gi.require_version('Gtk', '3.0') is None:
     from gi.repository import Gtk
 if gi.require_version('GdkPixbuf', '2.0') is None:
     from gi.repository import GdkPixbuf
+# The icons are drawn as cairo surfaces
+if hasattr(gi, 'require_foreign'):
+    gi.require_foreign('cairo')
+# The icons are loaded in a thread, running along the main loop only with
+# the threads support, enabled by default since PyGObject 3.10.2
+from gi.repository import GObject
+if GObject.pygobject_version < (3, 10, 2):
+    GObject.threads_init()
@@ -0,0 +1,265 @@
+##
+#     Project: gCentralAccess
+# Description: Manage external resources from a centralized management console
+#      Author: Fabio Castelli (Muflone) <muflone@vbsimple.net>
+#   Copyright: 2015-2016 Fabio Castelli
+#     License: GPL-2+
+#  This program is free software; you can redistribute it and/or modify it
+#  under the terms of the GNU General Public License as published by the Free
+#  Software Foundation; either version 2 of the License, or (at your option)
+#  any later version.
+#
+#  This program is distributed in the hope that it will be useful, but WITHOUT
+#  ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+#  FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+#  more details.
+#  You should have received a copy of the GNU General Public License along
+#  with this program; if not, write to the Free Software Foundation, Inc.,
+#  51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA
+##
+
+import os
+import os.path
+import re
+import json
+import bisect
+import heapq
+import itertools
+
+from gcentralaccess.constants import FILE_SEARCH_INDEX
+import gcentralaccess.inventory as inventory
+
+# Length of the n-grams used to find the tokens containing a term
+NGRAM_SIZE = 3
+# Weight of each field for the ranking
+WEIGHT_NAME = 8
+WEIGHT_DESCRIPTION = 4
+WEIGHT_DESTINATION_VALUE = 4
+WEIGHT_DESTINATION_NAME = 1
+WEIGHT_ASSOCIATION = 2
+# Maximum number of results for a search
+MAX_RESULTS = 50
+
+search_index = None
+
+
+def get_tokens(text):
+    """Return the lowercase words of a text"""
+    if not text:
+        return []
+    if isinstance(text, str):
+        text = text.decode('utf-8', 'replace')
+    return re.findall(r'\w+', text.lower(), re.UNICODE)
+
+
+def get_ngrams(token):
+    """Return the n-grams of a token"""
+    return set([token[index:index + NGRAM_SIZE]
+                for index in xrange(len(token) - NGRAM_SIZE + 1)])
+
+
+def get_host_tokens(host):
+    """Return the weight of every token of a host"""
+    result = {}
+
+    def add_text(text, weight):
+        for token in get_tokens(text):
+            result[token] = result.get(token, 0) + weight
+    add_text(host.name, WEIGHT_NAME)
+    add_text(host.description, WEIGHT_DESCRIPTION)
+    for destination in host.destinations.itervalues():
+        add_text(destination.name, WEIGHT_DESTINATION_NAME)
+        add_text(destination.value, WEIGHT_DESTINATION_VALUE)
+    for association in host.associations:
+        add_text(association.description, WEIGHT_ASSOCIATION)
+    return result
+
+
+class SearchIndex(object):
+    def __init__(self, hosts_inventory, filename=FILE_SEARCH_INDEX):
+        """Prepare the search index for the hosts of every group"""
+        self.inventory = hosts_inventory
+        self.filename = filename
+        # Token weights and file signature by (group, name)
+        self.documents = {}
+        self.signatures = {}
+        # Integer identifiers of the hosts, cheaper to hash than the
+        # (group, name) keys in the postings
+        self.ids = {}
+        self.keys = {}
+        self.next_id = 0
+        # Token weights by host identifier for every token
+        self.postings = {}
+        # Tokens containing every n-gram
+        self.ngrams = {}
+        # Sorted tokens for the prefix search of the short terms
+        self.tokens = []
+        self.loading = False
+        self.load()
+        self.inventory.connect(self.on_inventory_changed)
+
+    def load(self):
+        """Index the inventory hosts, reusing the saved tokens for the
+        unchanged host files"""
+        saved = {}
+        if os.path.isfile(self.filename):
+            try:
+                with open(self.filename, 'r') as file_index:
+                    for group, name, signature, tokens in json.load(
+                            file_index):
+                        saved[(group, name)] = (signature, tokens)
+            except (ValueError, TypeError):
+                # Ignore an invalid index, it will be built again
+                saved.clear()
+        self.loading = True
+        for group, host in self.inventory.iter_hosts():
+            key = (group, host.name)
+            signature = inventory.get_host_signature(group, host.name)
+            if key in saved and saved[key][0] == signature:
+                self.add_document(key, saved[key][1], signature)
+            else:
+                self.add_document(key, get_host_tokens(host), signature)
+        # Sort the tokens only once after loading them all
+        self.tokens = sorted(self.postings.iterkeys())
+        self.loading = False
+
+    def save(self):
+        """Save the indexed tokens along as with the host files signatures"""
+        with open('%s.tmp' % self.filename, 'w') as file_index:
+            json.dump([[group, name, self.signatures[(group, name)], tokens]
+                       for (group, name), tokens
+                       in self.documents.iteritems()],
+                      file_index,
+                      separators=(',', ':'))
+        os.rename('%s.tmp' % self.filename, self.filename)
+
+    def add_document(self, key, tokens, signature):
+        """Add the tokens of a host to the index"""
+        self.documents[key] = tokens
+        self.signatures[key] = signature
+        host_id = self.next_id
+        self.next_id += 1
+        self.ids[key] = host_id
+        self.keys[host_id] = key
+        for token, weight in tokens.iteritems():
+            if token not in self.postings:
+                self.postings[token] = {}
+                if not self.loading:
+                    bisect.insort(self.tokens, token)
+                for ngram in get_ngrams(token):
+                    self.ngrams.setdefault(ngram, set()).add(token)
+            self.postings[token][host_id] = weight
+
+    def remove_document(self, key):
+        """Remove the tokens of a host from the index"""
+        self.signatures.pop(key, None)
+        host_id = self.ids.pop(key, None)
+        self.keys.pop(host_id, None)
+        for token in self.documents.pop(key, ()):
+            postings = self.postings[token]
+            postings.pop(host_id, None)
+            if not postings:
+                # Remove the tokens no longer used
+                self.postings.pop(token)
+                self.tokens.pop(bisect.bisect_left(self.tokens, token))
+                for ngram in get_ngrams(token):
+                    tokens = self.ngrams[ngram]
+                    tokens.discard(token)
+                    if not tokens:
+                        self.ngrams.pop(ngram)
+
+    def get_matching_tokens(self, term):
+        """Return the tokens containing a term"""
+        if len(term) < NGRAM_SIZE:
+            # Short terms are matched by prefix, the matching tokens are
+            # sorted before the first string following the prefix
+            return self.tokens[
+                bisect.bisect_left(self.tokens, term):
+                bisect.bisect_left(self.tokens,
+                                   term[:-1] + unichr(ord(term[-1]) + 1))]
+        # Intersect the tokens of every n-gram starting from the rarest
+        candidates = None
+        for ngram in sorted(get_ngrams(term),
+                            key=lambda item: len(self.ngrams.get(item, ()))):
+            tokens = self.ngrams.get(ngram)
+            if not tokens:
+                return []
+            candidates = (set(tokens) if candidates is None
+                          else candidates.intersection(tokens))
+        return [token for token in candidates if term in token]
+
+    def search(self, text, max_results=MAX_RESULTS):
+        """Return the ranked (score, group, name) hosts matching every
+        word of the text"""
+        terms = []
+        # Sum of the factors of the terms matched by every token
+        factors = {}
+        for term in set(get_tokens(text)):
+            tokens = self.get_matching_tokens(term)
+            if not tokens:
+                return []
+            for token in tokens:
+                # Exact and prefix matches are ranked before substrings
+                if token == term:
+                    factor = 4
+                elif token.startswith(term):
+                    factor = 2
+                else:
+                    factor = 1
+                factors[token] = factors.get(token, 0) + factor
+            postings = [self.postings[token] for token in tokens]
+            terms.append((sum(map(len, postings)), postings))
+        # Intersect the hosts of every term starting from the rarest one
+        terms.sort(key=lambda item: item[0])
+        candidates = None
+        for size, postings in terms:
+            if candidates is None:
+                candidates = set(itertools.chain.from_iterable(postings))
+            elif len(candidates) * len(postings) < size:
+                # Look up the few remaining candidates in the postings
+                candidates = set([host_id for host_id in candidates
+                                  if any([host_id in items
+                                          for items in postings])])
+            else:
+                candidates = candidates.intersection(
+                    itertools.chain.from_iterable(postings))
+            if not candidates:
+                return []
+        # Score only the hosts matching every term
+        scores = dict.fromkeys(candidates, 0)
+        for token, factor in factors.iteritems():
+            postings = self.postings[token]
+            if len(postings) < len(candidates):
+                for host_id in candidates.intersection(postings):
+                    scores[host_id] += postings[host_id] * factor
+            else:
+                for host_id in candidates:
+                    if host_id in postings:
+                        scores[host_id] += postings[host_id] * factor
+        # Cut off the hosts scoring less than the last result before
+        # ranking them
+        if len(scores) > max_results:
+            threshold = heapq.nlargest(max_results,
+                                       scores.itervalues())[-1]
+            scores = [item for item in scores.iteritems()
+                      if item[1] >= threshold]
+        else:
+            scores = scores.items()
+        keys = self.keys
+        results = heapq.nsmallest(
+            max_results,
+            scores,
+            key=lambda item: (-item[1], keys[item[0]]))
+        return [(score, ) + keys[host_id] for host_id, score in results]
+
+    def on_inventory_changed(self, changes):
+        """Index again only the changed hosts"""
+        for action, group, name, host in changes:
+            self.remove_document((group, name))
+            if action == inventory.ACTION_SET:
+                key = (group, host.name)
+                self.remove_document(key)
+                self.add_document(
+                    key,
+                    get_host_tokens(host),
+                    inventory.get_host_signature(group, host.name))
@@ -0,0 +1,99 @@
+##
+#     Project: gCentralAccess
+# Description: Manage external resources from a centralized management console
+#      Author: Fabio Castelli (Muflone) <muflone@vbsimple.net>
+#   Copyright: 2015-2016 Fabio Castelli
+#     License: GPL-2+
+#  This program is free software; you can redistribute it and/or modify it
+#  under the terms of the GNU General Public License as published by the Free
+#  Software Foundation; either version 2 of the License, or (at your option)
+#  any later version.
+#
+#  This program is distributed in the hope that it will be useful, but WITHOUT
+#  ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+#  FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+#  more details.
+#  You should have received a copy of the GNU General Public License along
+#  with this program; if not, write to the Free Software Foundation, Inc.,
+#  51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA
+##
+
+import gcentralaccess.inventory as inventory
+
+from gcentralaccess.models.host_info import HostInfo
+
+services_index = None
+
+
+def edit_host(host, renamed, removed):
+    """Return a new host with the renamed services replaced and the
+    associations to the removed services dropped"""
+    new_host = HostInfo(host.name, host.description, host.template,
+                        host.tags)
+    for destination in host.destinations.itervalues():
+        new_host.add_destination(destination)
+    for association in host.associations:
+        service_name = association.service_name
+        if service_name in renamed:
+            service_name = renamed[service_name]
+        elif service_name in removed:
+            continue
+        new_host.add_association(
+            description=association.description,
+            destination_name=association.destination_name,
+            service_name=service_name,
+            arguments=association.service_arguments)
+    return new_host
+
+
+class ServicesIndex(object):
+    def __init__(self, hosts_inventory):
+        """Prepare the reverse index from the services to the associations
+        of every group"""
+        self.inventory = hosts_inventory
+        # Set of (group, host name, association description) by service name
+        self.associations = {}
+        # Set of (service name, association description) by (group, host name)
+        self.services = {}
+        for group, host in self.inventory.iter_hosts():
+            self.add_host(group, host)
+        self.inventory.connect(self.on_inventory_changed)
+
+    def add_host(self, group, host):
+        """Add the associations of a host to the index"""
+        services = self.services.setdefault((group, host.name), set())
+        for association in host.associations:
+            services.add((association.service_name, association.description))
+            self.associations.setdefault(association.service_name, set()).add(
+                (group, host.name, association.description))
+
+    def remove_host(self, group, name):
+        """Remove the associations of a host from the index"""
+        for service_name, description in self.services.pop((group, name), ()):
+            associations = self.associations[service_name]
+            associations.discard((group, name, description))
+            if not associations:
+                self.associations.pop(service_name)
+
+    def get_associations(self, service_name):
+        """Return the (group, host name, association description) items
+        using a service"""
+        return self.associations.get(service_name, set())
+
+    def get_hosts(self, services_names):
+        """Return the (group, host name) keys of the hosts using any of the
+        services"""
+        result = set()
+        for service_name in services_names:
+            for group, name, description in self.get_associations(
+                    service_name):
+                result.add((group, name))
+        return result
+
+    def on_inventory_changed(self, changes):
+        """Update the index for the changed hosts only"""
+        for action, group, name, host in changes:
+            self.remove_host(group, name)
+            if action == inventory.ACTION_SET:
+                self.remove_host(group, host.name)
+                self.add_host(group, host)
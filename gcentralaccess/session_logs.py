@@ -0,0 +1,121 @@
+##
+#     Project: gCentralAccess
+# Description: Manage external resources from a centralized management console
+#      Author: Fabio Castelli (Muflone) <muflone@vbsimple.net>
+#   Copyright: 2015-2016 Fabio Castelli
+#     License: GPL-2+
+#  This program is free software; you can redistribute it and/or modify it
+#  under the terms of the GNU General Public License as published by the Free
+#  Software Foundation; either version 2 of the License, or (at your option)
+#  any later version.
+#
+#  This program is distributed in the hope that it will be useful, but WITHOUT
+#  ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+#  FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+#  more details.
+#  You should have received a copy of the GNU General Public License along
+#  with this program; if not, write to the Free Software Foundation, Inc.,
+#  51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA
+##
+
+import os
+import os.path
+import time
+import json
+import tempfile
+
+from gcentralaccess.constants import DIR_LOGS
+
+# Maximum number of logs kept for every service
+MAX_SERVICE_LOGS = 20
+FILE_INDEX = 'index.json'
+
+session_logs = None
+
+
+class SessionLogs(object):
+    def __init__(self, path=DIR_LOGS):
+        """Prepare the index of the processes logs"""
+        self.path = path
+        self.filename = os.path.join(self.path, FILE_INDEX)
+        # Every entry is a dictionary with the pid, the starting time, the
+        # host, destination and service names, the log filename and the
+        # offsets of the process output inside the log
+        self.entries = []
+        self.load()
+
+    def load(self):
+        """Load the logs index, dropping the entries of the deleted logs"""
+        if os.path.isfile(self.filename):
+            try:
+                with open(self.filename, 'r') as file_index:
+                    self.entries = json.load(file_index)
+            except (ValueError, TypeError):
+                self.entries = []
+        self.entries = [entry for entry in self.entries
+                        if os.path.isfile(self.get_path(entry))]
+        # Complete the logs of the processes interrupted with the application
+        for entry in self.entries:
+            if entry['end'] is None:
+                entry['end'] = os.path.getsize(self.get_path(entry))
+
+    def save(self):
+        """Save the logs index"""
+        with open('%s.tmp' % self.filename, 'w') as file_index:
+            json.dump(self.entries, file_index)
+        os.rename('%s.tmp' % self.filename, self.filename)
+
+    def get_path(self, entry):
+        """Return the full path of the log for an entry"""
+        return os.path.join(self.path, entry['filename'])
+
+    def rotate(self, service_name):
+        """Delete the oldest logs of a service to make room for a new one"""
+        service_entries = [entry for entry in self.entries
+                           if entry['service'] == service_name and
+                           entry['end'] is not None]
+        for entry in service_entries[:len(service_entries) -
+                                     MAX_SERVICE_LOGS + 1]:
+            try:
+                os.remove(self.get_path(entry))
+            except OSError:
+                pass
+            self.entries.remove(entry)
+
+    def open_log(self, host, destination, service):
+        """Create a new log and return its file descriptor and its entry,
+        the descriptor is given to the process to write its output"""
+        self.rotate(service.name)
+        fd, filename = tempfile.mkstemp(
+            prefix=time.strftime('%Y%m%d-%H%M%S-'), suffix='.log',
+            dir=self.path)
+        entry = {'pid': None,
+                 'started': int(time.time()),
+                 'host': host.name,
+                 'destination': destination.name,
+                 'service': service.name,
+                 'filename': os.path.basename(filename),
+                 'start': 0,
+                 'end': None}
+        self.entries.append(entry)
+        return fd, entry
+
+    def start_log(self, entry, pid):
+        """Record the process writing the log"""
+        entry['pid'] = pid
+        self.save()
+
+    def close_log(self, entry):
+        """Record the final size of the log of a terminated process"""
+        path = self.get_path(entry)
+        entry['end'] = (os.path.getsize(path) if os.path.isfile(path)
+                        else entry['start'])
+        self.save()
+
+    def discard_log(self, entry):
+        """Delete the log of a process which couldn't be started"""
+        try:
+            os.remove(self.get_path(entry))
+        except OSError:
+            pass
+        self.entries.remove(entry)
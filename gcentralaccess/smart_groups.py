@@ -0,0 +1,213 @@
+##
+#     Project: gCentralAccess
+# Description: Manage external resources from a centralized management console
+#      Author: Fabio Castelli (Muflone) <muflone@vbsimple.net>
+#   Copyright: 2015-2016 Fabio Castelli
+#     License: GPL-2+
+#  This program is free software; you can redistribute it and/or modify it
+#  under the terms of the GNU General Public License as published by the Free
+#  Software Foundation; either version 2 of the License, or (at your option)
+#  any later version.
+#
+#  This program is distributed in the hope that it will be useful, but WITHOUT
+#  ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+#  FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+#  more details.
+#  You should have received a copy of the GNU General Public License along
+#  with this program; if not, write to the Free Software Foundation, Inc.,
+#  51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA
+##
+import re
+
+from gcentralaccess.constants import FILE_SMART_GROUPS
+from gcentralaccess.functions import _
+import gcentralaccess.settings as settings
+import gcentralaccess.inventory as inventory
+import gcentralaccess.templates as templates
+
+# Prefix of the smart groups keys, the smart groups are special groups
+SMART_GROUP_PREFIX = '/smart/'
+OPTION_QUERY = 'query'
+# Fields and operators for the query conditions
+FIELDS = ('name', 'description', 'template', 'group', 'tag', 'service',
+          'destination', 'address')
+OPERATORS = ('=', '!=', 'contains', 'startswith')
+TOKENS = re.compile(r'"[^"]*"|\'[^\']*\'|!=|=|[^\s=!]+')
+
+smart_groups = None
+
+
+def is_smart_group(group):
+    """Return if a group is a smart group key"""
+    return group.startswith(SMART_GROUP_PREFIX)
+
+
+def get_smart_group_key(name):
+    """Return the group key of a smart group"""
+    return '%s%s' % (SMART_GROUP_PREFIX, name)
+
+
+def parse_query(query):
+    """Return the conditions of a query as a list of alternatives, each
+    one a list of (negated, field, operator, value) to match at once"""
+    tokens = TOKENS.findall(query)
+    alternatives = [[]]
+    index = 0
+    while index < len(tokens):
+        negated = tokens[index].lower() == 'not'
+        if negated:
+            index += 1
+        if index + 3 > len(tokens):
+            raise ValueError(_('The query is incomplete'))
+        field, operator, value = tokens[index:index + 3]
+        field = field.lower()
+        operator = operator.lower()
+        if field not in FIELDS:
+            raise ValueError(_('Unknown field %s') % field)
+        if operator not in OPERATORS:
+            raise ValueError(_('Unknown operator %s') % operator)
+        if value[:1] in ('"', '\'') and value[:1] == value[-1:]:
+            value = value[1:-1]
+        alternatives[-1].append((negated, field, operator, value.lower()))
+        index += 3
+        if index < len(tokens):
+            conjunction = tokens[index].lower()
+            if conjunction == 'or':
+                alternatives.append([])
+            elif conjunction != 'and':
+                raise ValueError(_('Expected and or or instead of %s') %
+                                 tokens[index])
+            index += 1
+            if index == len(tokens):
+                raise ValueError(_('The query is incomplete'))
+    if not alternatives[0]:
+        raise ValueError(_('The query is empty'))
+    return alternatives
+
+
+def get_field_values(field, group, host):
+    """Return the lowercase values of a host field"""
+    if field == 'name':
+        values = [host.name]
+    elif field == 'description':
+        values = [host.description]
+    elif field == 'template':
+        values = [host.template]
+    elif field == 'group':
+        values = [group]
+    elif field == 'tag':
+        values = host.tags
+    elif field == 'service':
+        values = [association.service_name for association
+                  in templates.templates.resolve(group, host).associations]
+    elif field == 'destination':
+        values = templates.templates.resolve(group, host).destinations.keys()
+    else:
+        values = [destination.value for destination
+                  in templates.templates.resolve(
+                      group, host).destinations.itervalues()]
+    return [value.lower() for value in values if value]
+
+
+def match_condition(condition, group, host):
+    """Return if any value of a host field satisfies a condition"""
+    negated, field, operator, value = condition
+    values = get_field_values(field, group, host)
+    if operator == '=':
+        result = value in values
+    elif operator == '!=':
+        result = value not in values
+    elif operator == 'contains':
+        result = any(value in item for item in values)
+    else:
+        result = any(item.startswith(value) for item in values)
+    return result != negated
+
+
+def match_query(alternatives, group, host):
+    """Return if a host satisfies any alternative of a parsed query"""
+    return any(all(match_condition(condition, group, host)
+                   for condition in conditions)
+               for conditions in alternatives)
+
+
+class SmartGroups(object):
+    def __init__(self, hosts_inventory, filename=FILE_SMART_GROUPS):
+        """Prepare the smart groups and their cached members"""
+        self.inventory = hosts_inventory
+        self.settings = settings.Settings(filename=filename,
+                                          case_sensitive=True)
+        # Query text, parsed query and members by smart group name
+        self.queries = {}
+        self.alternatives = {}
+        self.members = {}
+        # Smart groups with members changed by the last inventory changes
+        self.changed = set()
+        for name in self.settings.get_sections():
+            try:
+                self.set_query(name, self.settings.get(name, OPTION_QUERY))
+            except ValueError:
+                # Skip the invalid queries
+                pass
+        self.inventory.connect(self.on_inventory_changed)
+
+    def get_names(self):
+        """Return the smart groups names"""
+        return self.queries.keys()
+
+    def get_query(self, name):
+        """Return the query text of a smart group"""
+        return self.queries.get(name)
+
+    def get_members(self, name):
+        """Return the (group, host name) pairs of a smart group"""
+        return self.members.get(name, set())
+
+    def set_query(self, name, query):
+        """Add or replace a smart group, evaluating it on every host"""
+        alternatives = parse_query(query)
+        self.queries[name] = query
+        self.alternatives[name] = alternatives
+        self.members[name] = set(
+            [(group, host.name)
+             for group, host in self.inventory.iter_hosts()
+             if not inventory.is_special_group(group) and
+             match_query(alternatives, group, host)])
+
+    def remove(self, name):
+        """Remove a smart group"""
+        self.queries.pop(name, None)
+        self.alternatives.pop(name, None)
+        self.members.pop(name, None)
+
+    def save(self):
+        """Save the smart groups queries"""
+        self.settings.clear()
+        for name, query in self.queries.iteritems():
+            self.settings.set(name, OPTION_QUERY, query)
+        self.settings.save()
+
+    def on_inventory_changed(self, changes):
+        """Evaluate the smart groups only for the changed hosts and for the
+        dependants of the changed templates"""
+        keys = set()
+        for action, group, name, host in changes:
+            names = set((name, host.name if host else name))
+            for host_name in names:
+                keys.add((group, host_name))
+                if group == inventory.GROUP_TEMPLATES:
+                    keys.update(templates.templates.get_dependants(host_name))
+        self.changed = set()
+        for group, name in keys:
+            if inventory.is_special_group(group):
+                continue
+            host = self.inventory.get_host(group, name)
+            for smart_group, alternatives in self.alternatives.iteritems():
+                members = self.members[smart_group]
+                # The changed members are shown again even if still matching
+                if (group, name) in members:
+                    members.discard((group, name))
+                    self.changed.add(smart_group)
+                if host is not None and match_query(alternatives, group, host):
+                    members.add((group, name))
+                    self.changed.add(smart_group)
@@ -0,0 +1,164 @@
+##
+#     Project: gCentralAccess
+# Description: Manage external resources from a centralized management console
+#      Author: Fabio Castelli (Muflone) <muflone@vbsimple.net>
+#   Copyright: 2015-2016 Fabio Castelli
+#     License: GPL-2+
+#  This program is free software; you can redistribute it and/or modify it
+#  under the terms of the GNU General Public License as published by the Free
+#  Software Foundation; either version 2 of the License, or (at your option)
+#  any later version.
+#
+#  This program is distributed in the hope that it will be useful, but WITHOUT
+#  ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+#  FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+#  more details.
+#  You should have received a copy of the GNU General Public License along
+#  with this program; if not, write to the Free Software Foundation, Inc.,
+#  51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA
+##
+import re
+
+from gcentralaccess.functions import _
+import gcentralaccess.inventory as inventory
+
+TOKENS = re.compile(r'\(|\)|[^\s()]+')
+TAG_NAME = re.compile(r'^[^\s(),\'\\/]+$')
+TAG_OPERATORS = ('and', 'or', 'not')
+
+tags_index = None
+
+
+class TagsIndex(object):
+    def __init__(self, hosts_inventory):
+        """Prepare a bitset for every tag, where each host of every group
+        has its own bit position"""
+        self.inventory = hosts_inventory
+        # Bit position by (group, host name) and the reverse lists of the
+        # keys and of the lowercase tags
+        self.positions = {}
+        self.keys = []
+        self.hosts_tags = []
+        # Bit positions released by the removed hosts
+        self.free_positions = []
+        # Bitset of the hosts for every lowercase tag and of every host
+        self.bitsets = {}
+        self.all_hosts = 0
+        for group, host in self.inventory.iter_hosts():
+            self.add_host(group, host)
+        self.inventory.connect(self.on_inventory_changed)
+
+    def add_host(self, group, host):
+        """Add a host bit to the bitsets of its tags"""
+        key = (group, host.name)
+        tags = set(tag.lower() for tag in host.tags)
+        if self.free_positions:
+            position = self.free_positions.pop()
+            self.keys[position] = key
+            self.hosts_tags[position] = tags
+        else:
+            position = len(self.keys)
+            self.keys.append(key)
+            self.hosts_tags.append(tags)
+        self.positions[key] = position
+        bit = 1 << position
+        self.all_hosts |= bit
+        for tag in tags:
+            self.bitsets[tag] = self.bitsets.get(tag, 0) | bit
+
+    def remove_host(self, group, name):
+        """Remove a host bit from the bitsets of its tags"""
+        key = (group, name)
+        position = self.positions.pop(key, None)
+        if position is None:
+            return
+        tags = self.hosts_tags[position]
+        self.keys[position] = None
+        self.hosts_tags[position] = None
+        self.free_positions.append(position)
+        mask = ~(1 << position)
+        self.all_hosts &= mask
+        for tag in tags:
+            bitset = self.bitsets[tag] & mask
+            if bitset:
+                self.bitsets[tag] = bitset
+            else:
+                self.bitsets.pop(tag)
+
+    def get_tags(self):
+        """Return the used tags"""
+        return self.bitsets.keys()
+
+    def get_position(self, group, name):
+        """Return the bit position of a host or None"""
+        return self.positions.get((group, name))
+
+    def evaluate(self, expression):
+        """Return the bitset of the hosts matching a tags expression like
+        dc1 and prod and not legacy, with or and the parentheses"""
+        tokens = TOKENS.findall(expression.lower())
+        position = [0]
+
+        def parse_or():
+            result = parse_and()
+            while position[0] < len(tokens) and tokens[position[0]] == 'or':
+                position[0] += 1
+                result |= parse_and()
+            return result
+
+        def parse_and():
+            result = parse_not()
+            while (position[0] < len(tokens) and
+                    tokens[position[0]] not in ('or', ')')):
+                # Adjacent tags are joined by and
+                if tokens[position[0]] == 'and':
+                    position[0] += 1
+                result &= parse_not()
+            return result
+
+        def parse_not():
+            if position[0] >= len(tokens):
+                raise ValueError(_('The tags filter is incomplete'))
+            token = tokens[position[0]]
+            position[0] += 1
+            if token == 'not':
+                return self.all_hosts & ~parse_not()
+            elif token == '(':
+                result = parse_or()
+                if position[0] >= len(tokens) or tokens[position[0]] != ')':
+                    raise ValueError(_('A closing parenthesis is missing'))
+                position[0] += 1
+                return result
+            elif token in ('and', 'or', ')'):
+                raise ValueError(_('Unexpected %s') % token)
+            return self.bitsets.get(token, 0)
+
+        if not tokens:
+            return self.all_hosts
+        result = parse_or()
+        if position[0] < len(tokens):
+            raise ValueError(_('Unexpected %s') % tokens[position[0]])
+        return result
+
+    def get_positions(self, bitset):
+        """Return the positions of the bits in a bitset"""
+        # A single conversion to binary digits, shifting a long bitset for
+        # every bit would copy it each time
+        digits = bin(bitset)[:1:-1]
+        return [position for position, digit in enumerate(digits)
+                if digit == '1']
+
+    def get_hosts(self, bitset):
+        """Return the (group, host name) pairs of the bits in a bitset"""
+        keys = self.keys
+        return [keys[position] for position in self.get_positions(bitset)]
+
+    def on_inventory_changed(self, changes):
+        """Update the bitsets for the changed hosts only"""
+        for action, group, name, host in changes:
+            self.remove_host(group, name)
+            if action == inventory.ACTION_SET:
+                # A renamed host replaces any host with the new name
+                if host.name != name:
+                    self.remove_host(group, host.name)
+                self.add_host(group, host)
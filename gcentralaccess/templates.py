@@ -0,0 +1,102 @@
+##
+#     Project: gCentralAccess
+# Description: Manage external resources from a centralized management console
+#      Author: Fabio Castelli (Muflone) <muflone@vbsimple.net>
+#   Copyright: 2015-2016 Fabio Castelli
+#     License: GPL-2+
+#  This program is free software; you can redistribute it and/or modify it
+#  under the terms of the GNU General Public License as published by the Free
+#  Software Foundation; either version 2 of the License, or (at your option)
+#  any later version.
+#
+#  This program is distributed in the hope that it will be useful, but WITHOUT
+#  ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+#  FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+#  more details.
+#  You should have received a copy of the GNU General Public License along
+#  with this program; if not, write to the Free Software Foundation, Inc.,
+#  51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA
+##
+
+import gcentralaccess.inventory as inventory
+
+from gcentralaccess.models.host_info import HostInfo
+
+templates = None
+
+
+class Templates(object):
+    def __init__(self, hosts_inventory):
+        """Prepare the cache for the hosts resolved through their templates"""
+        self.inventory = hosts_inventory
+        # Resolved hosts by (group, name)
+        self.resolved = {}
+        # Resolved hosts keys by every template name in their chain
+        self.dependants = {}
+        self.inventory.connect(self.on_inventory_changed)
+
+    def get_chain(self, host):
+        """Return the templates names and the existing templates inherited
+        by a host, starting from the nearest"""
+        names = []
+        chain = []
+        template_name = host.template
+        # Stop at the first missing template or loop
+        while template_name and template_name not in names:
+            names.append(template_name)
+            template = self.inventory.get_host(inventory.GROUP_TEMPLATES,
+                                               template_name)
+            if template is None:
+                break
+            chain.append(template)
+            template_name = template.template
+        return names, chain
+
+    def resolve(self, group, host):
+        """Return the host with the destinations and the associations
+        inherited from its templates, overridden by the host ones"""
+        if not host.template:
+            return host
+        key = (group, host.name)
+        if key not in self.resolved:
+            names, chain = self.get_chain(host)
+            resolved = HostInfo(host.name, host.description, host.template,
+                                host.tags)
+            associations = []
+            # Apply the farthest template first so each child overrides it
+            for item in list(reversed(chain)) + [host]:
+                for destination in item.destinations.itervalues():
+                    resolved.add_destination(destination)
+                # Associations with the same description are overridden
+                descriptions = set([association.description
+                                    for association in item.associations])
+                associations = [association for association in associations
+                                if association.description not in descriptions]
+                associations.extend(item.associations)
+            resolved.associations = associations
+            self.resolved[key] = resolved
+            for template_name in names:
+                self.dependants.setdefault(template_name, set()).add(key)
+        return self.resolved[key]
+
+    def get_dependants(self, template_name):
+        """Return the (group, name) keys of the hosts using a template"""
+        return self.dependants.get(template_name, set())
+
+    def on_inventory_changed(self, changes):
+        """Invalidate the resolved hosts affected by the changes and resolve
+        again the dependants of the changed templates at once"""
+        invalidated = set()
+        for action, group, name, host in changes:
+            names = set((name, host.name if host else name))
+            for host_name in names:
+                invalidated.add((group, host_name))
+                if group == inventory.GROUP_TEMPLATES:
+                    invalidated.update(self.dependants.pop(host_name, ()))
+        for key in invalidated:
+            self.resolved.pop(key, None)
+        # Resolve again the still existing hosts
+        for group, name in invalidated:
+            host = self.inventory.get_host(group, name)
+            if host is not None:
+                self.resolve(group, host)
@@ -0,0 +1,205 @@
+##
+#     Project: gCentralAccess
+# Description: Manage external resources from a centralized management console
+#      Author: Fabio Castelli (Muflone) <muflone@vbsimple.net>
+#   Copyright: 2015-2016 Fabio Castelli
+#     License: GPL-2+
+#  This program is free software; you can redistribute it and/or modify it
+#  under the terms of the GNU General Public License as published by the Free
+#  Software Foundation; either version 2 of the License, or (at your option)
+#  any later version.
+#
+#  This program is distributed in the hope that it will be useful, but WITHOUT
+#  ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+#  FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+#  more details.
+#  You should have received a copy of the GNU General Public License along
+#  with this program; if not, write to the Free Software Foundation, Inc.,
+#  51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA
+##
+
+from gi.repository import Gtk
+
+import gcentralaccess.preferences as preferences
+import gcentralaccess.settings as settings
+from gcentralaccess.gtkbuilder_loader import GtkBuilderLoader
+from gcentralaccess.functions import (
+    get_ui_file, process_events, set_error_message_on_infobar, text, _)
+import gcentralaccess.inventory as inventory
+import gcentralaccess.hosts_index as hosts_index
+from gcentralaccess.bulk_edit import (
+    BulkEdit, OPERATION_SERVICE, OPERATION_DESTINATION, OPERATION_ADDRESS)
+
+import gcentralaccess.models.services as model_services
+
+import gcentralaccess.ui.debug as debug
+
+SECTION_WINDOW_NAME = 'bulk edit'
+SCOPE_SELECTED = 'selected'
+SCOPE_GROUP = 'group'
+SCOPE_ALL = 'all'
+
+
+class UIBulkEdit(object):
+    def __init__(self, parent, group_hosts, selected_host):
+        """Prepare the bulk edit dialog for the (group, name) pairs of the
+        hosts shown in the current group, even a smart one"""
+        self.group_hosts = group_hosts
+        self.selected_host = selected_host
+        self.changes = []
+        # Load the user interface
+        self.ui = GtkBuilderLoader(get_ui_file('bulk_edit.glade'))
+        if not preferences.get(preferences.DETACHED_WINDOWS):
+            self.ui.dialog_bulk_edit.set_transient_for(parent)
+        # Restore the saved size and position
+        settings.positions.restore_window_position(
+            self.ui.dialog_bulk_edit, SECTION_WINDOW_NAME)
+        # Initialize actions
+        for widget in self.ui.get_objects_by_type(Gtk.Action):
+            # Connect the actions accelerators
+            widget.connect_accelerator()
+            # Set labels
+            widget.set_label(text(widget.get_label()))
+        # Initialize labels
+        for widget in self.ui.get_objects_by_type(Gtk.Label):
+            widget.set_label(text(widget.get_label()))
+            widget.set_tooltip_text(widget.get_label().replace('_', ''))
+        # Initialize tooltips
+        for widget in self.ui.get_objects_by_type(Gtk.Button):
+            action = widget.get_related_action()
+            if action:
+                widget.set_tooltip_text(action.get_label().replace('_', ''))
+        # Load the scopes and the operations
+        if selected_host:
+            self.ui.cbo_scope.append(SCOPE_SELECTED, _('Selected host'))
+        self.ui.cbo_scope.append(SCOPE_GROUP, _('Current group'))
+        self.ui.cbo_scope.append(SCOPE_ALL, _('All groups'))
+        self.ui.cbo_scope.set_active(0)
+        self.ui.cbo_operation.append(OPERATION_SERVICE, _('Replace service'))
+        self.ui.cbo_operation.append(OPERATION_DESTINATION,
+                                     _('Rename destination'))
+        self.ui.cbo_operation.append(OPERATION_ADDRESS,
+                                     _('Replace address'))
+        self.ui.cbo_operation.set_active(0)
+        # Connect signals from the glade file to the module functions
+        self.ui.connect_signals(self)
+
+    def show(self):
+        """Show the bulk edit dialog"""
+        self.ui.txt_old_value.grab_focus()
+        response = self.ui.dialog_bulk_edit.run()
+        self.ui.dialog_bulk_edit.hide()
+        return response
+
+    def destroy(self):
+        """Destroy the bulk edit dialog"""
+        settings.positions.save_window_position(
+            self.ui.dialog_bulk_edit, SECTION_WINDOW_NAME)
+        self.ui.dialog_bulk_edit.destroy()
+        self.ui.dialog_bulk_edit = None
+
+    def get_hosts(self):
+        """Return the (group, host) pairs for the selected scope"""
+        scope = self.ui.cbo_scope.get_active_id()
+        if scope == SCOPE_SELECTED:
+            hosts = [(self.selected_host[0], inventory.inventory.get_host(
+                *self.selected_host))]
+        elif self.ui.cbo_operation.get_active_id() == OPERATION_ADDRESS:
+            # Only the hosts using the address can be affected
+            group_hosts = set(self.group_hosts)
+            hosts = [(group, inventory.inventory.get_host(group, name))
+                     for group, name
+                     in hosts_index.hosts_index.get_hosts_by_address(
+                         self.ui.txt_old_value.get_text().strip())
+                     if scope == SCOPE_ALL or (group, name) in group_hosts]
+        elif scope == SCOPE_GROUP:
+            hosts = [(group, inventory.inventory.get_host(group, name))
+                     for group, name in self.group_hosts]
+        else:
+            hosts = list(inventory.inventory.iter_hosts())
+        return hosts
+
+    def get_bulk_edit(self):
+        """Return the BulkEdit object for the requested change"""
+        return BulkEdit(operation=self.ui.cbo_operation.get_active_id(),
+                        old_value=self.ui.txt_old_value.get_text().strip(),
+                        new_value=self.ui.txt_new_value.get_text().strip())
+
+    def check_input(self):
+        """Check the requested change and show any error"""
+        def show_error_message_on_infobar(widget, error_msg):
+            """Show the error message on the GtkInfoBar"""
+            set_error_message_on_infobar(
+                widget=widget,
+                widgets=(self.ui.txt_old_value, self.ui.txt_new_value),
+                label=self.ui.lbl_error_message,
+                infobar=self.ui.infobar_error_message,
+                error_msg=error_msg)
+        bulk_edit = self.get_bulk_edit()
+        if len(bulk_edit.old_value) == 0:
+            show_error_message_on_infobar(
+                self.ui.txt_old_value,
+                _('The value to replace is missing'))
+        elif len(bulk_edit.new_value) == 0:
+            show_error_message_on_infobar(
+                self.ui.txt_new_value,
+                _('The new value is missing'))
+        elif bulk_edit.old_value == bulk_edit.new_value:
+            show_error_message_on_infobar(
+                self.ui.txt_new_value,
+                _('The new value is the same as the old value'))
+        elif (bulk_edit.operation == OPERATION_SERVICE and
+                bulk_edit.new_value not in model_services.services):
+            show_error_message_on_infobar(
+                self.ui.txt_new_value,
+                _('The service %s does not exist') % bulk_edit.new_value)
+        elif (bulk_edit.operation == OPERATION_DESTINATION and
+                ('\'' in bulk_edit.new_value or '\\' in bulk_edit.new_value)):
+            show_error_message_on_infobar(
+                self.ui.txt_new_value,
+                _('The destination name is invalid'))
+        else:
+            show_error_message_on_infobar(None, None)
+            return bulk_edit
+
+    def on_action_preview_activate(self, action):
+        """Show the hosts and the associations affected by the change"""
+        bulk_edit = self.check_input()
+        self.ui.store_preview.clear()
+        if bulk_edit:
+            hosts = bulk_edit.filter_hosts(self.get_hosts(),
+                                           self.ui.txt_filter.get_text())
+            preview = bulk_edit.preview(hosts)
+            for group, host, affected in sorted(
+                    preview, key=lambda item: (item[0], item[1].name)):
+                treeiter = self.ui.store_preview.append(
+                    None, ('%s/%s' % (group, host.name) if group
+                           else host.name, ))
+                for item in affected:
+                    self.ui.store_preview.append(treeiter, (item, ))
+            self.ui.progress_apply.set_fraction(0.0)
+            self.ui.progress_apply.set_text(
+                _('%d hosts will be changed') % len(preview))
+
+    def on_action_confirm_activate(self, action):
+        """Apply the change to the affected hosts"""
+        def update_progress(count, total):
+            """Update the progress bar after each batch of files"""
+            self.ui.progress_apply.set_fraction(float(count) / total)
+            self.ui.progress_apply.set_text(
+                _('%d of %d hosts changed') % (count, total))
+            process_events()
+        bulk_edit = self.check_input()
+        if bulk_edit:
+            self.ui.dialog_bulk_edit.set_sensitive(False)
+            hosts = bulk_edit.filter_hosts(self.get_hosts(),
+                                           self.ui.txt_filter.get_text())
+            self.changes = bulk_edit.apply(hosts, update_progress)
+            debug.add_info(_('Bulk edit changed %d hosts') % len(self.changes))
+            self.ui.dialog_bulk_edit.set_sensitive(True)
+            self.ui.dialog_bulk_edit.response(Gtk.ResponseType.OK)
+
+    def on_infobar_error_message_response(self, widget, response_id):
+        """Close the infobar"""
+        if response_id == Gtk.ResponseType.CLOSE:
+            self.ui.infobar_error_message.set_visible(False)
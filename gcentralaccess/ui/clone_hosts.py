@@ -0,0 +1,163 @@
+##
+#     Project: gCentralAccess
+# Description: Manage external resources from a centralized management console
+#      Author: Fabio Castelli (Muflone) <muflone@vbsimple.net>
+#   Copyright: 2015-2016 Fabio Castelli
+#     License: GPL-2+
+#  This program is free software; you can redistribute it and/or modify it
+#  under the terms of the GNU General Public License as published by the Free
+#  Software Foundation; either version 2 of the License, or (at your option)
+#  any later version.
+#
+#  This program is distributed in the hope that it will be useful, but WITHOUT
+#  ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+#  FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+#  more details.
+#  You should have received a copy of the GNU General Public License along
+#  with this program; if not, write to the Free Software Foundation, Inc.,
+#  51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA
+##
+
+from gi.repository import Gtk
+
+import gcentralaccess.preferences as preferences
+import gcentralaccess.settings as settings
+from gcentralaccess.gtkbuilder_loader import GtkBuilderLoader
+from gcentralaccess.functions import (
+    get_ui_file, process_events, set_error_message_on_infobar, text, _)
+import gcentralaccess.inventory as inventory
+from gcentralaccess.clone_hosts import CloneHosts, NAME_FORMAT
+
+import gcentralaccess.ui.debug as debug
+
+SECTION_WINDOW_NAME = 'clone hosts'
+
+
+class UICloneHosts(object):
+    def __init__(self, parent, group, host):
+        """Prepare the clone hosts dialog"""
+        self.group = group
+        self.host = host
+        self.changes = []
+        # Load the user interface
+        self.ui = GtkBuilderLoader(get_ui_file('clone_hosts.glade'))
+        if not preferences.get(preferences.DETACHED_WINDOWS):
+            self.ui.dialog_clone_hosts.set_transient_for(parent)
+        # Restore the saved size and position
+        settings.positions.restore_window_position(
+            self.ui.dialog_clone_hosts, SECTION_WINDOW_NAME)
+        # Initialize actions
+        for widget in self.ui.get_objects_by_type(Gtk.Action):
+            # Connect the actions accelerators
+            widget.connect_accelerator()
+            # Set labels
+            widget.set_label(text(widget.get_label()))
+        # Initialize labels
+        for widget in self.ui.get_objects_by_type(Gtk.Label):
+            widget.set_label(text(widget.get_label()))
+            widget.set_tooltip_text(widget.get_label().replace('_', ''))
+        # Initialize tooltips
+        for widget in self.ui.get_objects_by_type(Gtk.Button):
+            action = widget.get_related_action()
+            if action:
+                widget.set_tooltip_text(action.get_label().replace('_', ''))
+        self.ui.dialog_clone_hosts.set_title(
+            _('Clone host %s') % host.name)
+        self.ui.txt_name.set_text(NAME_FORMAT)
+        self.ui.txt_name.set_tooltip_text(
+            _('Available fields: {name}, {index}, {address}'))
+        # Load the destinations to replace
+        for name in sorted(host.destinations.iterkeys()):
+            self.ui.cbo_destination.append(name, name)
+        self.ui.cbo_destination.set_active(0)
+        # Connect signals from the glade file to the module functions
+        self.ui.connect_signals(self)
+
+    def show(self):
+        """Show the clone hosts dialog"""
+        self.ui.txt_addresses.grab_focus()
+        response = self.ui.dialog_clone_hosts.run()
+        self.ui.dialog_clone_hosts.hide()
+        return response
+
+    def destroy(self):
+        """Destroy the clone hosts dialog"""
+        settings.positions.save_window_position(
+            self.ui.dialog_clone_hosts, SECTION_WINDOW_NAME)
+        self.ui.dialog_clone_hosts.destroy()
+        self.ui.dialog_clone_hosts = None
+
+    def get_addresses(self):
+        """Return the non empty addresses lines"""
+        buffer_addresses = self.ui.buffer_addresses
+        lines = buffer_addresses.get_text(buffer_addresses.get_start_iter(),
+                                          buffer_addresses.get_end_iter(),
+                                          False).splitlines()
+        return [line.strip() for line in lines if line.strip()]
+
+    def check_input(self):
+        """Check the requested copies and show any error"""
+        def show_error_message_on_infobar(widget, error_msg):
+            """Show the error message on the GtkInfoBar"""
+            set_error_message_on_infobar(
+                widget=widget,
+                widgets=(self.ui.txt_name, ),
+                label=self.ui.lbl_error_message,
+                infobar=self.ui.infobar_error_message,
+                error_msg=error_msg)
+        clone_hosts = CloneHosts(
+            host=self.host,
+            destination_name=self.ui.cbo_destination.get_active_id(),
+            name_format=self.ui.txt_name.get_text().strip())
+        addresses = self.get_addresses()
+        try:
+            names = clone_hosts.get_names(addresses)
+        except (KeyError, IndexError, ValueError):
+            names = None
+        existing_hosts = inventory.inventory.get_hosts(self.group)
+        if not addresses:
+            show_error_message_on_infobar(
+                self.ui.txt_addresses,
+                _('The addresses are missing'))
+        elif names is None:
+            show_error_message_on_infobar(
+                self.ui.txt_name,
+                _('The host names format is invalid'))
+        elif [name for name in names if not name or '\'' in name or
+              '\\' in name or '/' in name]:
+            show_error_message_on_infobar(
+                self.ui.txt_name,
+                _('The host name is invalid'))
+        elif (len(set(names)) != len(names) or
+                [name for name in names if name in existing_hosts]):
+            show_error_message_on_infobar(
+                self.ui.txt_name,
+                _('A host with that name already exists'))
+        else:
+            show_error_message_on_infobar(None, None)
+            return clone_hosts, addresses
+
+    def on_action_confirm_activate(self, action):
+        """Save all the cloned hosts"""
+        def update_progress(count, total):
+            """Update the progress bar after each batch of files"""
+            self.ui.progress_apply.set_fraction(float(count) / total)
+            self.ui.progress_apply.set_text(
+                _('%d of %d hosts saved') % (count, total))
+            process_events()
+        result = self.check_input()
+        if result:
+            clone_hosts, addresses = result
+            self.ui.dialog_clone_hosts.set_sensitive(False)
+            self.changes = clone_hosts.apply(self.group,
+                                             addresses,
+                                             update_progress)
+            debug.add_info(_('Cloned host %s %d times') % (
+                self.host.name, len(self.changes)))
+            self.ui.dialog_clone_hosts.set_sensitive(True)
+            self.ui.dialog_clone_hosts.response(Gtk.ResponseType.OK)
+
+    def on_infobar_error_message_response(self, widget, response_id):
+        """Close the infobar"""
+        if response_id == Gtk.ResponseType.CLOSE:
+            self.ui.infobar_error_message.set_visible(False)
@@ -0,0 +1,141 @@
+##
+#     Project: gCentralAccess
+# Description: Manage external resources from a centralized management console
+#      Author: Fabio Castelli (Muflone) <muflone@vbsimple.net>
+#   Copyright: 2015-2016 Fabio Castelli
+#     License: GPL-2+
+#  This program is free software; you can redistribute it and/or modify it
+#  under the terms of the GNU General Public License as published by the Free
+#  Software Foundation; either version 2 of the License, or (at your option)
+#  any later version.
+#
+#  This program is distributed in the hope that it will be useful, but WITHOUT
+#  ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+#  FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+#  more details.
+#  You should have received a copy of the GNU General Public License along
+#  with this program; if not, write to the Free Software Foundation, Inc.,
+#  51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA
+##
+from gi.repository import Gtk
+from gi.repository import Gdk
+
+import gcentralaccess.preferences as preferences
+import gcentralaccess.settings as settings
+from gcentralaccess.gtkbuilder_loader import GtkBuilderLoader
+from gcentralaccess.functions import (
+    get_ui_file, get_treeview_selected_row, call_later, cancel_call_later,
+    SEARCH_DELAY, text, _)
+import gcentralaccess.hosts_index as hosts_index
+
+SECTION_WINDOW_NAME = 'go to host'
+MAX_RESULTS = 100
+
+
+class UIGoToHost(object):
+    def __init__(self, parent, group, get_group_description):
+        """Prepare the go to host dialog"""
+        # The hosts of the current group are listed first
+        self.group = group
+        self.get_group_description = get_group_description
+        self.selected = None
+        # Load the user interface
+        self.ui = GtkBuilderLoader(get_ui_file('go_to_host.glade'))
+        if not preferences.get(preferences.DETACHED_WINDOWS):
+            self.ui.dialog_go_to_host.set_transient_for(parent)
+        # Restore the saved size and position
+        settings.positions.restore_window_position(
+            self.ui.dialog_go_to_host, SECTION_WINDOW_NAME)
+        # Initialize actions
+        for widget in self.ui.get_objects_by_type(Gtk.Action):
+            # Connect the actions accelerators
+            widget.connect_accelerator()
+            # Set labels
+            widget.set_label(text(widget.get_label()))
+        # Initialize tooltips
+        for widget in self.ui.get_objects_by_type(Gtk.Button):
+            action = widget.get_related_action()
+            if action:
+                widget.set_tooltip_text(action.get_label().replace('_', ''))
+        # Initialize column headers
+        for widget in self.ui.get_objects_by_type(Gtk.TreeViewColumn):
+            widget.set_title(text(widget.get_title()))
+        # Connect signals from the glade file to the module functions
+        self.ui.connect_signals(self)
+
+    def show(self):
+        """Show the go to host dialog and return the chosen (group, name)"""
+        self.load_hosts('')
+        self.ui.txt_name.grab_focus()
+        self.ui.dialog_go_to_host.run()
+        self.ui.dialog_go_to_host.hide()
+        return self.selected
+
+    def destroy(self):
+        """Destroy the go to host dialog"""
+        settings.positions.save_window_position(
+            self.ui.dialog_go_to_host, SECTION_WINDOW_NAME)
+        cancel_call_later(self.ui.txt_name)
+        self.ui.dialog_go_to_host.destroy()
+        self.ui.dialog_go_to_host = None
+
+    def load_hosts(self, prefix):
+        """Show the hosts whose name starts with prefix or with an address
+        matching it"""
+        results = hosts_index.hosts_index.get_names_by_prefix(prefix,
+                                                              MAX_RESULTS)
+        if prefix:
+            found = set(results)
+            for group, name in hosts_index.hosts_index.get_hosts_by_query(
+                    prefix):
+                if (name, group) not in found and len(results) < MAX_RESULTS:
+                    results.append((name, group))
+        # For the same name prefer the current group
+        results.sort(key=lambda item: (item[0].lower(),
+                                       item[1] != self.group,
+                                       item[1]))
+        self.ui.store_hosts.clear()
+        for name, group in results:
+            self.ui.store_hosts.append((name,
+                                        group,
+                                        self.get_group_description(group)))
+        if len(self.ui.store_hosts):
+            self.ui.tvw_hosts.set_cursor(0)
+
+    def on_txt_name_changed(self, widget):
+        """Search the hosts once the typing stops"""
+        call_later(widget, SEARCH_DELAY,
+                   self.on_txt_name_search_changed, widget)
+
+    def on_txt_name_search_changed(self, widget):
+        """Search the hosts matching the name"""
+        self.load_hosts(widget.get_text().strip())
+
+    def on_txt_name_key_press_event(self, widget, event):
+        """Move the selected host using the <Up> and <Down> keys"""
+        if event.keyval in (Gdk.KEY_Up, Gdk.KEY_Down):
+            selected_row = get_treeview_selected_row(self.ui.tvw_hosts)
+            if selected_row:
+                if event.keyval == Gdk.KEY_Up:
+                    treeiter = self.ui.store_hosts.iter_previous(selected_row)
+                else:
+                    treeiter = self.ui.store_hosts.iter_next(selected_row)
+                if treeiter:
+                    self.ui.tvw_hosts.set_cursor(
+                        self.ui.store_hosts.get_path(treeiter))
+            return True
+
+    def on_tvw_hosts_row_activated(self, widget, treepath, column):
+        """Go to the activated host"""
+        self.ui.action_confirm.activate()
+
+    def on_action_confirm_activate(self, action):
+        """Choose the selected host"""
+        # Search the name still waiting for the delay
+        if cancel_call_later(self.ui.txt_name):
+            self.on_txt_name_search_changed(self.ui.txt_name)
+        selected_row = get_treeview_selected_row(self.ui.tvw_hosts)
+        if selected_row:
+            row = self.ui.store_hosts[selected_row]
+            self.selected = (row[1], row[0])
+            self.ui.dialog_go_to_host.response(Gtk.ResponseType.OK)
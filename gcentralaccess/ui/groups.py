@@ -19,17 +19,14 @@
 #  51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA
 ##
 
-import os
-import os.path
-
 from gi.repository import Gtk
 
 from gcentralaccess.gtkbuilder_loader import GtkBuilderLoader
-from gcentralaccess.constants import DIR_HOSTS
 from gcentralaccess.functions import (
     get_ui_file, get_treeview_selected_row, text, _)
 import gcentralaccess.preferences as preferences
 import gcentralaccess.settings as settings
+import gcentralaccess.inventory as inventory
 
 from gcentralaccess.models.groups import ModelGroups
 from gcentralaccess.models.group_info import GroupInfo
@@ -94,7 +91,7 @@ class UIGroups(object):
         if dialog.show(default_name='',
                        title=_('Add new group'),
                        treeiter=None) == Gtk.ResponseType.OK:
-            os.mkdir(os.path.join(DIR_HOSTS, dialog.name))
+            inventory.inventory.add_group(dialog.name)
             self.model.add_data(GroupInfo(name=dialog.name,
                                           description=dialog.name))
             debug.add_info(_('Added a new group "%s"') % dialog.name)
@@ -104,6 +101,9 @@ class UIGroups(object):
         """Remove the selected group"""
         selected_row = get_treeview_selected_row(self.ui.tvw_groups)
         group_name = self.model.get_key(selected_row) if selected_row else ''
+        # Special groups cannot be removed
+        if inventory.is_special_group(group_name):
+            return
         if selected_row and group_name and show_message_dialog(
                 class_=UIMessageDialogNoYes,
                 parent=self.ui.dialog_groups,
@@ -112,9 +112,9 @@ class UIGroups(object):
                 msg1=_('Remove the group'),
                 msg2=_('Remove the group «%s»?') % group_name,
                 is_response_id=Gtk.ResponseType.YES):
-            group_path = os.path.join(DIR_HOSTS, group_name)
-            # Check for directory not empty
-            if len(os.listdir(group_path)) and not show_message_dialog(
+            hosts = inventory.inventory.get_hosts(group_name)
+            # Check for group not empty
+            if len(hosts) and not show_message_dialog(
                     class_=UIMessageDialogNoYes,
                     parent=self.ui.dialog_groups,
                     message_type=Gtk.MessageType.WARNING,
@@ -130,9 +130,7 @@ class UIGroups(object):
                     is_response_id=Gtk.ResponseType.YES):
                 # Exit immediately without deleting the group
                 return
-            # Delete all the contained files and the directory for the group
-            for filename in os.listdir(group_path):
-                os.remove(os.path.join(group_path, filename))
-            os.rmdir(group_path)
+            # Delete all the contained hosts and the directory for the group
+            inventory.inventory.remove_group(group_name)
             debug.add_info(_('Removed the group "%s"') % group_name)
             self.model.remove(selected_row)
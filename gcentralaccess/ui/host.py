@@ -18,8 +18,6 @@
 #  51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA
 ##
 
-import json
-
 from gi.repository import Gtk
 
 from gcentralaccess.gtkbuilder_loader import GtkBuilderLoader
@@ -28,11 +26,16 @@ from gcentralaccess.functions import (
     set_error_message_on_infobar, text, _)
 import gcentralaccess.preferences as preferences
 import gcentralaccess.settings as settings
+import gcentralaccess.pixbuf_cache as pixbuf_cache
+import gcentralaccess.inventory as inventory
+import gcentralaccess.hosts_index as hosts_index
+from gcentralaccess.tags_index import TAG_NAME, TAG_OPERATORS
 
 import gcentralaccess.models.services as model_services
 from gcentralaccess.models.destinations import ModelDestinations
 from gcentralaccess.models.destination_info import DestinationInfo
 from gcentralaccess.models.associations import ModelAssociations
+from gcentralaccess.models.association_info import AssociationInfo
 
 from gcentralaccess.ui.destination import UIDestination
 from gcentralaccess.ui.service_association import UIServiceAssociation
@@ -43,9 +46,11 @@ SECTION_WINDOW_NAME = 'host'
 
 
 class UIHost(object):
-    def __init__(self, parent, hosts):
+    def __init__(self, parent, hosts, templates, group):
         """Prepare the host dialog"""
         self.hosts = hosts
+        self.templates = templates
+        self.group = group
         # Load the user interface
         self.ui = GtkBuilderLoader(get_ui_file('host.glade'))
         if not preferences.get(preferences.DETACHED_WINDOWS):
@@ -74,7 +79,23 @@ class UIHost(object):
         # Load the destinations
         self.model_destinations = ModelDestinations(self.ui.store_destinations)
         self.model_associations = ModelAssociations(self.ui.store_associations)
+        self.ui.column_associations_service.set_cell_data_func(
+            self.ui.cell_associations_icon,
+            self.model_associations.cell_icon_data)
+        pixbuf_cache.pixbuf_cache.connect(
+            self.model_associations.refresh_icons)
+        self.ui.column_associations_arguments.set_cell_data_func(
+            self.ui.cell_associations_arguments,
+            self.model_associations.cell_arguments_data)
         self.selected_iter = None
+        # Group and name of the copied host
+        self.source = None
+        # Destinations or associations changed by the user
+        self.details_changed = False
+        # Load the templates
+        self.ui.cbo_template.append('', _('No template'))
+        for template in sorted(self.templates):
+            self.ui.cbo_template.append(template, template)
         # Sort the data in the models
         self.model_destinations.model.set_sort_column_id(
             self.ui.column_destinations_name.get_sort_column_id(),
@@ -82,13 +103,18 @@ class UIHost(object):
         # Connect signals from the glade file to the module functions
         self.ui.connect_signals(self)
 
-    def show(self, default_name, default_description, title, treeiter):
+    def show(self, default_name, default_description, default_template,
+             title, treeiter, default_tags=None, source=None):
         """Show the destinations dialog"""
         self.ui.txt_name.set_text(default_name)
         self.ui.txt_description.set_text(default_description)
+        self.ui.txt_tags.set_text(', '.join(default_tags or []))
+        if not self.ui.cbo_template.set_active_id(default_template):
+            self.ui.cbo_template.set_active_id('')
         self.ui.txt_name.grab_focus()
         self.ui.dialog_host.set_title(title)
         self.selected_iter = treeiter
+        self.source = source
         self.model_associations.model.set_sort_column_id(
             self.ui.column_associations_destination.get_sort_column_id(),
             Gtk.SortType.ASCENDING)
@@ -97,12 +123,25 @@ class UIHost(object):
         self.ui.dialog_host.hide()
         self.name = self.ui.txt_name.get_text().strip()
         self.description = self.ui.txt_description.get_text().strip()
+        self.template = self.ui.cbo_template.get_active_id() or ''
+        self.tags = self.get_tags()
         return response
 
+    def get_tags(self):
+        """Return the list of the unique tags"""
+        tags = []
+        for tag in self.ui.txt_tags.get_text().split(','):
+            tag = tag.strip()
+            if tag and tag not in tags:
+                tags.append(tag)
+        return tags
+
     def destroy(self):
         """Destroy the destinations dialog"""
         settings.positions.save_window_position(
             self.ui.dialog_host, SECTION_WINDOW_NAME)
+        pixbuf_cache.pixbuf_cache.disconnect(
+            self.model_associations.refresh_icons)
         self.ui.dialog_host.destroy()
         self.ui.dialog_host = None
 
@@ -115,6 +154,7 @@ class UIHost(object):
                        treeiter=None) == Gtk.ResponseType.OK:
             self.model_destinations.add_data(
                 DestinationInfo(name=dialog.name, value=dialog.value))
+            self.details_changed = True
         # Get the new destinations list, clear and store the list again
         dialog.destroy()
 
@@ -136,6 +176,7 @@ class UIHost(object):
                 self.model_destinations.set_data(
                     selected_iter, DestinationInfo(name=dialog.name,
                                                    value=dialog.value))
+                self.details_changed = True
             dialog.destroy()
 
     def on_action_destinations_remove_activate(self, action):
@@ -150,6 +191,7 @@ class UIHost(object):
                 msg2=_("Remove the selected destination?"),
                 is_response_id=Gtk.ResponseType.YES):
             self.model_destinations.remove(selected_row)
+            self.details_changed = True
 
     def on_tvw_destinations_row_activated(self, widget, treepath, column):
         """Edit the selected row on activation"""
@@ -161,7 +203,8 @@ class UIHost(object):
             """Show the error message on the GtkInfoBar"""
             set_error_message_on_infobar(
                 widget=widget,
-                widgets=(self.ui.txt_name, self.ui.txt_description),
+                widgets=(self.ui.txt_name, self.ui.txt_description,
+                         self.ui.txt_tags),
                 label=self.ui.lbl_error_message,
                 infobar=self.ui.infobar_error_message,
                 error_msg=error_msg)
@@ -187,9 +230,47 @@ class UIHost(object):
             show_error_message_on_infobar(
                 self.ui.txt_description,
                 _('The host description is missing'))
-        else:
+        elif not all(TAG_NAME.match(tag) and
+                     tag.lower() not in TAG_OPERATORS
+                     for tag in self.get_tags()):
+            # Show error for invalid tags
+            show_error_message_on_infobar(
+                self.ui.txt_tags,
+                _('The tags are invalid'))
+        elif self.confirm_duplicates(name):
             self.ui.dialog_host.response(Gtk.ResponseType.OK)
 
+    def confirm_duplicates(self, name):
+        """Warn about the same host name or addresses in other groups"""
+        # The templates are not real hosts
+        if inventory.is_special_group(self.group):
+            return True
+        duplicates = []
+        for group in sorted(hosts_index.hosts_index.get_groups(name)):
+            if group != self.group and not inventory.is_special_group(group):
+                duplicates.append(_('Host %s in the group %s') % (
+                    name, group or _('Default group')))
+        for destination in self.model_destinations.dump().itervalues():
+            for group, host_name in sorted(
+                    hosts_index.hosts_index.get_hosts_by_address(
+                        destination.value)):
+                # The copied host shares its addresses with the copy
+                if (group != self.group and
+                        (group, host_name) != self.source and
+                        not inventory.is_special_group(group)):
+                    duplicates.append(_('Address %s used by %s') % (
+                        destination.value,
+                        '%s/%s' % (group, host_name) if group else host_name))
+        return not duplicates or show_message_dialog(
+            class_=UIMessageDialogNoYes,
+            parent=self.ui.dialog_host,
+            message_type=Gtk.MessageType.WARNING,
+            title=None,
+            msg1=_('The host is already defined'),
+            msg2='%s\n\n%s' % ('\n'.join(duplicates[:10]),
+                                _('Do you want to save the host anyway?')),
+            is_response_id=Gtk.ResponseType.YES)
+
     def on_infobar_error_message_response(self, widget, response_id):
         """Close the infobar"""
         if response_id == Gtk.ResponseType.CLOSE:
@@ -203,6 +284,10 @@ class UIHost(object):
         """Check the host description field"""
         check_invalid_input(widget, False, True, True)
 
+    def on_txt_tags_changed(self, widget):
+        """Check the host tags field"""
+        check_invalid_input(widget, True, True, False)
+
     def on_notebook_switch_page(self, widget, children, number):
         """Disable GtkActionGroup on page change"""
         self.ui.actions_destinations.set_sensitive(number == 0)
@@ -220,10 +305,12 @@ class UIHost(object):
         if dialog.show('', None, None) == Gtk.ResponseType.OK:
             self.model_associations.add_data(
                 self.model_associations.count() + 1,
-                dialog.destination,
-                dialog.description,
-                model_services.services[dialog.service],
-                dialog.arguments)
+                AssociationInfo(dialog.description,
+                                dialog.destination,
+                                dialog.service,
+                                dialog.arguments),
+                model_services.services[dialog.service])
+            self.details_changed = True
         dialog.destroy()
 
     def on_action_associations_remove_activate(self, action):
@@ -238,6 +325,7 @@ class UIHost(object):
                 msg2=_("Remove the selected association?"),
                 is_response_id=Gtk.ResponseType.YES):
             self.model_associations.remove(selected_row)
+            self.details_changed = True
 
     def on_action_associations_edit_activate(self, action):
         """Edit the selected service association"""
@@ -252,14 +340,17 @@ class UIHost(object):
                     model.get_description(selected_row),
                     model.get_destination_name(selected_row),
                     model.get_service_name(selected_row),
-                    json.loads(model.get_arguments(selected_row))
+                    model.get_arguments(selected_row)
                     ) == Gtk.ResponseType.OK:
+                # Replace the association as it can be shared with other hosts
                 model.set_data(
                     treeiter=selected_iter,
-                    description=dialog.description,
-                    destination_name=dialog.destination,
-                    service=model_services.services[dialog.service],
-                    arguments=dialog.arguments)
+                    association=AssociationInfo(dialog.description,
+                                                dialog.destination,
+                                                dialog.service,
+                                                dialog.arguments),
+                    service=model_services.services[dialog.service])
+                self.details_changed = True
             dialog.destroy()
 
     def on_tvw_associations_row_activated(self, widget, treepath, column):
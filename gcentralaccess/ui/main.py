@@ -18,20 +18,30 @@
 #  51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA
 ##
 
-import os
-import os.path
-import json
-
 from gi.repository import Gtk
 from gi.repository import Gdk
 
 from gcentralaccess.constants import (
     APP_NAME,
-    FILE_SETTINGS, FILE_WINDOWS_POSITION, FILE_SERVICES, DIR_HOSTS)
+    FILE_SETTINGS, FILE_WINDOWS_POSITION, FILE_SERVICES)
 from gcentralaccess.functions import (
-    get_ui_file, get_treeview_selected_row, show_popup_menu, text, _)
+    get_ui_file, get_treeview_path, get_treeview_selected_row,
+    process_events, show_popup_menu, call_later, cancel_call_later,
+    SEARCH_DELAY, text, _)
 import gcentralaccess.preferences as preferences
 import gcentralaccess.settings as settings
+import gcentralaccess.inventory as inventory
+import gcentralaccess.catalog as catalog
+import gcentralaccess.templates as templates
+import gcentralaccess.services_index as services_index
+import gcentralaccess.journal as journal
+import gcentralaccess.search_index as search_index
+import gcentralaccess.quick_connect as quick_connect
+import gcentralaccess.hosts_index as hosts_index
+import gcentralaccess.smart_groups as smart_groups
+import gcentralaccess.tags_index as tags_index
+import gcentralaccess.pixbuf_cache as pixbuf_cache
+import gcentralaccess.session_logs as session_logs
 from gcentralaccess.gtkbuilder_loader import GtkBuilderLoader
 
 import gcentralaccess.models.services as model_services
@@ -40,7 +50,6 @@ from gcentralaccess.models.host_info import HostInfo
 from gcentralaccess.models.hosts import ModelHosts
 from gcentralaccess.models.group_info import GroupInfo
 from gcentralaccess.models.groups import ModelGroups
-from gcentralaccess.models.destination_info import DestinationInfo
 
 import gcentralaccess.ui.debug as debug
 import gcentralaccess.ui.processes as processes
@@ -48,6 +57,11 @@ from gcentralaccess.ui.about import UIAbout
 from gcentralaccess.ui.services import UIServices
 from gcentralaccess.ui.groups import UIGroups
 from gcentralaccess.ui.host import UIHost
+from gcentralaccess.ui.bulk_edit import UIBulkEdit
+from gcentralaccess.ui.clone_hosts import UICloneHosts
+from gcentralaccess.ui.quick_connect import UIQuickConnect
+from gcentralaccess.ui.go_to_host import UIGoToHost
+from gcentralaccess.ui.smart_group import UISmartGroup
 from gcentralaccess.ui.message_dialog import (
     show_message_dialog, UIMessageDialogNoYes, UIMessageDialogClose)
 
@@ -57,19 +71,7 @@ OPTION_SERVICE_DESCRIPTION = 'description'
 OPTION_SERVICE_COMMAND = 'command'
 OPTION_SERVICE_TERMINAL = 'terminal'
 OPTION_SERVICE_ICON = 'icon'
-# Section and options for host
-SECTION_HOST = 'host'
-OPTION_HOST_NAME = 'name'
-OPTION_HOST_DESCRIPTION = 'description'
-OPTION_HOST_ASSOCIATIONS = 'associations'
-# Section for destinations
-SECTION_DESTINATIONS = 'destinations'
-# Section and options for associations
-SECTION_ASSOCIATION = 'association'
-OPTION_ASSOCIATION_DESCRIPTION = 'description'
-OPTION_ASSOCIATION_DESTINATION = 'destination'
-OPTION_ASSOCIATION_SERVICE = 'service'
-OPTION_ASSOCIATION_ARGUMENTS = 'arguments'
+OPTION_SERVICE_LOG = 'log'
 
 
 class UIMain(object):
@@ -91,9 +93,19 @@ class UIMain(object):
                 terminal=settings.services.get_boolean(
                     key, OPTION_SERVICE_TERMINAL),
                 icon=settings.services.get(
-                    key, OPTION_SERVICE_ICON))
+                    key, OPTION_SERVICE_ICON),
+                log=settings.services.get_boolean(
+                    key, OPTION_SERVICE_LOG))
         self.loadUI()
         self.model_hosts = ModelHosts(self.ui.store_hosts)
+        # Render the associations rows from their objects
+        self.ui.column_services.set_cell_data_func(
+            self.ui.cell_icon, self.model_hosts.cell_icon_data)
+        pixbuf_cache.pixbuf_cache.connect(self.model_hosts.refresh_icons)
+        self.ui.column_services.set_cell_data_func(
+            self.ui.cell_association, self.model_hosts.cell_association_data)
+        self.ui.column_services.set_cell_data_func(
+            self.ui.cell_arguments, self.model_hosts.cell_arguments_data)
         self.model_groups = ModelGroups(self.ui.store_groups)
         # Prepare the debug dialog
         debug.debug = debug.UIDebug(self.ui.win_main,
@@ -102,7 +114,34 @@ class UIMain(object):
         processes.processes = processes.UIProcesses(
             self.ui.win_main, self.on_window_processes_delete_event)
         # Load the groups and hosts list
+        inventory.inventory = inventory.Inventory()
+        # Reuse the hosts of the unchanged files from the catalog
+        catalog.catalog = catalog.Catalog()
+        catalog.catalog.load()
+        inventory.inventory.load(catalog.catalog)
+        catalog.catalog.sync(inventory.inventory)
+        inventory.inventory.connect(catalog.catalog.on_inventory_changed)
+        templates.templates = templates.Templates(inventory.inventory)
+        services_index.services_index = services_index.ServicesIndex(
+            inventory.inventory)
+        journal.journal = journal.Journal(inventory.inventory)
+        search_index.search_index = search_index.SearchIndex(
+            inventory.inventory)
+        quick_connect.quick_connect = quick_connect.QuickConnect(
+            inventory.inventory)
+        hosts_index.hosts_index = hosts_index.HostsIndex(inventory.inventory)
+        smart_groups.smart_groups = smart_groups.SmartGroups(
+            inventory.inventory)
+        tags_index.tags_index = tags_index.TagsIndex(inventory.inventory)
+        inventory.inventory.connect(self.on_inventory_changed)
+        session_logs.session_logs = session_logs.SessionLogs()
+        self.update_journal_actions()
         self.hosts = {}
+        # Real group of the hosts shown from a smart group
+        self.hosts_groups = {}
+        # Bitset of the hosts matching the tags filter
+        self.tags_filter = None
+        self.ui.filter_hosts.set_visible_func(self.filter_hosts_visible)
         self.reload_groups()
         # Sort the data in the models
         self.model_groups.model.set_sort_column_id(
@@ -142,6 +181,8 @@ class UIMain(object):
         icon_size = preferences.ICON_SIZE
         self.ui.cell_name.props.height = preferences.get(icon_size)
         self.ui.cell_group_name.props.height = preferences.get(icon_size)
+        # The search results are already filtered by the search index
+        self.ui.completion_search.set_match_func(lambda *args: True, None)
         # Set groups visibility
         self.ui.scroll_groups.set_visible(
             preferences.get(preferences.GROUPS_SHOW))
@@ -211,6 +252,8 @@ class UIMain(object):
         settings.positions.save()
         settings.services.save()
         settings.settings.save()
+        search_index.search_index.save()
+        catalog.catalog.save(inventory.inventory)
         self.application.quit()
 
     def on_action_about_activate(self, action):
@@ -227,23 +270,29 @@ class UIMain(object):
 
     def on_action_services_activate(self, action):
         """Edit services"""
-        selected_row = get_treeview_selected_row(self.ui.tvw_connections)
-        if selected_row:
-            iter_parent = self.ui.store_hosts.iter_parent(selected_row)
-            selected_path = self.model_hosts.model[selected_row].path
-            # Get the path of the host
-            if iter_parent is None:
-                tree_path = self.model_hosts.model[selected_row].path
-            else:
-                tree_path = self.model_hosts.model[iter_parent].path
-            expanded = self.ui.tvw_connections.row_expanded(tree_path)
+        old_services = model_services.services
         dialog_services = UIServices(parent=self.ui.win_main)
         # Load services list
         dialog_services.model.load(model_services.services)
         dialog_services.show()
         # Get the new services list, clear and store the list again
         model_services.services = dialog_services.model.dump()
+        # Only the previously existing services still existing can be renamed
+        renamed = dict([(name, new_name) for (name, new_name)
+                        in dialog_services.renamed.iteritems()
+                        if name in old_services and
+                        new_name in model_services.services])
+        removed = set([name for name in old_services
+                       if name not in model_services.services and
+                       name not in renamed])
+        # Services added or whose icon was changed
+        changed = set([name for name in model_services.services
+                       if name not in old_services or
+                       old_services[name].icon !=
+                       model_services.services[name].icon])
         dialog_services.destroy()
+        debug.add_info('Icons cache: %d hits, %d misses' % (
+            pixbuf_cache.pixbuf_cache.hits, pixbuf_cache.pixbuf_cache.misses))
         settings.services.clear()
         for key in model_services.services.iterkeys():
             settings.services.set(
@@ -262,137 +311,187 @@ class UIMain(object):
                 section=key,
                 option=OPTION_SERVICE_ICON,
                 value=model_services.services[key].icon)
-        self.reload_hosts()
-        if selected_row:
-            # Automatically expand the row if it was expanded before
-            if expanded:
-                self.ui.tvw_connections.expand_row(tree_path, True)
-            # Automatically select again the previously selected row
-            self.ui.tvw_connections.set_cursor(path=selected_path,
-                                               column=None,
-                                               start_editing=False)
+            settings.services.set_boolean(
+                section=key,
+                option=OPTION_SERVICE_LOG,
+                value=model_services.services[key].log)
+        self.propagate_services(renamed, removed, changed)
+
+    def propagate_services(self, renamed, removed, changed):
+        """Rewrite only the hosts using the renamed or removed services
+        and refresh only the affected rows"""
+        def update_progress(count, total):
+            """Keep the interface responsive after each batch of files"""
+            debug.add_info('Updated %d of %d hosts for the changed services' %
+                           (count, total))
+            process_events()
+        index = services_index.services_index
+        affected = sorted(index.get_hosts(renamed.keys() + list(removed)))
+        # The hosts not to rewrite are refreshed immediately
+        self.refresh_hosts(index.get_hosts(changed).difference(affected))
+        if affected:
+            # A single transaction is a single journal entry to undo, the
+            # window is disabled to avoid other changes while it's written
+            transaction = inventory.inventory.begin()
+            for group, name in affected:
+                host = inventory.inventory.get_host(group, name)
+                if host is not None:
+                    transaction.set_host(group, services_index.edit_host(
+                        host, renamed, removed))
+            self.ui.win_main.set_sensitive(False)
+            try:
+                transaction.commit(update_progress)
+            finally:
+                self.ui.win_main.set_sensitive(True)
+            self.refresh_hosts(affected)
 
     def reload_hosts(self):
-        """Load hosts from the settings files"""
+        """Load hosts from the inventory"""
         self.model_hosts.clear()
         self.hosts.clear()
-        hosts_path = self.get_current_group_path()
+        self.hosts_groups.clear()
+        group = self.get_current_group()
+        if smart_groups.is_smart_group(group):
+            self.reload_smart_group_hosts(group)
+            return
         # Fix bug where the groups model isn't yet emptied, resulting in
-        # being still used after a clear, then an invalid path
-        if not os.path.isdir(hosts_path):
+        # being still used after a clear, then an invalid group
+        if group not in inventory.inventory.get_groups():
             return
-        for filename in os.listdir(hosts_path):
-            # Skip folders, used for groups
-            if os.path.isdir(os.path.join(hosts_path, filename)):
+        for host in inventory.inventory.get_hosts(group).itervalues():
+            debug.add_info('Loading host %s' % inventory.get_host_filename(
+                group, host.name))
+            self.add_host(host, None, False)
+
+    def reload_smart_group_hosts(self, group):
+        """Load the hosts of a smart group from its cached members"""
+        name = group[len(smart_groups.SMART_GROUP_PREFIX):]
+        for host_group, host_name in sorted(
+                smart_groups.smart_groups.get_members(name)):
+            host = inventory.inventory.get_host(host_group, host_name)
+            if host is None:
+                continue
+            if host_name in self.hosts:
+                debug.add_warning('host %s is also in group %s' % (
+                    host_name, host_group))
                 continue
-            debug.add_info('Loading host %s' % os.path.join(hosts_path,
-                                                            filename))
-            settings_host = settings.Settings(
-                filename=os.path.join(hosts_path, filename),
-                case_sensitive=True)
-            name = settings_host.get(SECTION_HOST, OPTION_HOST_NAME)
-            description = settings_host.get(SECTION_HOST,
-                                            OPTION_HOST_DESCRIPTION)
-            host = HostInfo(name=name, description=description)
-            destinations = {}
-            # Load host destinations
-            if SECTION_DESTINATIONS in settings_host.get_sections():
-                for option in settings_host.get_options(SECTION_DESTINATIONS):
-                    value = settings_host.get(SECTION_DESTINATIONS, option)
-                    destinations[option] = DestinationInfo(name=option,
-                                                           value=value)
-            # Load associations
-            association_index = 1
-            associations_count = settings_host.get_int(
-                section=SECTION_HOST, option=OPTION_HOST_ASSOCIATIONS)
-            while association_index <= associations_count:
-                section = '%s %d' % (SECTION_ASSOCIATION, association_index)
-                host.add_association(
-                    description=settings_host.get(
-                        section=section,
-                        option=OPTION_ASSOCIATION_DESCRIPTION),
-                    destination_name=settings_host.get(
-                        section=section,
-                        option=OPTION_ASSOCIATION_DESTINATION),
-                    service_name=settings_host.get(
-                        section=section,
-                        option=OPTION_ASSOCIATION_SERVICE),
-                    arguments=json.loads(settings_host.get(
-                        section=section,
-                        option=OPTION_ASSOCIATION_ARGUMENTS)))
-                association_index += 1
-            self.add_host(host, destinations, False)
-
-    def add_host(self, host, destinations, update_settings):
-        """Add a new host along as with its destinations"""
+            self.hosts_groups[host_name] = host_group
+            self.add_host(host, None, False)
+
+    def get_host_group(self, name):
+        """Return the real group of a shown host"""
+        return self.hosts_groups.get(name, self.get_current_group())
+
+    def get_connections_path(self, treeiter):
+        """Return the shown path of a hosts row or None if filtered out"""
+        return get_treeview_path(self.ui.tvw_connections,
+                                 self.model_hosts.get_path(treeiter))
+
+    def filter_hosts_visible(self, model, treeiter, data):
+        """Show only the hosts matching the tags filter"""
+        if self.tags_filter is None or model.iter_parent(treeiter):
+            return True
+        name = model[treeiter][0]
+        if name is None:
+            return False
+        return tags_index.tags_index.get_position(
+            self.get_host_group(name), name) in self.tags_filter
+
+    def apply_tags_filter(self):
+        """Evaluate the tags filter and show the matching hosts"""
+        expression = self.ui.txt_tags_filter.get_text().strip()
+        style = self.ui.txt_tags_filter.get_style_context()
+        try:
+            # Every row looks up its host position in a set of the
+            # matching positions
+            self.tags_filter = (set(tags_index.tags_index.get_positions(
+                tags_index.tags_index.evaluate(expression)))
+                if expression else None)
+            style.remove_class(Gtk.STYLE_CLASS_ERROR)
+            self.ui.txt_tags_filter.set_tooltip_text(None)
+        except ValueError as error:
+            # Keep the previous filter for an invalid expression
+            style.add_class(Gtk.STYLE_CLASS_ERROR)
+            self.ui.txt_tags_filter.set_tooltip_text(str(error))
+            return
+        self.ui.filter_hosts.refilter()
+
+    def on_txt_tags_filter_changed(self, widget):
+        """Filter the hosts by their tags once the typing stops"""
+        call_later(widget, SEARCH_DELAY, self.apply_tags_filter)
+
+    def add_host(self, host, destinations, update_settings, old_name=None):
+        """Add a new host along as with its destinations, if any"""
+        # Add the destinations to the data
+        if destinations is not None and destinations is not host.destinations:
+            for destination_name in destinations:
+                destination = destinations[destination_name]
+                host.add_destination(item=destination)
+        # Update settings file if requested
+        if update_settings:
+            inventory.inventory.set_host(self.get_current_group(),
+                                         host,
+                                         old_name)
         # Add the host to the data and to the model
         self.hosts[host.name] = host
         treeiter = self.model_hosts.add_data(host)
-        # Add the destinations to the data
-        for destination_name in destinations:
-            destination = destinations[destination_name]
-            host.add_destination(item=destination)
-        # Add service associations to the model
-        for association in host.associations:
-            description = association.description
+        self.add_associations(treeiter, host)
+
+    def add_associations(self, treeiter, host):
+        """Add the service associations of a host to the model"""
+        # Include the associations inherited from the templates
+        resolved = templates.templates.resolve(self.get_host_group(host.name),
+                                               host)
+        for association in resolved.associations:
             service_name = association.service_name
-            service_arguments = json.dumps(association.service_arguments)
-            destination = destinations[association.destination_name]
-            if service_name in model_services.services:
+            destination = resolved.destinations.get(
+                association.destination_name)
+            if destination is None:
+                debug.add_warning('destination %s not found' %
+                                  association.destination_name)
+            elif service_name in model_services.services:
                 service = model_services.services[service_name]
                 self.model_hosts.add_association(treeiter=treeiter,
-                                                 description=description,
+                                                 association=association,
                                                  destination=destination,
-                                                 service=service,
-                                                 arguments=service_arguments)
+                                                 service=service)
             else:
                 debug.add_warning('service %s not found' % service_name)
-        # Update settings file if requested
-        if update_settings:
-            hosts_path = self.get_current_group_path()
-            settings_host = settings.Settings(
-                filename=os.path.join(hosts_path, '%s.conf' % host.name),
-                case_sensitive=True)
-            # Add host information
-            settings_host.set(SECTION_HOST, OPTION_HOST_NAME, host.name)
-            settings_host.set(SECTION_HOST, OPTION_HOST_DESCRIPTION,
-                              host.description)
-            # Add destinations
-            for key in host.destinations:
-                destination = host.destinations[key]
-                settings_host.set(section=SECTION_DESTINATIONS,
-                                  option=destination.name,
-                                  value=destination.value)
-            association_index = 0
-            for association in host.associations:
-                arguments = json.dumps(association.service_arguments)
-                # Add associations to the settings
-                association_index += 1
-                section = '%s %d' % (SECTION_ASSOCIATION, association_index)
-                settings_host.set(section=section,
-                                  option=OPTION_ASSOCIATION_DESCRIPTION,
-                                  value=association.description)
-                settings_host.set(section=section,
-                                  option=OPTION_ASSOCIATION_DESTINATION,
-                                  value=association.destination_name)
-                settings_host.set(section=section,
-                                  option=OPTION_ASSOCIATION_SERVICE,
-                                  value=association.service_name)
-                settings_host.set(section=section,
-                                  option=OPTION_ASSOCIATION_ARGUMENTS,
-                                  value=arguments)
-            settings_host.set_int(section=SECTION_HOST,
-                                  option=OPTION_HOST_ASSOCIATIONS,
-                                  value=association_index)
-            # Save the settings to the file
-            settings_host.save()
-
-    def remove_host(self, name):
+
+    def refresh_hosts(self, keys):
+        """Refresh the associations rows of the (group, name) hosts shown
+        in the current group, along as with the dependants of the templates"""
+        # The hosts of a smart group belong to their real groups
+        shown = set((self.get_host_group(name), name) for name in self.hosts)
+        refreshed = set()
+        for key in keys:
+            if key in shown:
+                refreshed.add(key)
+            if key[0] == inventory.GROUP_TEMPLATES:
+                refreshed.update(
+                    templates.templates.get_dependants(key[1]) & shown)
+        for group, name in refreshed:
+            host = inventory.inventory.get_host(group, name)
+            treeiter = self.model_hosts.get_iter(name)
+            if host is None or treeiter is None:
+                continue
+            # Replace the associations rows keeping the expanded status
+            tree_path = self.get_connections_path(treeiter)
+            expanded = (tree_path is not None and
+                        self.ui.tvw_connections.row_expanded(tree_path))
+            child = self.ui.store_hosts.iter_children(treeiter)
+            while child:
+                if not self.ui.store_hosts.remove(child):
+                    child = None
+            self.hosts[name] = host
+            self.add_associations(treeiter, host)
+            if expanded:
+                self.ui.tvw_connections.expand_row(tree_path, True)
+
+    def remove_host(self, name, update_settings=True):
         """Remove a host by its name"""
-        hosts_path = self.get_current_group_path()
-        filename = os.path.join(hosts_path, '%s.conf' % name)
-        if os.path.isfile(filename):
-            os.unlink(filename)
+        if update_settings:
+            inventory.inventory.remove_host(self.get_current_group(), name)
         self.hosts.pop(name)
         self.model_hosts.remove(self.model_hosts.get_iter(name))
 
@@ -401,40 +500,46 @@ class UIMain(object):
         self.model_groups.clear()
         # Always add a default group
         self.model_groups.add_data(GroupInfo('', _('Default group')))
-        for filename in os.listdir(DIR_HOSTS):
-            if os.path.isdir(os.path.join(DIR_HOSTS, filename)):
+        self.model_groups.add_data(GroupInfo(inventory.GROUP_TEMPLATES,
+                                             _('Templates')))
+        for group in inventory.inventory.get_groups():
+            if group and not inventory.is_special_group(group):
                 # For each folder add a new group
-                self.model_groups.add_data(GroupInfo(filename, filename))
+                self.model_groups.add_data(GroupInfo(group, group))
+        for name in smart_groups.smart_groups.get_names():
+            self.model_groups.add_data(GroupInfo(
+                smart_groups.get_smart_group_key(name), name))
 
     def on_action_new_activate(self, action):
         """Define a new host"""
-        dialog = UIHost(parent=self.ui.win_main, hosts=self.model_hosts)
+        dialog = UIHost(parent=self.ui.win_main,
+                        hosts=self.model_hosts,
+                        templates=self.get_templates_names(),
+                        group=self.get_current_group())
         response = dialog.show(default_name='',
                                default_description='',
+                               default_template='',
                                title=_('Add a new host'),
-                               treeiter=None)
+                               treeiter=None,
+                               default_tags=[])
         if response == Gtk.ResponseType.OK:
             destinations = dialog.model_destinations.dump()
             associations = dialog.model_associations.dump()
-            host = HostInfo(dialog.name, dialog.description)
+            host = HostInfo(dialog.name, dialog.description, dialog.template,
+                            dialog.tags)
             # Set the associations
-            for values in associations:
-                (destination_name, description, service_name,
-                    service_arguments) = associations[values]
-                destination = destinations[destination_name]
-                arguments = json.loads(service_arguments)
-                host.add_association(description=description,
-                                     destination_name=destination_name,
-                                     service_name=service_name,
-                                     arguments=arguments)
+            for key in sorted(associations):
+                host.add_association_info(associations[key])
             self.add_host(host=host,
                           destinations=destinations,
                           update_settings=True)
             # Automatically select the newly added host
-            self.ui.tvw_connections.set_cursor(
-                path=self.model_hosts.get_path_by_name(dialog.name),
-                column=None,
-                start_editing=False)
+            tree_path = self.get_connections_path(
+                self.model_hosts.get_iter(dialog.name))
+            if tree_path is not None:
+                self.ui.tvw_connections.set_cursor(path=tree_path,
+                                                   column=None,
+                                                   start_editing=False)
         dialog.destroy()
 
     def on_action_edit_activate(self, action):
@@ -447,9 +552,11 @@ class UIMain(object):
                 description = self.model_hosts.get_description(selected_row)
                 selected_iter = self.model_hosts.get_iter(name)
                 expanded = self.ui.tvw_connections.row_expanded(
-                    self.model_hosts.get_path(selected_iter))
+                    self.get_connections_path(selected_iter))
                 dialog = UIHost(parent=self.ui.win_main,
-                                hosts=self.model_hosts)
+                                hosts=self.model_hosts,
+                                templates=self.get_templates_names(name),
+                                group=self.get_current_group())
                 # Restore the destinations for the selected host
                 destinations = self.hosts[name].destinations
                 for destination_name in destinations:
@@ -461,46 +568,48 @@ class UIMain(object):
                     if service_name in model_services.services:
                         dialog.model_associations.add_data(
                             index=dialog.model_associations.count(),
-                            name=association.destination_name,
-                            description=association.description,
-                            service=model_services.services[service_name],
-                            arguments=association.service_arguments)
+                            association=association,
+                            service=model_services.services[service_name])
                     else:
                         debug.add_warning('service %s not found' %
                                           service_name)
                 # Show the edit host dialog
                 response = dialog.show(default_name=name,
                                        default_description=description,
+                                       default_template=self.hosts[
+                                           name].template,
                                        title=_('Edit host'),
-                                       treeiter=selected_iter)
+                                       treeiter=selected_iter,
+                                       default_tags=self.hosts[name].tags)
                 if response == Gtk.ResponseType.OK:
                     # Remove older host and add the newer
                     destinations = dialog.model_destinations.dump()
                     associations = dialog.model_associations.dump()
-                    host = HostInfo(dialog.name, dialog.description)
+                    host = HostInfo(dialog.name,
+                                    dialog.description,
+                                    dialog.template,
+                                    dialog.tags)
                     # Set the associations
-                    for values in associations:
-                        (destination_name, description, service_name,
-                            service_arguments) = associations[values]
-                        destination = destinations[destination_name]
-                        arguments = json.loads(service_arguments)
-                        host.add_association(description=description,
-                                             destination_name=destination_name,
-                                             service_name=service_name,
-                                             arguments=arguments)
-                    self.remove_host(name)
+                    for key in sorted(associations):
+                        host.add_association_info(associations[key])
+                    self.remove_host(name, False)
                     self.add_host(host=host,
                                   destinations=destinations,
-                                  update_settings=True)
+                                  update_settings=True,
+                                  old_name=name)
                     # Get the path of the host
-                    tree_path = self.model_hosts.get_path_by_name(dialog.name)
-                    # Automatically select again the previously selected host
-                    self.ui.tvw_connections.set_cursor(path=tree_path,
-                                                       column=None,
-                                                       start_editing=False)
-                    # Automatically expand the row if it was expanded before
-                    if expanded:
-                        self.ui.tvw_connections.expand_row(tree_path, False)
+                    tree_path = self.get_connections_path(
+                        self.model_hosts.get_iter(dialog.name))
+                    if tree_path is not None:
+                        # Automatically select again the previously selected
+                        # host
+                        self.ui.tvw_connections.set_cursor(path=tree_path,
+                                                           column=None,
+                                                           start_editing=False)
+                        # Automatically expand the row if it was expanded
+                        if expanded:
+                            self.ui.tvw_connections.expand_row(tree_path,
+                                                               False)
 
     def on_tvw_connections_row_activated(self, widget, treepath, column):
         """Edit the selected row on activation"""
@@ -535,9 +644,11 @@ class UIMain(object):
                 description = self.model_hosts.get_description(selected_row)
                 selected_iter = self.model_hosts.get_iter(name)
                 expanded = self.ui.tvw_connections.row_expanded(
-                    self.model_hosts.get_path(selected_iter))
+                    self.get_connections_path(selected_iter))
                 dialog = UIHost(parent=self.ui.win_main,
-                                hosts=self.model_hosts)
+                                hosts=self.model_hosts,
+                                templates=self.get_templates_names(name),
+                                group=self.get_current_group())
                 # Restore the destinations for the selected host
                 destinations = self.hosts[name].destinations
                 for destination_name in destinations:
@@ -549,54 +660,85 @@ class UIMain(object):
                     if service_name in model_services.services:
                         dialog.model_associations.add_data(
                             index=dialog.model_associations.count(),
-                            name=association.destination_name,
-                            description=association.description,
-                            service=model_services.services[service_name],
-                            arguments=association.service_arguments)
+                            association=association,
+                            service=model_services.services[service_name])
                     else:
                         debug.add_warning('service %s not found' %
                                           service_name)
                 # Show the edit host dialog
                 response = dialog.show(default_name=_('Copy of %s') % name,
                                        default_description='',
+                                       default_template=self.hosts[
+                                           name].template,
                                        title=_('Copy host'),
-                                       treeiter=None)
+                                       treeiter=None,
+                                       default_tags=self.hosts[name].tags,
+                                       source=(self.get_host_group(name),
+                                               name))
                 if response == Gtk.ResponseType.OK:
-                    destinations = dialog.model_destinations.dump()
-                    associations = dialog.model_associations.dump()
-                    host = HostInfo(dialog.name, dialog.description)
-                    # Set the associations
-                    for values in associations:
-                        (destination_name, description, service_name,
-                            service_arguments) = associations[values]
-                        destination = destinations[destination_name]
-                        arguments = json.loads(service_arguments)
-                        host.add_association(description=description,
-                                             destination_name=destination_name,
-                                             service_name=service_name,
-                                             arguments=arguments)
+                    if not dialog.details_changed:
+                        # Share the unchanged details with the source host
+                        host = self.hosts[name].clone(dialog.name,
+                                                      dialog.description,
+                                                      dialog.template,
+                                                      dialog.tags)
+                        destinations = host.destinations
+                    else:
+                        destinations = dialog.model_destinations.dump()
+                        associations = dialog.model_associations.dump()
+                        host = HostInfo(dialog.name,
+                                        dialog.description,
+                                        dialog.template,
+                                        dialog.tags)
+                        # Set the associations
+                        for key in sorted(associations):
+                            host.add_association_info(associations[key])
                     self.add_host(host=host,
                                   destinations=destinations,
                                   update_settings=True)
                     # Get the path of the host
-                    tree_path = self.model_hosts.get_path_by_name(dialog.name)
-                    # Automatically select again the previously selected host
-                    self.ui.tvw_connections.set_cursor(path=tree_path,
-                                                       column=None,
-                                                       start_editing=False)
-                    # Automatically expand the row if it was expanded before
-                    if expanded:
-                        self.ui.tvw_connections.expand_row(tree_path, False)
-                        # Collapse the duplicated row
-                        self.ui.tvw_connections.collapse_row(
-                            self.model_hosts.get_path(selected_iter))
+                    tree_path = self.get_connections_path(
+                        self.model_hosts.get_iter(dialog.name))
+                    if tree_path is not None:
+                        # Automatically select again the previously selected
+                        # host
+                        self.ui.tvw_connections.set_cursor(path=tree_path,
+                                                           column=None,
+                                                           start_editing=False)
+                        # Automatically expand the row if it was expanded
+                        if expanded:
+                            self.ui.tvw_connections.expand_row(tree_path,
+                                                               False)
+                            # Collapse the duplicated row
+                            self.ui.tvw_connections.collapse_row(
+                                self.get_connections_path(selected_iter))
+
+    def on_action_clone_activate(self, action):
+        """Clone the selected host many times with different addresses"""
+        selected_row = get_treeview_selected_row(self.ui.tvw_connections)
+        if selected_row and self.is_selected_row_host():
+            name = self.model_hosts.get_key(selected_row)
+            dialog = UICloneHosts(parent=self.ui.win_main,
+                                  group=self.get_current_group(),
+                                  host=self.hosts[name])
+            if dialog.show() == Gtk.ResponseType.OK:
+                # Add only the new hosts to the model
+                for change in dialog.changes:
+                    host = change[3]
+                    self.add_host(host=host,
+                                  destinations=None,
+                                  update_settings=False)
+            dialog.destroy()
 
     def on_tvw_connections_cursor_changed(self, widget):
         """Set actions sensitiveness for host and connection"""
         if get_treeview_selected_row(self.ui.tvw_connections):
             self.ui.actions_connection.set_sensitive(
                 not self.is_selected_row_host())
-            self.ui.actions_host.set_sensitive(self.is_selected_row_host())
+            # The hosts in the smart groups cannot be changed
+            self.ui.actions_host.set_sensitive(
+                self.is_selected_row_host() and
+                not smart_groups.is_smart_group(self.get_current_group()))
 
     def on_action_debug_toggled(self, action):
         """Show and hide the debug window"""
@@ -638,38 +780,74 @@ class UIMain(object):
         """Establish the connection for the destination"""
         selected_row = get_treeview_selected_row(self.ui.tvw_connections)
         if selected_row and not self.is_selected_row_host():
-            host = self.hosts[self.model_hosts.get_key(
-                self.ui.store_hosts.iter_parent(selected_row))]
-            destination_name = self.model_hosts.get_key(selected_row)
-            destination = host.destinations[destination_name]
-            description = self.model_hosts.get_association(selected_row)
-            service_name = self.model_hosts.get_service(selected_row)
-            service_arguments = self.model_hosts.get_arguments(selected_row)
-            arguments = json.loads(service_arguments)
-            association = host.find_association(description=description,
-                                                destination=destination.name,
-                                                service=service_name,
-                                                arguments=arguments)
-            if service_name in model_services.services:
-                service = model_services.services[service_name]
-                command = service.command
-                # Prepares the arguments
-                arguments_map = {}
-                arguments_map['address'] = destination.value
-                for key in association.service_arguments:
-                    arguments_map[key] = association.service_arguments[key]
-                # Execute command
-                try:
-                    command = command.format(**arguments_map)
+            name = self.model_hosts.get_key(
+                self.ui.store_hosts.iter_parent(selected_row))
+            group = self.get_host_group(name)
+            host = templates.templates.resolve(group, self.hosts[name])
+            # Use the association shown in the row, the resolved host could
+            # have new association objects
+            association = self.model_hosts.get_association(selected_row)
+            quick_connect.quick_connect.add_recent((
+                group, host.name, association.description,
+                association.destination_name, association.service_name))
+            self.launch_association(host, association)
+
+    def on_action_connect_all_activate(self, action):
+        """Queue the connections with the selected service for every
+        shown host"""
+        selected_row = get_treeview_selected_row(self.ui.tvw_connections)
+        if selected_row and not self.is_selected_row_host():
+            service_name = self.model_hosts.get_association(
+                selected_row).service_name
+            # Follow the shown hosts order and the tags filter
+            for row in self.ui.sort_hosts:
+                name = row[0]
+                if name not in self.hosts:
+                    continue
+                host = templates.templates.resolve(self.get_host_group(name),
+                                                   self.hosts[name])
+                for association in host.associations:
+                    if association.service_name == service_name:
+                        self.launch_association(host, association, True)
+            # Show the launch progress
+            self.ui.action_processes.set_active(True)
+
+    def launch_association(self, host, association, queued=False):
+        """Execute the service command for a host association"""
+        destination = host.destinations.get(association.destination_name)
+        service_name = association.service_name
+        if destination is None:
+            # Skip the missing destination without stopping the others
+            debug.add_warning('destination %s not found' %
+                              association.destination_name)
+        elif service_name in model_services.services:
+            service = model_services.services[service_name]
+            command = service.command
+            # Prepares the arguments
+            arguments_map = {}
+            arguments_map['address'] = destination.value
+            for key in association.service_arguments:
+                arguments_map[key] = association.service_arguments[key]
+            # Execute command
+            try:
+                command = command.format(**arguments_map)
+                if queued:
+                    processes.processes.queue_process(host,
+                                                      destination,
+                                                      service,
+                                                      command)
+                else:
                     processes.processes.add_process(host,
                                                     destination,
                                                     service,
                                                     command)
-                except KeyError as error:
-                    # An error occurred processing the command
-                    error_msg1 = _('Connection open failed')
-                    error_msg2 = _('An error occurred processing the '
-                                   'service command.')
+            except KeyError as error:
+                # An error occurred processing the command
+                error_msg1 = _('Connection open failed')
+                error_msg2 = _('An error occurred processing the '
+                               'service command.')
+                # Only the debug reports the errors for the queued launches
+                if not queued:
                     show_message_dialog(
                         class_=UIMessageDialogClose,
                         parent=self.ui.win_main,
@@ -678,32 +856,46 @@ class UIMain(object):
                         msg1=error_msg1,
                         msg2=error_msg2,
                         is_response_id=None)
-                    debug.add_error(error_msg2)
-                    debug.add_error('Host: "%s"' % host.name)
-                    debug.add_error('Destination name: "%s"' %
-                                    destination.name)
-                    debug.add_error('Destination value: "%s"' %
-                                    destination.value)
-                    debug.add_error('Service: %s' % service.name),
-                    debug.add_error('Command: "%s"' % command)
-            else:
-                debug.add_warning('service %s not found' % service_name)
+                debug.add_error(error_msg2)
+                debug.add_error('Host: "%s"' % host.name)
+                debug.add_error('Destination name: "%s"' %
+                                destination.name)
+                debug.add_error('Destination value: "%s"' %
+                                destination.value)
+                debug.add_error('Service: %s' % service.name),
+                debug.add_error('Command: "%s"' % command)
+        else:
+            debug.add_warning('service %s not found' % service_name)
 
     def is_selected_row_host(self):
         """Return if the currently selected row is an host"""
         return self.ui.store_hosts.iter_parent(
             get_treeview_selected_row(self.ui.tvw_connections)) is None
 
+    def get_current_group(self):
+        """Return the name of the currently selected group"""
+        selected_row = get_treeview_selected_row(self.ui.tvw_groups)
+        return self.model_groups.get_key(selected_row) if selected_row else ''
+
     def get_current_group_path(self):
         """Return the path of the currently selected group"""
-        selected_row = get_treeview_selected_row(self.ui.tvw_groups)
-        group_name = self.model_groups.get_key(selected_row) if selected_row \
-            else ''
-        return os.path.join(DIR_HOSTS, group_name) if group_name else DIR_HOSTS
+        return inventory.get_group_path(self.get_current_group())
+
+    def get_templates_names(self, exclude=None):
+        """Return the templates names, excluding the edited template"""
+        names = inventory.inventory.get_hosts(inventory.GROUP_TEMPLATES).keys()
+        if exclude and self.get_current_group() == inventory.GROUP_TEMPLATES:
+            names.remove(exclude)
+        return names
 
     def on_tvw_groups_cursor_changed(self, widget):
         """Set actions sensitiveness for host and connection"""
         if get_treeview_selected_row(self.ui.tvw_groups):
+            is_smart_group = smart_groups.is_smart_group(
+                self.get_current_group())
+            self.ui.action_new.set_sensitive(not is_smart_group)
+            self.ui.action_smart_group_edit.set_sensitive(is_smart_group)
+            self.ui.action_smart_group_remove.set_sensitive(is_smart_group)
             self.reload_hosts()
             # Automatically select the first host for the group
             self.ui.tvw_connections.set_cursor(0)
@@ -748,7 +940,7 @@ class UIMain(object):
         """Collapse the selected host and hide the associations"""
         selected_row = get_treeview_selected_row(self.ui.tvw_connections)
         if (selected_row and self.is_selected_row_host()):
-            tree_path = self.model_hosts.get_path(selected_row)
+            tree_path = self.get_connections_path(selected_row)
             if self.ui.tvw_connections.row_expanded(tree_path):
                 self.ui.tvw_connections.collapse_row(tree_path)
 
@@ -756,6 +948,224 @@ class UIMain(object):
         """Expand the selected host and show the associations"""
         selected_row = get_treeview_selected_row(self.ui.tvw_connections)
         if (selected_row and self.is_selected_row_host()):
-            tree_path = self.model_hosts.get_path(selected_row)
+            tree_path = self.get_connections_path(selected_row)
             if not self.ui.tvw_connections.row_expanded(tree_path):
                 self.ui.tvw_connections.expand_row(tree_path, False)
+
+    def on_action_bulk_edit_activate(self, action):
+        """Change many hosts at once"""
+        selected_row = get_treeview_selected_row(self.ui.tvw_connections)
+        if selected_row and not self.is_selected_row_host():
+            selected_row = self.ui.store_hosts.iter_parent(selected_row)
+        if selected_row:
+            name = self.model_hosts.get_key(selected_row)
+            selected_host = (self.get_host_group(name), name)
+        else:
+            selected_host = None
+        # The hosts of a smart group belong to their real groups
+        group_hosts = [(self.get_host_group(name), name)
+                       for name in self.hosts]
+        dialog = UIBulkEdit(
+            parent=self.ui.win_main,
+            group_hosts=group_hosts,
+            selected_host=selected_host)
+        if dialog.show() == Gtk.ResponseType.OK:
+            # Update the hosts model only once when any shown host or any
+            # template was changed
+            changed_hosts = set(change[1:3] for change in dialog.changes)
+            if (not changed_hosts.isdisjoint(group_hosts) or
+                    inventory.GROUP_TEMPLATES in
+                    [change[1] for change in dialog.changes]):
+                self.reload_hosts()
+        dialog.destroy()
+
+    def on_inventory_changed(self, changes):
+        """Update the actions after any change to the hosts"""
+        self.update_journal_actions()
+        # The bit positions of the changed hosts could be reused
+        if self.tags_filter is not None:
+            self.apply_tags_filter()
+        # Show the changed members of the current smart group
+        group = self.get_current_group()
+        if (smart_groups.is_smart_group(group) and
+                group[len(smart_groups.SMART_GROUP_PREFIX):] in
+                smart_groups.smart_groups.changed):
+            self.reload_hosts()
+
+    def on_action_smart_group_new_activate(self, action):
+        """Define a new smart group"""
+        dialog = UISmartGroup(parent=self.ui.win_main)
+        if dialog.show(default_name='',
+                       default_query='',
+                       title=_('Add a new smart group')
+                       ) == Gtk.ResponseType.OK:
+            smart_groups.smart_groups.set_query(dialog.name, dialog.query)
+            smart_groups.smart_groups.save()
+            group = smart_groups.get_smart_group_key(dialog.name)
+            self.model_groups.add_data(GroupInfo(group, dialog.name))
+            self.ui.tvw_groups.set_cursor(
+                path=self.model_groups.get_path_by_name(group),
+                column=None,
+                start_editing=False)
+        dialog.destroy()
+
+    def on_action_smart_group_edit_activate(self, action):
+        """Edit the selected smart group"""
+        group = self.get_current_group()
+        if not smart_groups.is_smart_group(group):
+            return
+        name = group[len(smart_groups.SMART_GROUP_PREFIX):]
+        dialog = UISmartGroup(parent=self.ui.win_main)
+        if dialog.show(default_name=name,
+                       default_query=smart_groups.smart_groups.get_query(name),
+                       title=_('Edit smart group')) == Gtk.ResponseType.OK:
+            smart_groups.smart_groups.remove(name)
+            smart_groups.smart_groups.set_query(dialog.name, dialog.query)
+            smart_groups.smart_groups.save()
+            new_group = smart_groups.get_smart_group_key(dialog.name)
+            treeiter = self.model_groups.get_iter(group)
+            self.model_groups.set_data(treeiter,
+                                       GroupInfo(new_group, dialog.name))
+            self.reload_hosts()
+        dialog.destroy()
+
+    def on_action_smart_group_remove_activate(self, action):
+        """Remove the selected smart group"""
+        group = self.get_current_group()
+        if smart_groups.is_smart_group(group) and show_message_dialog(
+                class_=UIMessageDialogNoYes,
+                parent=self.ui.win_main,
+                message_type=Gtk.MessageType.QUESTION,
+                title=None,
+                msg1=_('Remove the smart group'),
+                msg2=_('Remove the smart group «%s»?') %
+                group[len(smart_groups.SMART_GROUP_PREFIX):],
+                is_response_id=Gtk.ResponseType.YES):
+            smart_groups.smart_groups.remove(
+                group[len(smart_groups.SMART_GROUP_PREFIX):])
+            smart_groups.smart_groups.save()
+            self.model_groups.remove(self.model_groups.get_iter(group))
+            self.ui.tvw_groups.set_cursor(0)
+
+    def update_journal_actions(self):
+        """Set the undo and redo actions sensitiveness"""
+        self.ui.action_undo.set_sensitive(journal.journal.can_undo())
+        self.ui.action_redo.set_sensitive(journal.journal.can_redo())
+
+    def on_action_undo_activate(self, action):
+        """Revert the last change to the hosts"""
+        self.refresh_journal_changes(journal.journal.undo())
+
+    def on_action_redo_activate(self, action):
+        """Apply again the last reverted change to the hosts"""
+        self.refresh_journal_changes(journal.journal.redo())
+
+    def refresh_journal_changes(self, changes):
+        """Update the groups and the hosts after an undo or a redo"""
+        self.update_journal_actions()
+        changed_groups = set([change[1] for change in changes])
+        # Add again the restored groups
+        for group in changed_groups:
+            if (not inventory.is_special_group(group) and
+                    self.model_groups.get_iter(group) is None):
+                self.model_groups.add_data(GroupInfo(group, group))
+        # Update the hosts model only once when the group or any
+        # template was changed
+        if (self.get_current_group() in changed_groups or
+                inventory.GROUP_TEMPLATES in changed_groups):
+            self.reload_hosts()
+
+    def get_group_description(self, group):
+        """Return the description of a group"""
+        treeiter = self.model_groups.get_iter(group)
+        return (self.model_groups.get_description(treeiter)
+                if treeiter else group)
+
+    def select_host(self, group, name):
+        """Select a host in any group"""
+        group_iter = self.model_groups.get_iter(group)
+        if group_iter is None:
+            return
+        if self.get_current_group() != group:
+            self.ui.tvw_groups.set_cursor(
+                path=self.model_groups.get_path(group_iter),
+                column=None,
+                start_editing=False)
+        host_iter = self.model_hosts.get_iter(name)
+        if host_iter:
+            tree_path = self.get_connections_path(host_iter)
+            if tree_path is None:
+                # Show the host hidden by the tags filter
+                self.ui.txt_tags_filter.set_text('')
+                cancel_call_later(self.ui.txt_tags_filter)
+                self.apply_tags_filter()
+                tree_path = self.get_connections_path(host_iter)
+            self.ui.tvw_connections.set_cursor(path=tree_path,
+                                               column=None,
+                                               start_editing=False)
+            self.ui.tvw_connections.scroll_to_cell(tree_path, None,
+                                                   False, 0.0, 0.0)
+            self.ui.tvw_connections.grab_focus()
+
+    def on_action_search_activate(self, action):
+        """Move the focus to the search entry"""
+        self.ui.txt_search.grab_focus()
+
+    def on_txt_search_changed(self, widget):
+        """Search the hosts once the typing stops"""
+        call_later(widget, SEARCH_DELAY,
+                   self.on_txt_search_search_changed, widget)
+
+    def on_txt_search_search_changed(self, widget):
+        """Show the ranked hosts matching the search text"""
+        self.ui.store_search.clear()
+        search_text = widget.get_text().strip()
+        if search_text:
+            for score, group, name in search_index.search_index.search(
+                    search_text):
+                host = inventory.inventory.get_host(group, name)
+                self.ui.store_search.append((
+                    group,
+                    name,
+                    '%s - %s (%s)' % (name,
+                                      host.description,
+                                      self.get_group_description(group))))
+            self.ui.completion_search.complete()
+
+    def on_txt_search_activate(self, widget):
+        """Select the best matching host"""
+        # Search the text still waiting for the delay
+        if cancel_call_later(widget):
+            self.on_txt_search_search_changed(widget)
+        treeiter = self.ui.store_search.get_iter_first()
+        if treeiter:
+            self.on_completion_search_match_selected(
+                self.ui.completion_search, self.ui.store_search, treeiter)
+
+    def on_completion_search_match_selected(self, widget, model, treeiter):
+        """Select the chosen host"""
+        group, name = model[treeiter][0], model[treeiter][1]
+        self.ui.txt_search.set_text('')
+        self.select_host(group, name)
+        return True
+
+    def on_action_quick_connect_activate(self, action):
+        """Connect to any host association using the keyboard"""
+        dialog = UIQuickConnect(parent=self.ui.win_main)
+        candidate = dialog.show()
+        dialog.destroy()
+        if candidate:
+            host, association = quick_connect.get_association(candidate)
+            if association:
+                quick_connect.quick_connect.add_recent(candidate)
+                self.launch_association(host, association)
+
+    def on_action_go_to_host_activate(self, action):
+        """Jump to a host of any group by its name"""
+        dialog = UIGoToHost(parent=self.ui.win_main,
+                            group=self.get_current_group(),
+                            get_group_description=self.get_group_description)
+        selected = dialog.show()
+        dialog.destroy()
+        if selected:
+            self.select_host(*selected)
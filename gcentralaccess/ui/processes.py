@@ -18,14 +18,20 @@
 #  51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA
 ##
 
+import os
 import os.path
+import errno
+import fcntl
 import subprocess
+import collections
 
 from gi.repository import Gtk
 from gi.repository import GLib
 from gi.repository import Gdk
 
+import gcentralaccess.preferences as preferences
 import gcentralaccess.settings as settings
+import gcentralaccess.session_logs as session_logs
 from gcentralaccess.gtkbuilder_loader import GtkBuilderLoader
 from gcentralaccess.functions import (
     get_ui_file, get_list_from_string_list, get_treeview_selected_row,
@@ -34,9 +40,16 @@ from gcentralaccess.functions import (
 import gcentralaccess.ui.debug as debug
 
 from gcentralaccess.models.process_info import ProcessInfo
+from gcentralaccess.models.process_output import ProcessOutput
 from gcentralaccess.models.processes import ModelProcesses
 
 SECTION_WINDOW_NAME = 'processes'
+# Maximum number of bytes read at once from the processes output
+READ_SIZE = 4096
+# Milliseconds to wait before showing the new output
+OUTPUT_REFRESH_DELAY = 250
+# Maximum number of outputs kept for the exited processes
+MAX_EXITED_OUTPUTS = 100
 
 processes = None
 
@@ -46,7 +59,20 @@ class UIProcesses(object):
         """Prepare the processes dialog"""
         self.on_window_processes_delete_event = delete_event_cb
         self.processes = {}
-        self.poller_id = None
+        # Output of the processes, kept after they exit for the most
+        # recently exited processes only
+        self.outputs = {}
+        self.exited_outputs = collections.deque()
+        self.output_refresh_id = None
+        # Logs of the processes writing their output straight to a file
+        self.logs = {}
+        # Processes waiting to be launched and the launched ones from the
+        # queue which are still running
+        self.queue = collections.deque()
+        self.queue_running = set()
+        self.queue_total = 0
+        self.queue_launched = 0
+        self.queue_id = None
         # Load the user interface
         self.ui = GtkBuilderLoader(get_ui_file('processes.glade'))
         # Restore the saved size and position
@@ -86,47 +112,228 @@ class UIProcesses(object):
         self.ui.window_processes = None
 
     def add_process(self, host, destination, service, command):
-        """Add a new process"""
-        process = subprocess.Popen(args=get_list_from_string_list(command),
-                                   shell=False)
+        """Add a new process and return its key"""
+        log = None
+        if service.log:
+            # The process writes its output straight to the log file
+            fd, log = session_logs.session_logs.open_log(host,
+                                                         destination,
+                                                         service)
+            try:
+                process = subprocess.Popen(
+                    args=get_list_from_string_list(command),
+                    shell=False,
+                    stdout=fd,
+                    stderr=fd,
+                    close_fds=True)
+            except OSError:
+                session_logs.session_logs.discard_log(log)
+                raise
+            finally:
+                os.close(fd)
+            session_logs.session_logs.start_log(log, process.pid)
+        else:
+            process = subprocess.Popen(
+                args=get_list_from_string_list(command),
+                shell=False,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                close_fds=True)
         treeiter = self.model.add_data(ProcessInfo(host,
                                                    destination,
                                                    service,
                                                    process))
         # Enable process actions
         self.ui.actions_processes.set_sensitive(True)
-        # Save process for further polling
-        self.processes[self.model.get_key(treeiter)] = process
+        # Save process for the actions until it exits
+        key = self.model.get_key(treeiter)
+        self.processes[key] = process
         self.model.add_detail(treeiter,
                               _('Process started'),
                               'media-playback-start')
-        self.start_polling()
-
-    def poll_processes(self):
-        """Poll each process to check if it was terminated"""
-        for key in self.processes.keys():
-            process = self.processes[key]
-            return_code = process.poll()
-            # Has the process exited?
-            if return_code is not None:
-                treeiter = self.model.get_iter(key)
-                self.model.add_detail(treeiter,
-                                      _('Exit code: %d') % return_code,
-                                      'media-playback-stop')
-                # Remove the completed process
-                self.processes.pop(key)
-        if len(self.processes):
-            # Continue the polling
+        # Get notified by GLib when the process exits
+        GLib.child_watch_add(GLib.PRIORITY_DEFAULT, process.pid,
+                             self.on_process_exited, key)
+        if log:
+            self.logs[key] = log
+            self.model.add_detail(treeiter,
+                                  _('Output saved in %s') % log['filename'],
+                                  'text-x-generic')
+        else:
+            # Read the output when available, after the interface events
+            self.outputs[key] = ProcessOutput()
+            for pipe in (process.stdout, process.stderr):
+                fcntl.fcntl(pipe, fcntl.F_SETFL,
+                            fcntl.fcntl(pipe, fcntl.F_GETFL) | os.O_NONBLOCK)
+                GLib.io_add_watch(pipe.fileno(),
+                                  GLib.PRIORITY_DEFAULT_IDLE,
+                                  GLib.IOCondition.IN |
+                                  GLib.IOCondition.HUP |
+                                  GLib.IOCondition.ERR,
+                                  self.on_process_output, key, pipe)
+        return key
+
+    def queue_process(self, host, destination, service, command):
+        """Add a new process to the launch queue"""
+        self.queue.append((host, destination, service, command))
+        self.queue_total += 1
+        self.update_queue_progress()
+        self.schedule_queue()
+
+    def schedule_queue(self):
+        """Launch the next queued process after the launch delay, when the
+        running processes from the queue are fewer than the limit"""
+        if (self.queue_id is None and self.queue and
+                len(self.queue_running) <
+                max(1, preferences.get(preferences.LAUNCH_CONCURRENCY))):
+            self.queue_id = GLib.timeout_add(
+                preferences.get(preferences.LAUNCH_DELAY),
+                self.on_queue_timeout)
+
+    def on_queue_timeout(self):
+        """Launch the next queued process"""
+        self.queue_id = None
+        host, destination, service, command = self.queue.popleft()
+        self.queue_launched += 1
+        try:
+            self.queue_running.add(self.add_process(host,
+                                                    destination,
+                                                    service,
+                                                    command))
+        except OSError as error:
+            debug.add_error(_('Unable to launch the process for %s: %s') % (
+                host.name, error.strerror))
+        self.update_queue_progress()
+        self.schedule_queue()
+        return False
+
+    def update_queue_progress(self):
+        """Show the progress of the launch queue"""
+        if self.queue:
+            self.ui.progress_queue.set_fraction(
+                float(self.queue_launched) / self.queue_total)
+            self.ui.progress_queue.set_text(
+                _('Launched %d of %d processes') % (self.queue_launched,
+                                                    self.queue_total))
+            self.ui.box_queue.show()
+        else:
+            # The queue was completed
+            self.queue_total = 0
+            self.queue_launched = 0
+            self.ui.box_queue.hide()
+
+    def on_action_cancel_queue_activate(self, action):
+        """Cancel the processes still waiting in the launch queue"""
+        debug.add_info(_('%d queued processes were cancelled') %
+                       len(self.queue))
+        self.queue.clear()
+        if self.queue_id is not None:
+            GLib.source_remove(self.queue_id)
+            self.queue_id = None
+        self.update_queue_progress()
+
+    def on_process_exited(self, pid, status, key):
+        """Report the exit code of a terminated process"""
+        process = self.processes.pop(key)
+        # The process was already reaped by GLib
+        process.returncode = (-os.WTERMSIG(status)
+                              if os.WIFSIGNALED(status)
+                              else os.WEXITSTATUS(status))
+        self.model.add_detail(self.model.get_iter(key),
+                              _('Exit code: %d') % process.returncode,
+                              'media-playback-stop')
+        if key in self.logs:
+            session_logs.session_logs.close_log(self.logs[key])
+        else:
+            # Discard the output of the oldest exited process
+            self.exited_outputs.append(key)
+            if len(self.exited_outputs) > MAX_EXITED_OUTPUTS:
+                self.outputs.pop(self.exited_outputs.popleft(), None)
+        # Make room for the next queued process
+        if key in self.queue_running:
+            self.queue_running.remove(key)
+            self.schedule_queue()
+
+    def on_process_output(self, fd, condition, key, pipe):
+        """Read the available output of a process without blocking"""
+        try:
+            data = os.read(fd, READ_SIZE)
+        except OSError as error:
+            if error.errno in (errno.EAGAIN, errno.EINTR):
+                return True
+            data = ''
+        if data:
+            # The output could be already discarded for an exited process
+            # whose children are still writing
+            output = self.outputs.get(key)
+            if output is not None:
+                output.append(data)
+                if key == self.get_selected_key():
+                    self.refresh_output_later()
             return True
+        # The process closed its output
+        pipe.close()
+        return False
+
+    def get_selected_key(self):
+        """Return the key of the process of the selected row"""
+        selected_row = get_treeview_selected_row(self.ui.tvw_processes)
+        if selected_row:
+            iter_parent = self.model.model.iter_parent(selected_row)
+            return self.model.get_key(iter_parent or selected_row)
+
+    def refresh_output_later(self):
+        """Show the new output after a while, to join many small reads"""
+        if (self.output_refresh_id is None and
+                self.ui.action_output.get_active()):
+            self.output_refresh_id = GLib.timeout_add(
+                OUTPUT_REFRESH_DELAY, self.on_output_refresh_timeout)
+
+    def on_output_refresh_timeout(self):
+        """Show the output joined after the delay"""
+        self.output_refresh_id = None
+        self.refresh_output()
+        return False
+
+    def refresh_output(self):
+        """Show the output of the selected process"""
+        selected_key = self.get_selected_key()
+        output = self.outputs.get(selected_key)
+        buffer_output = self.ui.buffer_output
+        if selected_key in self.logs:
+            buffer_output.set_text(_('The output is saved in the log %s') %
+                                   session_logs.session_logs.get_path(
+                                       self.logs[selected_key]))
+        elif output is None:
+            buffer_output.set_text('')
+        elif output.discarded:
+            buffer_output.set_text('%s\n%s' % (
+                _('[%d older bytes discarded]') % output.discarded,
+                output.get_text()))
         else:
-            # Stop the polling
-            self.poller_id = None
-            return False
-
-    def start_polling(self):
-        """Start the poller timeout if it wasn't already started"""
-        if not self.poller_id:
-            self.poller_id = GLib.timeout_add(1000, self.poll_processes)
+            buffer_output.set_text(output.get_text())
+        # Follow the last output
+        buffer_output.place_cursor(buffer_output.get_end_iter())
+        self.ui.textview_output.scroll_mark_onscreen(
+            buffer_output.get_insert())
+
+    def on_action_output_toggled(self, action):
+        """Show or hide the output of the selected process"""
+        self.ui.scroll_output.set_visible(action.get_active())
+        self.refresh_output()
+
+    def on_tvw_processes_cursor_changed(self, widget):
+        """Show the output of the newly selected process"""
+        if self.ui.action_output.get_active():
+            self.refresh_output()
+
+    def on_action_open_log_activate(self, action):
+        """Open the log of the selected process"""
+        log = self.logs.get(self.get_selected_key())
+        if log:
+            Gtk.show_uri(None, 'file://%s' %
+                         session_logs.session_logs.get_path(log),
+                         Gdk.CURRENT_TIME)
 
     def on_action_process_activate(self, action):
         """Execute an action for the selected process"""
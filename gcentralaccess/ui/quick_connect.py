@@ -0,0 +1,163 @@
+##
+#     Project: gCentralAccess
+# Description: Manage external resources from a centralized management console
+#      Author: Fabio Castelli (Muflone) <muflone@vbsimple.net>
+#   Copyright: 2015-2016 Fabio Castelli
+#     License: GPL-2+
+#  This program is free software; you can redistribute it and/or modify it
+#  under the terms of the GNU General Public License as published by the Free
+#  Software Foundation; either version 2 of the License, or (at your option)
+#  any later version.
+#
+#  This program is distributed in the hope that it will be useful, but WITHOUT
+#  ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+#  FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+#  more details.
+#  You should have received a copy of the GNU General Public License along
+#  with this program; if not, write to the Free Software Foundation, Inc.,
+#  51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA
+##
+
+from gi.repository import Gtk
+from gi.repository import Gdk
+
+import gcentralaccess.preferences as preferences
+import gcentralaccess.settings as settings
+from gcentralaccess.gtkbuilder_loader import GtkBuilderLoader
+from gcentralaccess.functions import (
+    get_ui_file, get_treeview_selected_row, call_later, cancel_call_later,
+    SEARCH_DELAY, text, _)
+import gcentralaccess.quick_connect as quick_connect
+import gcentralaccess.pixbuf_cache as pixbuf_cache
+
+import gcentralaccess.models.services as model_services
+
+SECTION_WINDOW_NAME = 'quick connect'
+
+
+class UIQuickConnect(object):
+    def __init__(self, parent):
+        """Prepare the quick connect dialog"""
+        self.candidates = []
+        self.candidate = None
+        # Load the user interface
+        self.ui = GtkBuilderLoader(get_ui_file('quick_connect.glade'))
+        if not preferences.get(preferences.DETACHED_WINDOWS):
+            self.ui.dialog_quick_connect.set_transient_for(parent)
+        # Restore the saved size and position
+        settings.positions.restore_window_position(
+            self.ui.dialog_quick_connect, SECTION_WINDOW_NAME)
+        # Initialize actions
+        for widget in self.ui.get_objects_by_type(Gtk.Action):
+            # Connect the actions accelerators
+            widget.connect_accelerator()
+            # Set labels
+            widget.set_label(text(widget.get_label()))
+        # Initialize tooltips
+        for widget in self.ui.get_objects_by_type(Gtk.Button):
+            action = widget.get_related_action()
+            if action:
+                widget.set_tooltip_text(action.get_label().replace('_', ''))
+        # Initialize column headers
+        for widget in self.ui.get_objects_by_type(Gtk.TreeViewColumn):
+            widget.set_title(text(widget.get_title()))
+        self.ui.cell_icon.props.height = preferences.get(preferences.ICON_SIZE)
+        self.ui.column_service.set_cell_data_func(self.ui.cell_icon,
+                                                  self.cell_icon_data)
+        pixbuf_cache.pixbuf_cache.connect(self.refresh_icons)
+        # Connect signals from the glade file to the module functions
+        self.ui.connect_signals(self)
+
+    def show(self):
+        """Show the quick connect dialog and return the chosen candidate"""
+        self.load_candidates('')
+        self.ui.txt_query.grab_focus()
+        self.ui.dialog_quick_connect.run()
+        self.ui.dialog_quick_connect.hide()
+        return self.candidate
+
+    def destroy(self):
+        """Destroy the quick connect dialog"""
+        settings.positions.save_window_position(
+            self.ui.dialog_quick_connect, SECTION_WINDOW_NAME)
+        pixbuf_cache.pixbuf_cache.disconnect(self.refresh_icons)
+        cancel_call_later(self.ui.txt_query)
+        self.ui.dialog_quick_connect.destroy()
+        self.ui.dialog_quick_connect = None
+
+    def get_service(self, treeiter):
+        """Return the ServiceInfo of a candidate row"""
+        return model_services.services.get(
+            self.ui.store_candidates[treeiter][4])
+
+    def cell_icon_data(self, column, cell, model, treeiter, data):
+        """Render the service icon of a candidate"""
+        service = self.get_service(treeiter)
+        pixbuf_cache.set_cell_icon(column, cell,
+                                   service.icon if service else None)
+
+    def refresh_icons(self, paths):
+        """Update the candidates of the icons loaded in background"""
+        for row in self.ui.store_candidates:
+            service = self.get_service(row.iter)
+            if service and service.icon in paths:
+                self.ui.store_candidates.row_changed(row.path, row.iter)
+
+    def load_candidates(self, query):
+        """Show the best candidates for the query"""
+        self.candidates = quick_connect.quick_connect.search(query)
+        self.ui.store_candidates.clear()
+        for index, candidate in enumerate(self.candidates):
+            host, association = quick_connect.get_association(candidate)
+            if association is None:
+                continue
+            self.ui.store_candidates.append((
+                index,
+                host.name,
+                '%s (%s)' % (association.destination_name,
+                             host.destinations[
+                                 association.destination_name].value),
+                association.description,
+                association.service_name))
+        if len(self.ui.store_candidates):
+            self.ui.tvw_candidates.set_cursor(0)
+
+    def on_txt_query_changed(self, widget):
+        """Search the candidates once the typing stops"""
+        call_later(widget, SEARCH_DELAY,
+                   self.on_txt_query_search_changed, widget)
+
+    def on_txt_query_search_changed(self, widget):
+        """Search the candidates matching the query"""
+        self.load_candidates(widget.get_text())
+
+    def on_txt_query_key_press_event(self, widget, event):
+        """Move the selected candidate using the <Up> and <Down> keys"""
+        if event.keyval in (Gdk.KEY_Up, Gdk.KEY_Down):
+            selected_row = get_treeview_selected_row(self.ui.tvw_candidates)
+            if selected_row:
+                if event.keyval == Gdk.KEY_Up:
+                    treeiter = self.ui.store_candidates.iter_previous(
+                        selected_row)
+                else:
+                    treeiter = self.ui.store_candidates.iter_next(
+                        selected_row)
+                if treeiter:
+                    self.ui.tvw_candidates.set_cursor(
+                        self.ui.store_candidates.get_path(treeiter))
+            return True
+
+    def on_tvw_candidates_row_activated(self, widget, treepath, column):
+        """Connect to the activated candidate"""
+        self.ui.action_confirm.activate()
+
+    def on_action_confirm_activate(self, action):
+        """Choose the selected candidate"""
+        # Search the query still waiting for the delay
+        if cancel_call_later(self.ui.txt_query):
+            self.on_txt_query_search_changed(self.ui.txt_query)
+        selected_row = get_treeview_selected_row(self.ui.tvw_candidates)
+        if selected_row:
+            self.candidate = self.candidates[
+                self.ui.store_candidates[selected_row][0]]
+            self.ui.dialog_quick_connect.response(Gtk.ResponseType.OK)
@@ -22,6 +22,7 @@ from gi.repository import Gtk
 
 import gcentralaccess.preferences as preferences
 import gcentralaccess.settings as settings
+import gcentralaccess.pixbuf_cache as pixbuf_cache
 from gcentralaccess.gtkbuilder_loader import GtkBuilderLoader
 from gcentralaccess.functions import (
     get_ui_file, text, get_list_from_string_list, get_string_fields)
@@ -62,6 +63,9 @@ class UIServiceAssociation(object):
         self.ui.cbo_destinations.set_model(self.destinations.model)
         # Load services
         self.services = ModelServices(self.ui.store_services)
+        self.ui.cbo_services.set_cell_data_func(self.ui.cell_service_icon,
+                                                self.services.cell_icon_data)
+        pixbuf_cache.pixbuf_cache.connect(self.services.refresh_icons)
         self.services.load(model_services.services)
         # Connect signals from the glade file to the module functions
         self.ui.connect_signals(self)
@@ -104,6 +108,7 @@ class UIServiceAssociation(object):
         """Destroy the Service association dialog"""
         settings.positions.save_window_position(
             self.ui.dialog_association, SECTION_WINDOW_NAME)
+        pixbuf_cache.pixbuf_cache.disconnect(self.services.refresh_icons)
         self.ui.dialog_association.destroy()
         self.ui.dialog_association = None
 
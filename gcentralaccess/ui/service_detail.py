@@ -27,6 +27,7 @@ from gcentralaccess.gtkbuilder_loader import GtkBuilderLoader
 from gcentralaccess.functions import (
     check_invalid_input, get_ui_file, set_error_message_on_infobar, text, _)
 import gcentralaccess.preferences as preferences
+import gcentralaccess.pixbuf_cache as pixbuf_cache
 
 from gcentralaccess.ui.file_chooser import UIFileChooserOpenFile
 from gcentralaccess.ui.command_arguments import UICommandArguments
@@ -61,17 +62,20 @@ class UIServiceDetail(object):
         self.command = '[]'
         self.terminal = False
         self.icon = ''
+        self.log = False
         # Connect signals from the glade file to the module functions
         self.ui.connect_signals(self)
 
     def show(self, default_name, default_description, default_command,
-             default_terminal, default_icon, title, treeiter):
+             default_terminal, default_icon, title, treeiter,
+             default_log=False):
         """Show the Services detail dialog"""
         self.ui.txt_name.set_text(default_name)
         self.ui.txt_description.set_text(default_description)
         self.ui.txt_command.set_text(default_command)
         self.ui.chk_terminal.set_active(default_terminal)
         self.ui.txt_icon.set_text(default_icon)
+        self.ui.chk_log.set_active(default_log)
         self.ui.txt_name.grab_focus()
         self.ui.dialog_edit_service.set_title(title)
         self.selected_iter = treeiter
@@ -82,6 +86,7 @@ class UIServiceDetail(object):
         self.command = self.ui.txt_command.get_text().strip()
         self.terminal = self.ui.chk_terminal.get_active()
         self.icon = self.ui.txt_icon.get_text().strip()
+        self.log = self.ui.chk_log.get_active()
         return response
 
     def destroy(self):
@@ -160,11 +165,8 @@ class UIServiceDetail(object):
         """Check the icon field"""
         text = widget.get_text().strip()
         if len(text) > 0 and os.path.isfile(text):
-            icon_size = preferences.get(preferences.ICON_SIZE)
             self.ui.image_icon.set_from_pixbuf(
-                GdkPixbuf.Pixbuf.new_from_file_at_size(text,
-                                                       icon_size,
-                                                       icon_size))
+                pixbuf_cache.pixbuf_cache.get_icon(text))
             icon_name = None
         else:
             icon_name = 'dialog-error' if len(text) > 0 else None
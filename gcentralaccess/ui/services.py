@@ -25,6 +25,8 @@ from gcentralaccess.functions import (
     get_ui_file, get_treeview_selected_row, text, _)
 import gcentralaccess.preferences as preferences
 import gcentralaccess.settings as settings
+import gcentralaccess.pixbuf_cache as pixbuf_cache
+import gcentralaccess.services_index as services_index
 
 from gcentralaccess.models.services import ModelServices
 from gcentralaccess.models.service_info import ServiceInfo
@@ -62,7 +64,12 @@ class UIServices(object):
             widget.set_title(text(widget.get_title()))
         # Load the services
         self.model = ModelServices(self.ui.store_services)
+        self.ui.column_name.set_cell_data_func(self.ui.cell_icon,
+                                               self.model.cell_icon_data)
+        pixbuf_cache.pixbuf_cache.connect(self.model.refresh_icons)
         self.selected_iter = None
+        # New names for the renamed services by their original names
+        self.renamed = {}
         self.ui.cell_icon.props.height = preferences.get(preferences.ICON_SIZE)
         # Sort the data in the models
         self.model.model.set_sort_column_id(
@@ -80,6 +87,7 @@ class UIServices(object):
         """Destroy the Services dialog"""
         settings.positions.save_window_position(
             self.ui.dialog_services, SECTION_WINDOW_NAME)
+        pixbuf_cache.pixbuf_cache.disconnect(self.model.refresh_icons)
         self.ui.dialog_services.destroy()
         self.ui.dialog_services = None
 
@@ -92,12 +100,14 @@ class UIServices(object):
                        default_terminal=False,
                        default_icon='',
                        title=_('Add new service'),
-                       treeiter=None) == Gtk.ResponseType.OK:
+                       treeiter=None,
+                       default_log=False) == Gtk.ResponseType.OK:
             self.model.add_data(ServiceInfo(name=dialog.name,
                                             description=dialog.description,
                                             command=dialog.command,
                                             terminal=dialog.terminal,
-                                            icon=dialog.icon))
+                                            icon=dialog.icon,
+                                            log=dialog.log))
         dialog.destroy()
 
     def on_action_edit_activate(self, action):
@@ -109,6 +119,7 @@ class UIServices(object):
             command = self.model.get_command(selected_row)
             terminal = self.model.get_terminal(selected_row)
             icon = self.model.get_icon(selected_row)
+            log = self.model.get_log(selected_row)
             selected_iter = self.model.get_iter(name)
             dialog = UIServiceDetail(self.ui.dialog_services, self.model)
             if dialog.show(default_name=name,
@@ -117,30 +128,58 @@ class UIServices(object):
                            default_terminal=terminal,
                            default_icon=icon,
                            title=_('Edit service'),
-                           treeiter=selected_iter
-                           ) == Gtk.ResponseType.OK:
+                           treeiter=selected_iter,
+                           default_log=log) == Gtk.ResponseType.OK:
+                # Keep track of the renamed services
+                if dialog.name != name:
+                    original_name = self.get_original_name(name)
+                    if dialog.name == original_name:
+                        self.renamed.pop(original_name)
+                    else:
+                        self.renamed[original_name] = dialog.name
                 # Update values
                 self.model.set_data(selected_iter, ServiceInfo(
                     name=dialog.name,
                     description=dialog.description,
                     command=dialog.command,
                     terminal=dialog.terminal,
-                    icon=dialog.icon))
+                    icon=dialog.icon,
+                    log=dialog.log))
             dialog.destroy()
 
     def on_action_remove_activate(self, action):
         """Remove the selected service"""
         selected_row = get_treeview_selected_row(self.ui.tvw_services)
-        if selected_row and show_message_dialog(
+        if not selected_row:
+            return
+        original_name = self.get_original_name(
+            self.model.get_key(selected_row))
+        associations_count = len(
+            services_index.services_index.get_associations(original_name))
+        message = _("Remove the selected service?")
+        if associations_count:
+            message = '%s\n\n%s' % (
+                message,
+                _('%d associations using this service will be removed.') %
+                associations_count)
+        if show_message_dialog(
                 class_=UIMessageDialogNoYes,
                 parent=self.ui.dialog_services,
                 message_type=Gtk.MessageType.WARNING,
                 title=None,
                 msg1=_("Remove service"),
-                msg2=_("Remove the selected service?"),
+                msg2=message,
                 is_response_id=Gtk.ResponseType.YES):
+            self.renamed.pop(original_name, None)
             self.model.remove(selected_row)
 
     def on_tvw_services_row_activated(self, widget, treepath, column):
         """Edit the selected row on activation"""
         self.ui.action_edit.activate()
+
+    def get_original_name(self, name):
+        """Return the name of a service before any rename"""
+        for original_name, new_name in self.renamed.iteritems():
+            if new_name == name:
+                return original_name
+        return name
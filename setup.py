@@ -29,6 +29,8 @@ import os
 import os.path
 import shutil
 import subprocess
+import sys
+import time
 from itertools import chain
 from glob import glob
 
@@ -187,6 +189,166 @@ class Command_Translations(Command):
             subprocess.call(('msgfmt', '--output-file', file_mo, file_po))
 
 
+class Command_BenchmarkMemory(Command):
+    description = "report the memory used by a synthetic hosts inventory"
+    user_options = [
+        ('hosts=', None, 'Number of hosts to create'),
+        ]
+
+    def initialize_options(self):
+        self.hosts = 100000
+
+    def finalize_options(self):
+        self.hosts = int(self.hosts)
+
+    def get_size(self, item, seen):
+        """Return the size of an object and of its not yet seen items"""
+        if id(item) in seen:
+            return 0
+        seen.add(id(item))
+        size = sys.getsizeof(item)
+        items = ()
+        if isinstance(item, dict):
+            items = list(chain(item.iterkeys(), item.itervalues()))
+        elif isinstance(item, (list, tuple, set)):
+            items = item
+        elif hasattr(type(item), '__slots__'):
+            items = [getattr(item, slot) for slot in type(item).__slots__
+                     if hasattr(item, slot)]
+        elif hasattr(item, '__dict__'):
+            items = [item.__dict__]
+        for value in items:
+            size += self.get_size(value, seen)
+        return size
+
+    def create_hosts(self):
+        """Create the hosts as loaded from the settings files"""
+        from gcentralaccess.functions import intern_string
+        from gcentralaccess.models.host_info import HostInfo
+        from gcentralaccess.models.destination_info import DestinationInfo
+
+        def load_string(value):
+            # Every string read from a file is a new object
+            return intern_string(''.join(list(value)))
+
+        hosts = []
+        for index in xrange(self.hosts):
+            host = HostInfo(name='host-%06d' % index,
+                            description='Host %d' % index,
+                            template=load_string(''))
+            for destination in ('lan', 'wan', 'web'):
+                host.add_destination(DestinationInfo(
+                    name=load_string(destination),
+                    value='10.%d.%d.%d' % (index // 65536,
+                                           index // 256 % 256,
+                                           index % 256)))
+            for service, destination in (('ssh', 'lan'),
+                                         ('rdp', 'wan'),
+                                         ('http', 'web')):
+                host.add_association(
+                    description=load_string(service.upper()),
+                    destination_name=load_string(destination),
+                    service_name=load_string(service),
+                    arguments={load_string(u'username'): u'admin'})
+            hosts.append(host)
+        return hosts
+
+    def create_views(self):
+        """Create the hosts as loaded from the catalog, a view for each
+        host row"""
+        from gcentralaccess.catalog import Catalog, HostView
+
+        catalog = Catalog(os.devnull)
+        for host in self.create_hosts():
+            catalog.add_host('', host, None)
+        return [HostView(catalog, index)
+                for names in catalog.rows.itervalues()
+                for index in names.itervalues()]
+
+    def run(self):
+        for create, title in ((self.create_hosts, 'HostInfo objects'),
+                              (self.create_views, 'catalog views')):
+            hosts = create()
+            size = self.get_size(hosts, set())
+            info('%s: %d bytes per host' % (title, size // len(hosts)))
+            del hosts
+
+
+class Command_BenchmarkProcesses(Command):
+    description = "report how late the exit of many processes is detected"
+    user_options = [
+        ('processes=', None, 'Number of concurrent processes'),
+        ]
+
+    def initialize_options(self):
+        self.processes = 300
+
+    def finalize_options(self):
+        self.processes = int(self.processes)
+
+    def start_processes(self):
+        """Start the processes, exiting after different delays, and return
+        the processes with their expected exit time"""
+        started = time.time()
+        processes = []
+        for index in xrange(self.processes):
+            delay = 1.0 + index % 20 * 0.1
+            processes.append((subprocess.Popen(args=['sleep', str(delay)]),
+                              started + delay))
+        return processes
+
+    def run_polling(self, GLib, loop):
+        """Detect the exits by polling every process each second"""
+        processes = self.start_processes()
+        delays = []
+        callbacks = [0]
+
+        def poll_processes():
+            callbacks[0] += 1
+            for item in processes[:]:
+                if item[0].poll() is not None:
+                    delays.append(time.time() - item[1])
+                    processes.remove(item)
+            if not processes:
+                loop.quit()
+            return bool(processes)
+
+        GLib.timeout_add(1000, poll_processes)
+        loop.run()
+        return delays, callbacks[0]
+
+    def run_child_watch(self, GLib, loop):
+        """Detect the exits by a GLib child watch for every process"""
+        processes = self.start_processes()
+        delays = []
+        callbacks = [0]
+
+        def on_process_exited(pid, status, item):
+            callbacks[0] += 1
+            item[0].returncode = status
+            delays.append(time.time() - item[1])
+            processes.remove(item)
+            if not processes:
+                loop.quit()
+
+        for item in processes:
+            GLib.child_watch_add(GLib.PRIORITY_DEFAULT, item[0].pid,
+                                 on_process_exited, item)
+        loop.run()
+        return delays, callbacks[0]
+
+    def run(self):
+        from gi.repository import GLib
+        loop = GLib.MainLoop()
+        for method, title in ((self.run_polling, 'before (polling)'),
+                              (self.run_child_watch, 'after (child watch)')):
+            delays, callbacks = method(GLib, loop)
+            info('%s: %d processes, exit detected after %.3f seconds on '
+                 'average and %.3f at most, %d callbacks' % (
+                     title, len(delays), sum(delays) / len(delays),
+                     max(delays), callbacks))
+
+
 setup(
     name=APP_NAME,
     version=APP_VERSION,
@@ -209,6 +371,8 @@ setup(
         'install_scripts': Install_Scripts,
         'install_data': Install_Data,
         'create_pot': Command_CreatePOT,
-        'translations': Command_Translations
+        'translations': Command_Translations,
+        'benchmark_memory': Command_BenchmarkMemory,
+        'benchmark_processes': Command_BenchmarkProcesses
     }
 )